@@ -0,0 +1,9 @@
+"""
+Audio description tools.
+
+The individual tools live as standalone scripts in `converters/`,
+`audio_video_tools/` and `audacity_helpers/`; `adtools.cli` exposes all of
+them as subcommands of a single `adtools` command.
+"""
+
+__version__ = "0.1.0"
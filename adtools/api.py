@@ -0,0 +1,87 @@
+"""
+In-memory Python API for the converters.
+
+The command-line scripts stay the source of truth; this module loads them
+once per process (without running their command-line code) and exposes
+their conversion functions, so a long-running service can chain
+conversions without writing intermediate files:
+
+    from adtools import api
+
+    rows = api.parse_srt(srt_bytes, 23.976)
+    xlsx = api.srt_to_excel(rows, None, 23.976)           # -> bytes
+    srt = api.excel_to_srt(xlsx, frame_rate=23.976)        # -> str
+    rpp = api.inject_markers(template_bytes, api.srt_to_markers(srt.encode()))
+    cues, labels, lengths = api.extract_riff_metadata(wav_bytes)
+
+Sources can be paths, bytes or file-like objects; targets can be paths,
+file-like objects or None to get the result back (see
+`audio_video_tools/sources.py`). A plain `str` is always read as a path.
+"""
+
+import os
+import sys
+import threading
+import importlib.util
+
+from adtools.cli import tool_path
+
+_modules = {}
+_lock = threading.Lock()
+
+def _load(relative_path):
+    """Import a tool script as a module (once), with its helper folder on sys.path."""
+    with _lock:
+        module = _modules.get(relative_path)
+        if module is None:
+            path = tool_path(relative_path)
+            if path is None:
+                raise ImportError(f"{relative_path} is missing from this installation")
+            helpers = os.path.join(os.path.dirname(os.path.dirname(path)), "audio_video_tools")
+            if helpers not in sys.path:
+                sys.path.insert(0, helpers)
+            name = "adtools._tools." + os.path.splitext(os.path.basename(path))[0]
+            spec = importlib.util.spec_from_file_location(name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _modules[relative_path] = module
+        return module
+
+def parse_srt(source, frame_rate, use_realtime=False):
+    """Studio script rows [line, timecode in, timecode out, script, note] from an SRT source."""
+    tool = _load("converters/srt_to_studioscript.py")
+    return tool.parse_srt(source, tool.normalize_frame_rate(frame_rate), use_realtime)
+
+def srt_to_excel(source, target=None, frame_rate=23.976, template=None, use_realtime=False):
+    """Studio script workbook from an SRT source or parse_srt() rows; returns bytes when `target` is None."""
+    tool = _load("converters/srt_to_studioscript.py")
+    return tool.srt_to_excel(source, target, tool.normalize_frame_rate(frame_rate), template, use_realtime)
+
+def excel_to_srt(source, target=None, frame_rate=None, video_file=None, schema="line"):
+    """
+    SRT from a studio script workbook; returns a string when `target` is None.
+    `schema="line"` reads the Line Number/Timecode In layout (xls_to_srt.py),
+    `schema="event"` the Event Number/TimeCode In layout (xls_to_srt_v2.py).
+    """
+    script = {"line": "converters/xls_to_srt.py", "event": "converters/xls_to_srt_v2.py"}[schema]
+    return _load(script).excel_to_srt(source, target, video_file, frame_rate)
+
+def srt_to_markers(source):
+    """Reaper MARKER lines for an SRT source."""
+    return _load("converters/srt_to_reaper_markers.py").srt_to_markers(source)
+
+def inject_markers(template, marker_lines, target=None):
+    """Reaper project text with the markers added; returns a string when `target` is None."""
+    return _load("converters/srt_to_reaper_markers.py").inject_markers_into_rpp(template, marker_lines, target)
+
+def extract_riff_metadata(source):
+    """(cues, labels, lengths) from a WAV's cue/adtl chunks, or None if it can't be parsed."""
+    return _load("audio_video_tools/extract_wav_regions.py").extract_riff_metadata(source)
+
+def riff_to_srt(source, sample_rate=48000):
+    """SRT text rebuilt from a WAV's cue/region metadata, or "" when it has none."""
+    tool = _load("audio_video_tools/extract_wav_regions.py")
+    riff = tool.extract_riff_metadata(source)
+    if not riff or not riff[0]:
+        return ""
+    return tool.generate_srt_from_riff(*riff, sample_rate=sample_rate)
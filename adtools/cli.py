@@ -0,0 +1,136 @@
+"""
+adtools command-line entry point.
+
+Every script in the repository is available as a subcommand:
+
+    adtools srt-to-studioscript episode.srt 23.976
+    adtools master mix.wav mix.m4a --profile Netflix
+    adtools import-audio video.mkv ad.wav
+
+A subcommand runs its script exactly as `python <script> ...` would (same
+`sys.argv`, `__main__` and `sys.path[0]`), so each tool keeps its own
+arguments and help text. Nothing but the chosen script is imported, which
+keeps `adtools --help` and the lightweight SRT conversions fast to start.
+"""
+
+import os
+import sys
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# subcommand: (script path relative to the repository root, one-line description)
+COMMANDS = {
+    # Subtitle and script converters
+    "frazier-csv-to-studioscript": ("converters/frazier_csv_to_studioscript.py", "Frazier CSV export to studio script XLSX"),
+    "convert-any": ("converters/convert_any.py", "Detect each file's format and batch-convert mixed folders to one format"),
+    "export-all": ("converters/export_all.py", "Parse an SRT once and write every script/DAW format"),
+    "srt-to-studioscript": ("converters/srt_to_studioscript.py", "SRT to studio script XLSX"),
+    "srt-to-audition": ("converters/srt_to_audition.py", "SRT to Adobe Audition marker CSV"),
+    "srt-to-reaper-markers": ("converters/srt_to_reaper_markers.py", "Inject SRT cues into a Reaper project"),
+    "srt-to-rtf-accessible": ("converters/srt_to_rtf_accessible.py", "SRT to accessible RTF or plain-text script"),
+    "srt2regions": ("converters/srt2regions.py", "SRT to blank WAV with region markers"),
+    "srt-to-burn": ("converters/srt_to_burn.py", "Burn subtitles into a video"),
+    "srt-to-sub-time-burn": ("converters/srt_to_sub_time_burn.py", "Burn subtitles and/or SMPTE timecode into review videos"),
+    "txt-to-srt": ("converters/txt_to_srt.py", "Accessible IN/OUT text script to SRT"),
+    "usf-to-srt": ("converters/usf_to_srt.py", "USF subtitles to SRT"),
+    "xml-subs-to-srt": ("converters/xml_subs_to_srt.py", "USF, TTML/DFXP and EBU-TT subtitles to SRT (streaming, batch)"),
+    "xls-to-srt": ("converters/xls_to_srt.py", "Studio script XLSX (Line Number schema) to SRT"),
+    "xls-to-srt-v2": ("converters/xls_to_srt_v2.py", "Studio script XLSX (Event Number schema) to SRT"),
+    # Audacity helpers
+    "srt-to-audacity": ("audacity_helpers/2audacity_r3.py", "SRT to Audacity labels (numbered)"),
+    "srt-to-audacity-r2": ("audacity_helpers/srt_2_audacity_r2.py", "SRT to Audacity labels (number and text)"),
+    # Audio/video tools
+    "master": ("audio_video_tools/master.py", "Compress and loudness-normalize to a delivery profile"),
+    "audiovault-master": ("audio_video_tools/audiovault_master.py", "Master for AudioVault with bumper"),
+    "convert-audio": ("audio_video_tools/convert_audio.py", "Convert audio to 48 kHz 24-bit WAV"),
+    "extract-wav-regions": ("audio_video_tools/extract_wav_regions.py", "Recover an SRT from WAV cue/region metadata"),
+    "find-dialogue-gaps": ("audio_video_tools/find_dialogue_gaps.py", "Find dialogue gaps for AD cues"),
+    "generate-isolated-ad-video": ("audio_video_tools/generate_isolated_ad_video.py", "Render an isolated AD track video"),
+    "cue-diff": ("audio_video_tools/cue_diff.py", "Cue-level diff of two SRT revisions"),
+    "loudness-meter": ("audio_video_tools/loudness_meter.py", "Measure EBU R128 loudness against a profile"),
+    "job-queue": ("audio_video_tools/job_queue.py", "Run workers for, or inspect, a shared master/burn job queue"),
+    "media-scan": ("audio_video_tools/media_scan.py", "Probe and validate a batch of media files before encoding"),
+    "mix-ad": ("audio_video_tools/mix_ad.py", "Duck program audio, mix and mux AD in one pass"),
+    "sync-offset": ("audio_video_tools/sync_offset.py", "Measure AD-to-source offset and drift; retime the SRT, print atempo/adelay"),
+    "package-stream": ("audio_video_tools/package_stream.py", "Package HLS/DASH with shared video segments and main/AD audio renditions"),
+    "video-only": ("audio_video_tools/video_only.py", "Strip audio, keeping the first video stream"),
+    "waveform-peaks": ("audio_video_tools/waveform_peaks.py", "Write audiowaveform-compatible peak files for WAVs"),
+    "watch-folder": ("audio_video_tools/watch_folder.py", "Watch ingest folders and convert new files automatically"),
+    "run-log": ("audio_video_tools/ffmpeg_runner.py", "Summarize the FFmpeg run log"),
+    "run-history": ("audio_video_tools/run_history.py", "Recent tool runs and per-tool throughput regression report"),
+    "batch-journal": ("audio_video_tools/batch_journal.py", "Show which outputs of an interrupted batch are done"),
+    # Shell tools
+    "import-audio": ("audio_video_tools/import_audio.sh", "Add or replace audio tracks in videos"),
+    "mux-ad": ("audio_video_tools/mux_ad.sh", "Mux AD WAVs into a video as E-AC-3"),
+    "cmp-video": ("audio_video_tools/cmp_video_v2.sh", "Make compressed proxy videos"),
+    "rip-audio": ("audio_video_tools/rip_audio.sh", "Rip audio tracks from videos"),
+    "add-subs": ("audio_video_tools/add_subs.sh", "Add subtitle tracks to a video"),
+    "stems-to-51": ("audio_video_tools/stems_to_51", "Combine stems into a 5.1 WAV"),
+    "zip-logicx": ("audio_video_tools/zip_logicx.sh", "Compress a Logic Pro project"),
+    "unzip-logicx": ("audio_video_tools/unzip_logicx.sh", "Extract a Logic Pro project"),
+}
+
+def tool_path(relative_path):
+    """
+    Find a tool script. Installed packages carry the scripts inside the
+    package directory; in a source checkout they sit next to it.
+    """
+    for base in (PACKAGE_DIR, os.path.dirname(PACKAGE_DIR)):
+        path = os.path.join(base, relative_path)
+        if os.path.isfile(path):
+            return path
+    return None
+
+def print_usage():
+    from adtools import __version__
+
+    print(f"adtools {__version__} - audio description tools\n")
+    print("Usage: adtools <command> [arguments...]")
+    print("       adtools <command> --help\n")
+    print("Commands:")
+    width = max(len(name) for name in COMMANDS)
+    for name, (_, description) in COMMANDS.items():
+        print(f"  {name:<{width}}  {description}")
+
+def run_python_tool(path, args):
+    import runpy
+
+    # Mirror `python path args...`: argv, __main__ and the script's folder first on sys.path
+    sys.argv = [path] + list(args)
+    sys.path.insert(0, os.path.dirname(path))
+    runpy.run_path(path, run_name="__main__")
+
+def run_shell_tool(path, args):
+    import subprocess
+
+    return subprocess.call(["bash", path] + list(args))
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    if not argv or argv[0] in ("-h", "--help", "help"):
+        print_usage()
+        return 0
+
+    if argv[0] == "--version":
+        from adtools import __version__
+        print(__version__)
+        return 0
+
+    name, args = argv[0], argv[1:]
+    if name not in COMMANDS:
+        print(f"adtools: unknown command '{name}'. Run 'adtools --help' for the list of commands.")
+        return 2
+
+    path = tool_path(COMMANDS[name][0])
+    if path is None:
+        print(f"adtools: the script for '{name}' ({COMMANDS[name][0]}) is missing from this installation.")
+        return 1
+
+    if path.endswith(".py"):
+        run_python_tool(path, args)
+        return 0
+    return run_shell_tool(path, args)
+
+if __name__ == "__main__":
+    sys.exit(main())
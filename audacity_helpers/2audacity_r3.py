@@ -1,39 +1,29 @@
+import os
 import sys
-import re
 
-if len(sys.argv) != 3:
-    print("Usage: python3 2audacity.py <inputfile.srt> <outputfile.txt>")
-    sys.exit(1)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'audio_video_tools'))
+from profiling import profile_from_argv, note_output, record_run
+from cues import parse_srt_cues
+if __name__ == "__main__":
+    profile_from_argv()
 
-inputfile = sys.argv[1]
-outputfile = sys.argv[2]
+def audacity_labels(cues):
+    """Audacity label track text: start, end and the cue number, tab-separated."""
+    return "".join(f"{cue.start:.6f}\t{cue.end:.6f}\t{cue.number}\n" for cue in cues)
 
-counter = 1
-pattern = re.compile(r'(\d{2}):(\d{2}):(\d{2}),(\d{3}) --> (\d{2}):(\d{2}):(\d{2}),(\d{3})')
+def convert(inputfile, outputfile):
+    with open(outputfile, 'w') as outfile:
+        outfile.write(audacity_labels(parse_srt_cues(inputfile)))
 
-def convert_to_seconds(hours, minutes, seconds, milliseconds):
-    return hours * 3600 + minutes * 60 + seconds + milliseconds / 1000.0
+if __name__ == "__main__":
+    with record_run():
+        if len(sys.argv) != 3:
+            print("Usage: python3 2audacity.py <inputfile.srt> <outputfile.txt>")
+            sys.exit(1)
 
-with open(inputfile, 'r') as infile, open(outputfile, 'w') as outfile:
-    fields = None
-    for line in infile:
-        line = line.strip()
-        match = pattern.match(line)
-        if match:
-            fields = match.groups()
-            start = convert_to_seconds(int(fields[0]), int(fields[1]), int(fields[2]), int(fields[3]))
-            end = convert_to_seconds(int(fields[4]), int(fields[5]), int(fields[6]), int(fields[7]))
-            fields = [f"{start:.6f}", f"{end:.6f}"]
-        elif line.isdigit():
-            counter = int(line)
-        elif line:
-            if fields is None:
-                fields = ['', '']
-        else:
-            if fields is not None:
-                printline = f"{fields[0]}\t{fields[1]}\t{str(counter)}\n"
-                outfile.write(printline)
-                counter += 1
-                fields = None
+        inputfile = sys.argv[1]
+        outputfile = sys.argv[2]
+        note_output(outputfile)
 
-print("Conversion complete. Output saved to", outputfile)
+        convert(inputfile, outputfile)
+        print("Conversion complete. Output saved to", outputfile)
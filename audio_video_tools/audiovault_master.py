@@ -2,10 +2,14 @@
 
 import os
 import argparse
-import subprocess
 import tempfile
 import shutil
 
+from ffmpeg_runner import run_ffmpeg
+from profiling import profile_from_argv, note_output, record_run
+if __name__ == "__main__":
+    profile_from_argv()
+
 # Hardcoded loudness profile for AudioVault
 PROFILE = {"LUFS": -16.3, "TP": -2.6, "LRA": 5}
 
@@ -14,20 +18,20 @@ BUMPER_PATH = os.path.expanduser("~/audio-vault-assets/bumper.mp3")
 SILENCE_PATH = os.path.expanduser("~/audio-vault-assets/silence_1s.mp3")
 
 def generate_silence(path):
-    subprocess.run([
+    run_ffmpeg([
         "ffmpeg", "-y",
         "-f", "lavfi", "-i", "anullsrc=r=48000:cl=stereo",
         "-t", "1",
         "-acodec", "libmp3lame", "-b:a", "192k",
         path
-    ], check=True)
+    ], stage="silence", duration=1)
 
 def ensure_stereo_cbr(input_path, output_path):
-    subprocess.run([
+    run_ffmpeg([
         "ffmpeg", "-y", "-i", input_path,
         "-ar", "48000", "-ac", "2", "-b:a", "192k",
         output_path
-    ], check=True)
+    ], stage="stereo_cbr")
 
 def process_file(input_file, output_file):
     temp_mastered = tempfile.mktemp(suffix=".mp3")
@@ -40,7 +44,7 @@ def process_file(input_file, output_file):
         "-c:a", "libmp3lame", "-b:a", "192k", "-ar", "48000", "-ac", "2",
         temp_mastered
     ]
-    subprocess.run(ffmpeg_cmd, check=True)
+    run_ffmpeg(ffmpeg_cmd, stage="master")
 
     # Step 2: Ensure bumper/silence files exist
     if not os.path.exists(BUMPER_PATH):
@@ -64,10 +68,10 @@ def process_file(input_file, output_file):
         f.write(f"file '{fixed_silence}'\n")
         f.write(f"file '{temp_mastered}'\n")
 
-    subprocess.run([
+    run_ffmpeg([
         "ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", concat_txt,
         "-c", "copy", output_file
-    ], check=True)
+    ], stage="concat")
 
     # Clean up
     for path in [fixed_bumper, fixed_silence, concat_txt, temp_mastered]:
@@ -86,7 +90,9 @@ def main():
         print("Invalid input file.")
         return
 
+    note_output(args.output)
     process_file(args.input, args.output)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with record_run():
+        main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+
+"""
+batch_journal.py
+
+Crash-safe outputs and a write-ahead journal for long batch runs
+(master.py, convert_audio.py and srt_to_sub_time_burn.py --batch).
+
+- Every output is written under a temporary name next to it
+  (`.<name>.partial<ext>`, so the real name only ever holds a complete
+  file), then flushed to disk and renamed into place in one atomic step.
+  A render that fails or is interrupted leaves nothing under the real name.
+- A batch keeps a journal, `.adtools_journal.jsonl` in its output folder.
+  Before a job starts, a "start" record is appended and synced to disk;
+  once the outputs are renamed into place, a "done" record holds each
+  output's size and mtime and a hash of the settings it was made with (the
+  same parameters the build cache uses).
+- `--resume` replays the journal of the interrupted run. Jobs recorded as
+  done are skipped, after checking that their outputs still exist with the
+  recorded size and mtime and that the settings haven't changed. Any other
+  job is rendered again. For the job that was running when the batch died,
+  the leftover partial files are reported and deleted, and any output
+  already under the real name is redone rather than trusted.
+
+Without `--resume` a batch starts a new journal, and the build cache
+(build_cache.py) still skips outputs that are up to date.
+
+Running this file directly shows the state of a batch folder's journal:
+  python batch_journal.py <output_folder>
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+
+import staging
+
+JOURNAL_NAME = ".adtools_journal.jsonl"
+
+def temp_path(output):
+    """Temporary name for an output while it is written (keeps the extension, so FFmpeg picks the same muxer)."""
+    directory, name = os.path.split(os.path.abspath(output))
+    stem, ext = os.path.splitext(name)
+    return os.path.join(directory, f".{stem}.partial{ext}")
+
+def retarget(cmd, outputs, temps):
+    """A command with each output path replaced by its temporary name (the same path as an -i input is left alone)."""
+    mapping = dict(zip(map(str, outputs), temps))
+    return [arg if i and cmd[i - 1] == "-i" else mapping.get(arg, arg) for i, arg in enumerate(cmd)]
+
+def params_digest(params):
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+def file_stamp(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+def sync_directory(path):
+    """Make a rename in `path` durable. Not possible (or needed) on Windows."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def commit(temp, output):
+    """Flush a finished temporary file to disk and atomically rename it to its real name."""
+    with open(temp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(temp, output)
+    sync_directory(os.path.dirname(os.path.abspath(output)))
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def read_journal(path):
+    """
+    Replay a journal. Returns (done, interrupted): done maps each output to
+    its "done" record; interrupted lists the "start" records of jobs that
+    never finished. A torn last line (the crash hit mid-write) is ignored.
+    """
+    done, started = {}, {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().split("\n")
+    except FileNotFoundError:
+        return {}, []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        event = record.get("event")
+        if event == "start":
+            started[record["job"]] = record
+        elif event == "done":
+            started.pop(record["job"], None)
+            done.update(record["outputs"])
+        elif event == "failed":
+            started.pop(record["job"], None)
+            for output in record["outputs"]:
+                done.pop(output, None)
+    return done, list(started.values())
+
+class BatchJournal:
+    """The write-ahead journal of one batch, kept in its output folder."""
+
+    def __init__(self, directory, tool, resume=False):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, JOURNAL_NAME)
+        self.done, interrupted = read_journal(self.path)
+        self.resumed = 0
+        self.lock = threading.Lock()
+        if resume:
+            for record in interrupted:
+                leftovers = [temp for temp in record["temps"] if os.path.exists(temp)]
+                for temp in leftovers:
+                    remove_quietly(temp)
+                names = ", ".join(os.path.basename(output) for output in record["outputs"])
+                note = f" (removed {len(leftovers)} partial file(s))" if leftovers else ""
+                print(f"↩️ {names} was interrupted; it will be redone{note}")
+        else:
+            if interrupted:
+                print(f"⚠️ The previous batch in {directory} was interrupted; starting over (use --resume to continue it)")
+            self.done = {}
+        self.file = open(self.path, "a" if resume else "w", encoding="utf-8")
+        self.append({"event": "batch", "tool": tool, "resume": resume})
+
+    def append(self, record):
+        record["time"] = time.time()
+        with self.lock:  # Staged outputs are journaled as done from the move-back thread
+            self.file.write(json.dumps(record) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def completed(self, output, params):
+        """True when a resumed batch already finished `output` with these parameters and the file is intact."""
+        record = self.done.get(os.path.abspath(output))
+        if record is None or record["params"] != params_digest(params):
+            return False
+        try:
+            intact = file_stamp(output) == record["stamp"]
+        except OSError:
+            intact = False
+        if intact:
+            self.resumed += 1
+        return intact
+
+    def close(self):
+        if self.resumed:
+            print(f"⏩ Resumed: {self.resumed} output(s) were already done in this batch")
+        self.append({"event": "end"})
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+@contextmanager
+def staged_outputs(outputs, cmd, journal=None, params=None, on_commit=None):
+    """
+    Run a job's outputs through temporary names. `outputs` are spelled as
+    in `cmd`, which is yielded with them replaced by their temporary names.
+    When the block finishes, the files are renamed into place, the job is
+    journaled as done and `on_commit()` is called; if it raises, the
+    temporary files are deleted and nothing is renamed. `params` gives each
+    output's parameters for BatchJournal.completed() (default: `cmd` for all
+    of them).
+
+    While staging is on (staging.py), inputs are read from their local
+    copies and the outputs are written to local scratch; the rename, the
+    "done" record and `on_commit()` then happen in the background, once the
+    outputs have been moved back.
+    """
+    temps = [temp_path(output) for output in outputs]
+    stager = staging.current()
+    if stager:
+        scratch = [stager.local_output(output) for output in outputs]
+        retargeted = stager.localize_inputs(retarget(cmd, outputs, scratch))
+    else:
+        scratch = temps
+        retargeted = retarget(cmd, outputs, temps)
+    outputs = [os.path.abspath(output) for output in outputs]
+    params = params or [cmd] * len(outputs)
+    job = params_digest(cmd)
+    for temp in temps:
+        remove_quietly(temp)
+
+    def commit_all():
+        for temp, output in zip(temps, outputs):
+            commit(temp, output)
+
+    def done():
+        if journal:
+            journal.append({"event": "done", "job": job,
+                            "outputs": {output: {"stamp": file_stamp(output), "params": params_digest(param)}
+                                        for output, param in zip(outputs, params)}})
+        if on_commit:
+            on_commit()
+
+    if journal:
+        journal.append({"event": "start", "job": job, "outputs": outputs, "temps": temps})
+    try:
+        yield retargeted
+        if not stager:
+            commit_all()
+    except Exception as e:
+        for path in set(temps + scratch):
+            remove_quietly(path)
+        if journal:
+            journal.append({"event": "failed", "job": job, "outputs": outputs, "error": str(e)})
+        raise
+    except BaseException:
+        # Ctrl-C or a kill: leave the "start" record open so --resume redoes the job
+        for path in set(temps + scratch):
+            remove_quietly(path)
+        raise
+    finally:
+        if stager:
+            stager.release_inputs(cmd)
+    if stager:
+        stager.move_back(list(zip(scratch, temps)), lambda: (commit_all(), done()))
+    else:
+        done()
+
+def show(directory):
+    path = os.path.join(directory, JOURNAL_NAME)
+    if not os.path.isfile(path):
+        print(f"No batch journal in {directory}")
+        sys.exit(1)
+    done, interrupted = read_journal(path)
+    for output, record in sorted(done.items()):
+        try:
+            state = "✅" if file_stamp(output) == record["stamp"] else "⚠️ changed since"
+        except OSError:
+            state = "❌ missing"
+        print(f"{state} {output}")
+    for record in interrupted:
+        for output in record["outputs"]:
+            print(f"↩️ interrupted: {output}")
+    print(f"\n{len(done)} output(s) done, {len(interrupted)} job(s) interrupted")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python batch_journal.py <output_folder>")
+        sys.exit(1)
+    show(sys.argv[1])
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+
+"""
+build_cache.py
+
+Make-like incremental builds for the tools that write files.
+
+Each output is recorded in a manifest next to it (`.adtools_build.json` in
+the output's folder) together with everything it was built from:
+- the SHA-256 of every input file
+- the tool and its version (a hash of the tool's own source, plus the FFmpeg
+  version for FFmpeg-based tools)
+- the full parameter set (for FFmpeg tools, the complete command line)
+
+A job is skipped only when the output still exists unchanged and all three
+match the manifest; any difference rebuilds it, so a stale output is never
+reused. Input hashes are remembered by (size, mtime) so unchanged media is
+not re-read on every run.
+
+Typical use in a tool:
+
+    key = build_key("master", [input_file], ffmpeg_cmd, versions=[__file__], ffmpeg=True)
+    if not force and up_to_date(output_file, key):
+        print(f"⏩ Skipping {output_file} (up to date)")
+        return
+    run_ffmpeg(ffmpeg_cmd)
+    record_build(output_file, key)
+
+Running this file directly explains why an output would or would not be rebuilt:
+  python build_cache.py <output_file>
+"""
+
+import os
+import sys
+import json
+import hashlib
+import subprocess
+from contextlib import contextmanager
+from functools import lru_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows: manifests are still written atomically, just not locked
+    fcntl = None
+
+MANIFEST_NAME = ".adtools_build.json"
+CHUNK_SIZE = 1 << 20
+
+# Hashes computed elsewhere in this process (staging.py hashes inputs while prefetching them), by path
+known_hashes = {}
+
+def manifest_path(output):
+    return os.path.join(os.path.dirname(os.path.abspath(output)), MANIFEST_NAME)
+
+@contextmanager
+def locked_manifest(path):
+    """Load a manifest under an exclusive lock (so parallel jobs don't lose entries) and yield it for editing."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".lock", "a") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        manifest = load_manifest(path)
+        before = json.dumps(manifest, sort_keys=True)
+        yield manifest
+        if json.dumps(manifest, sort_keys=True) != before:
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=1)
+            os.replace(tmp, path)
+
+def load_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    manifest.setdefault("outputs", {})
+    manifest.setdefault("hashes", {})
+    return manifest
+
+def file_stamp(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def remember_hash(path, stamp, digest):
+    """Note the SHA-256 of a file read elsewhere, valid while its size and mtime still match `stamp`."""
+    known_hashes[os.path.abspath(path)] = {"stamp": list(stamp), "sha256": digest}
+
+def content_hash(path, hashes=None):
+    """
+    SHA-256 of a file. `hashes` is a manifest's hash cache; when the file's
+    size and mtime match a cached entry (or one from remember_hash(), which
+    is then added to the cache) the stored hash is returned instead of
+    reading the file again.
+    """
+    path = os.path.abspath(path)
+    stamp = file_stamp(path)
+    cached = (hashes or {}).get(path)
+    if cached and cached["stamp"] == stamp:
+        return cached["sha256"]
+    known = known_hashes.get(path)
+    if known and known["stamp"] == stamp:
+        if hashes is not None:
+            hashes[path] = dict(known)
+        return known["sha256"]
+    digest = sha256_file(path)
+    if hashes is not None:
+        hashes[path] = {"stamp": stamp, "sha256": digest}
+    return digest
+
+@lru_cache(maxsize=None)
+def source_version(path):
+    """Short hash of a tool's source file, so editing a tool invalidates what it built."""
+    return sha256_file(path)[:16]
+
+@lru_cache(maxsize=None)
+def ffmpeg_version():
+    try:
+        result = subprocess.run(["ffmpeg", "-version"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    except OSError:
+        return None
+    return result.stdout.splitlines()[0] if result.stdout else None
+
+def build_key(tool, inputs, params, versions=(), ffmpeg=False):
+    """
+    Describe a job: the tool name, its input files, its full parameter set
+    (anything JSON-serializable) and the source files whose content makes up
+    the tool's version. Input hashes are filled in by up_to_date()/record_build().
+    """
+    version = {os.path.basename(path): source_version(os.path.abspath(path)) for path in versions}
+    if ffmpeg:
+        version["ffmpeg"] = ffmpeg_version()
+    return {
+        "tool": tool,
+        "version": version,
+        "inputs": [os.path.abspath(path) for path in inputs],
+        "params": json.loads(json.dumps(params)),
+    }
+
+def _entry(key, hashes):
+    entry = dict(key)
+    entry["inputs"] = {path: content_hash(path, hashes) for path in key["inputs"]}
+    return entry
+
+def stale_reason(output, key):
+    """Return why `output` has to be rebuilt for `key`, or None when it is up to date."""
+    output = os.path.abspath(output)
+    if not os.path.isfile(output):
+        return "output missing"
+
+    with locked_manifest(manifest_path(output)) as manifest:
+        recorded = manifest["outputs"].get(output)
+        if recorded is None:
+            return "not built by this tool chain yet"
+        if recorded.get("output") != file_stamp(output):
+            return "output was modified after it was built"
+        if recorded["tool"] != key["tool"] or recorded["version"] != key["version"]:
+            return "tool version changed"
+        if recorded["params"] != key["params"]:
+            return "parameters changed"
+        try:
+            current = _entry(key, manifest["hashes"])
+        except OSError as e:
+            return f"input unreadable ({e})"
+        if recorded["inputs"] != current["inputs"]:
+            changed = [os.path.basename(path) for path, digest in current["inputs"].items()
+                       if recorded["inputs"].get(path) != digest]
+            return f"input changed: {', '.join(changed) or 'input list'}"
+    return None
+
+def up_to_date(output, key):
+    return stale_reason(output, key) is None
+
+def record_build(output, key):
+    """Record that `output` was just built successfully from `key`."""
+    output = os.path.abspath(output)
+    if not os.path.isfile(output):
+        return
+    with locked_manifest(manifest_path(output)) as manifest:
+        entry = _entry(key, manifest["hashes"])
+        entry["output"] = file_stamp(output)
+        manifest["outputs"][output] = entry
+
+def forget_build(output):
+    """Drop an output's manifest entry, e.g. before rebuilding it, so a failed run can't look up to date."""
+    output = os.path.abspath(output)
+    path = manifest_path(output)
+    if os.path.isfile(path):
+        with locked_manifest(path) as manifest:
+            manifest["outputs"].pop(output, None)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python build_cache.py <output_file>")
+        sys.exit(1)
+    output = os.path.abspath(sys.argv[1])
+    recorded = load_manifest(manifest_path(output))["outputs"].get(output)
+    if recorded is None:
+        print(f"❌ No build record for {output}")
+        sys.exit(1)
+    key = {k: recorded[k] for k in ("tool", "version", "params")}
+    key["inputs"] = list(recorded["inputs"])
+    reason = stale_reason(output, key)
+    print(json.dumps(recorded, indent=2))
+    print(f"⚠️ Would rebuild: {reason}" if reason else "✅ Up to date with its recorded inputs")
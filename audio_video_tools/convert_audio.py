@@ -7,25 +7,37 @@ import subprocess
 from pathlib import Path
 import argparse
 
-def convert_to_wav(input_path, output_dir, downmix=None, dolby_downmix=False, dry_run=False):
+from ffmpeg_runner import run_ffmpeg
+from build_cache import build_key, up_to_date, record_build, forget_build
+from batch_journal import BatchJournal, staged_outputs
+from fast_path import plan_audio, codec_args, describe
+import staging
+from profiling import profile_from_argv, note_output, record_run
+if __name__ == "__main__":
+    profile_from_argv()
+
+def convert_to_wav(input_path, output_dir, downmix=None, dolby_downmix=False, dry_run=False, force=False, peaks=False, journal=None, info=None):
     input_path = Path(input_path)
     output_file = output_dir / f"{input_path.stem}.wav"
 
-    if output_file.exists():
-        print(f"Skipping {input_path.name}, already converted.")
-        return
+    # A source that is already 48kHz 24-bit PCM (or lossless to get there) skips the decode/encode
+    if info is None:
+        from media_scan import probe
 
-    print(f"Converting {input_path.name} -> {output_file.name}")
+        info = probe(input_path)
+    mode, reason = plan_audio(info, "pcm_s24le", 48000, ".wav", {"mono": 1, "stereo": 2}.get(downmix))
 
     cmd = [
-        "ffmpeg",
+        "ffmpeg", "-y",
         "-i", str(input_path),
         "-ar", "48000",         # 48kHz sample rate
         "-acodec", "pcm_s24le", # 24-bit WAV
     ]
 
+    if mode != "transcode":
+        cmd = ["ffmpeg", "-y", "-i", str(input_path)] + codec_args(mode, "pcm_s24le")
     # Handle downmixing
-    if downmix == "mono":
+    elif downmix == "mono":
         cmd += ["-ac", "1"]
     elif downmix == "stereo":
         if dolby_downmix:
@@ -43,10 +55,36 @@ def convert_to_wav(input_path, output_dir, downmix=None, dolby_downmix=False, dr
 
     cmd.append(str(output_file))
 
+    if journal and journal.completed(output_file, cmd):
+        print(f"Skipping {input_path.name}, already done in this batch.")
+        return
+
+    # Skip only if this exact source was already converted with these exact options
+    key = build_key("convert_audio", [input_path], cmd, versions=[__file__], ffmpeg=True)
+    if not force and up_to_date(output_file, key):
+        print(f"Skipping {input_path.name}, already converted.")
+        return
+
+    print(f"Converting {input_path.name} -> {output_file.name} ({describe(mode, reason)})")
+
     if dry_run:
         print(" ".join(cmd))
     else:
-        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+        def converted():
+            record_build(output_file, key)
+            if peaks:
+                # NumPy is only loaded when peaks are wanted
+                from waveform_peaks import peaks_post_step
+
+                peaks_post_step(output_file)
+
+        forget_build(output_file)
+        try:
+            # Written under a temporary name, so a failed or interrupted conversion never leaves a partial WAV
+            with staged_outputs([str(output_file)], cmd, journal, on_commit=converted) as staged_cmd:
+                run_ffmpeg(staged_cmd, stage="convert")
+        except subprocess.CalledProcessError as e:
+            print(f"Failed to convert {input_path.name} (exit code {e.returncode})")
 
 def main():
     parser = argparse.ArgumentParser(
@@ -56,6 +94,8 @@ Convert one or many audio files (like .eac3, .ac3, .m4a, .mp3, .wav) to 48kHz 24
 
 Preserves the original channel layout by default, or optionally downmixes to mono or stereo.
 Supports standard stereo (ITU) and Dolby Pro Logic-style downmixing.
+Sources that are already 48kHz PCM with the wanted channel count are stream-copied, or only
+have their sample format converted (e.g. 16-bit to 24-bit), instead of being transcoded.
 
 Examples:
   # Convert a single file, preserve channel count
@@ -69,6 +109,9 @@ Examples:
 
   # Preview the FFmpeg commands without doing any processing
   python convert_audio.py input_folder --dry-run
+
+  # Convert a folder on a NAS through local scratch (prefetched inputs, outputs moved back in the background)
+  python convert_audio.py /mnt/nas/stems /mnt/nas/converted --stage-dir /scratch
 """,
         formatter_class=argparse.RawTextHelpFormatter
     )
@@ -78,24 +121,42 @@ Examples:
     parser.add_argument("--downmix", choices=["mono", "stereo"], help="Optional downmixing")
     parser.add_argument("--dolby-downmix", action="store_true", help="Apply Dolby Pro Logic-style stereo downmixing")
     parser.add_argument("--dry-run", action="store_true", help="Show ffmpeg commands without running them")
+    parser.add_argument("--force", action="store_true", help="Convert even if an up-to-date output already exists")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted batch from its journal, skipping the files it finished")
+    parser.add_argument("--peaks", action="store_true", help="Also write waveform peak files for each WAV (see waveform_peaks.py)")
+    staging.add_arguments(parser)
     args = parser.parse_args()
 
     input_path = Path(args.input)
     output_dir = Path(args.output)
     output_dir.mkdir(exist_ok=True)
+    note_output(output_dir)
 
     files = []
     if input_path.is_file():
-        files = [input_path]
+        files = [(input_path, None)]
     elif input_path.is_dir():
         for ext in (".eac3", ".ac3", ".m4a", ".mp3", ".wav"):
             files.extend(input_path.glob(f"*{ext}"))
+        # Reject unreadable and audio-less files before converting anything; the probes also pick each file's fast path
+        from media_scan import validate_inputs
+
+        files = [(Path(info["file"]), info) for info in validate_inputs(files)]
     else:
         print("Invalid input path.")
         return
 
-    for file in files:
-        convert_to_wav(file, output_dir, args.downmix, args.dolby_downmix, args.dry_run)
+    if args.dry_run:
+        for file, info in files:
+            convert_to_wav(file, output_dir, args.downmix, args.dolby_downmix, args.dry_run, args.force, args.peaks, info=info)
+        return
+
+    # The journal in the output folder lets --resume pick up an interrupted batch where it stopped
+    with BatchJournal(output_dir, "convert_audio", resume=args.resume) as journal, \
+            staging.staging([file for file, _ in files], args.stage_dir, args.stage_ahead, args.stage_budget):
+        for file, info in files:
+            convert_to_wav(file, output_dir, args.downmix, args.dolby_downmix, args.dry_run, args.force, args.peaks, journal, info)
 
 if __name__ == "__main__":
-    main()
+    with record_run():
+        main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+"""
+cue_diff.py
+
+Cue-level diff between two revisions of an AD script, and the revision
+records that let the renderers redo only what a script revision changed.
+
+`diff_cues()` lines the two cue lists up with difflib (a cue is its start,
+end and text, so a retimed cue and a reworded cue both count as changed)
+and returns the changed, added and removed cues plus the time spans they
+cover, in the old and the new revision, merged into as few spans as
+possible.
+
+After every render, srt_to_sub_time_burn.py and srt2regions.py save a
+revision record next to the output (`.<output name>.revision.json`) with
+the cues it was rendered from, the settings and the output's size/mtime.
+With `--revise`, they diff the new SRT against that record and re-render
+only the affected spans (see those scripts).
+
+Running this file directly prints the diff of two SRTs:
+  python cue_diff.py episode_v3.srt episode_v4.srt
+"""
+
+import os
+import sys
+import json
+import difflib
+
+from cues import Cue, parse_srt_cues, srt_timestamp
+
+def cue_key(cue):
+    return (round(cue.start, 3), round(cue.end, 3), cue.text)
+
+def merge_spans(spans, gap=0.0):
+    """Merge (start, end) spans that overlap or are less than `gap` seconds apart."""
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1] + gap:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(span) for span in merged]
+
+def diff_cues(old, new):
+    """
+    Compare two cue lists. Returns a dict with "changed" ((old cue, new cue)
+    pairs), "added" and "removed" cues, and "spans": the merged time spans
+    where the rendered result differs (a changed cue's old and new timing
+    both count).
+    """
+    matcher = difflib.SequenceMatcher(None, [cue_key(c) for c in old], [cue_key(c) for c in new], autojunk=False)
+    changed, added, removed = [], [], []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        paired = min(i2 - i1, j2 - j1)
+        changed.extend(zip(old[i1:i1 + paired], new[j1:j1 + paired]))
+        removed.extend(old[i1 + paired:i2])
+        added.extend(new[j1 + paired:j2])
+    touched = [cue for pair in changed for cue in pair] + added + removed
+    return {
+        "changed": changed,
+        "added": added,
+        "removed": removed,
+        "spans": merge_spans((cue.start, cue.end) for cue in touched),
+    }
+
+def revision_path(output):
+    directory, name = os.path.split(os.path.abspath(output))
+    return os.path.join(directory, f".{name}.revision.json")
+
+def save_revision(output, cues, settings):
+    """Record the cues and settings an output was just rendered from."""
+    st = os.stat(output)
+    record = {
+        "settings": settings,
+        "output": [st.st_size, st.st_mtime_ns],
+        "cues": [[cue.start, cue.end, cue.text] for cue in cues],
+    }
+    path = revision_path(output)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(record, f)
+    os.replace(path + ".tmp", path)
+
+def load_revision(output, settings):
+    """
+    The cues a previous render of `output` was made from, or None with the
+    reason when it can't be revised (no record, other settings, or the
+    output was changed since).
+    """
+    try:
+        with open(revision_path(output), encoding="utf-8") as f:
+            record = json.load(f)
+        st = os.stat(output)
+    except (OSError, ValueError):
+        return None, "no previous render to revise"
+    if record["output"] != [st.st_size, st.st_mtime_ns]:
+        return None, "the previous output was modified after it was rendered"
+    if record["settings"] != json.loads(json.dumps(settings)):
+        return None, "settings or sources changed since the previous render"
+    return [Cue(i, start, end, text) for i, (start, end, text) in enumerate(record["cues"], 1)], None
+
+def describe(diff):
+    return (f"{len(diff['changed'])} changed, {len(diff['added'])} added, {len(diff['removed'])} removed "
+            f"in {len(diff['spans'])} span(s)")
+
+def print_diff(diff):
+    for old, new in diff["changed"]:
+        print(f"~ {srt_timestamp(old.start)} --> {srt_timestamp(old.end)}  {old.text!r}")
+        print(f"  {srt_timestamp(new.start)} --> {srt_timestamp(new.end)}  {new.text!r}")
+    for cue in diff["removed"]:
+        print(f"- {srt_timestamp(cue.start)} --> {srt_timestamp(cue.end)}  {cue.text!r}")
+    for cue in diff["added"]:
+        print(f"+ {srt_timestamp(cue.start)} --> {srt_timestamp(cue.end)}  {cue.text!r}")
+    print(describe(diff))
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python cue_diff.py <old.srt> <new.srt>")
+        sys.exit(1)
+    print_diff(diff_cues(parse_srt_cues(sys.argv[1]), parse_srt_cues(sys.argv[2])))
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+"""
+cues.py
+
+One SRT parser shared by the converters, so a script parsed once can be
+handed to every writer (see converters/export_all.py).
+
+`parse_srt_cues()` returns a list of `Cue(number, start, end, text)` with
+times in seconds and the subtitle text with its line breaks kept. It copes
+with CRLF line endings, a UTF-8 BOM, missing index lines and a missing
+blank line after the last cue. The source can be a path, bytes or a
+file-like object (see sources.py).
+
+`write_srt()` writes any iterable of cues back out as SRT, one cue at a
+time, so a streaming reader (see subtitle_xml.py) never holds the whole
+script.
+"""
+
+import re
+from collections import namedtuple
+
+from sources import read_text
+
+Cue = namedtuple("Cue", "number start end text")
+
+TIMING = re.compile(r"(\d+):(\d{2}):(\d{2})[,.](\d{3})\s*-->\s*(\d+):(\d{2}):(\d{2})[,.](\d{3})")
+
+def timestamp_seconds(hours, minutes, seconds, milliseconds):
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds) + int(milliseconds) / 1000
+
+def smpte_seconds(timecode, frame_rate):
+    """Seconds for an HH:MM:SS:FF (or drop-frame HH:MM:SS;FF) timecode, counting frames at `frame_rate`."""
+    hours, minutes, seconds, frames = map(int, re.split(r"[:;]", timecode.strip()))
+    return hours * 3600 + minutes * 60 + seconds + frames / frame_rate
+
+def srt_timestamp(seconds):
+    """Format seconds as an SRT timestamp (HH:MM:SS,mmm)."""
+    ms = int(round(seconds * 1000))
+    return f"{ms // 3600000:02}:{ms // 60000 % 60:02}:{ms // 1000 % 60:02},{ms % 1000:03}"
+
+def parse_srt_cues(source):
+    cues = []
+    for block in re.split(r"\n\s*\n", read_text(source).strip()):
+        lines = block.split("\n")
+        for i, line in enumerate(lines[:2]):
+            match = TIMING.search(line)
+            if match:
+                break
+        else:
+            continue
+        number = int(lines[0]) if i == 1 and lines[0].strip().isdigit() else len(cues) + 1
+        start = timestamp_seconds(*match.groups()[:4])
+        end = timestamp_seconds(*match.groups()[4:])
+        cues.append(Cue(number, start, end, "\n".join(line.strip() for line in lines[i + 1:])))
+    return cues
+
+def write_srt(cues, path):
+    """Write cues to an SRT file as they arrive, renumbered from 1. Returns the cue count."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for count, cue in enumerate(cues, 1):
+            f.write(f"{count}\n{srt_timestamp(cue.start)} --> {srt_timestamp(cue.end)}\n{cue.text}\n\n")
+    return count
@@ -27,6 +27,11 @@ import struct
 import subprocess
 import json
 
+from profiling import profile_from_argv, note_output, record_run
+from sources import open_binary
+if __name__ == "__main__":
+    profile_from_argv()
+
 def read_uint32(f):
     return struct.unpack('<I', f.read(4))[0]
 
@@ -41,9 +46,14 @@ def format_time(t):
     return f"{h:02}:{m:02}:{s:02},{ms:03}"
 
 def extract_riff_metadata(filename):
+    """
+    Read cue points, labels and region lengths (in samples) from a WAV given
+    as a path, bytes or binary file-like object. Returns (cues, labels, lengths)
+    keyed by cue ID, or None if the file can't be parsed.
+    """
     cues, labels, lengths = {}, {}, {}
     try:
-        with open(filename, 'rb') as f:
+        with open_binary(filename) as f:
             f.seek(12)  # skip RIFF header
             while True:
                 try:
@@ -74,8 +84,8 @@ def extract_riff_metadata(filename):
                                 labels[cue_id] = label
 
                             elif sub_id == 'ltxt':
-                                cue_id = struct.unpack('<I', sub_data[:4])[0]
-                                sample_length = struct.unpack('<I', sub_data[16:20])[0]
+                                # ltxt: cue ID, sample length, purpose ID, country, language, dialect, code page
+                                cue_id, sample_length = struct.unpack('<II', sub_data[:8])
                                 lengths[cue_id] = sample_length
                     else:
                         f.seek(chunk_size - 4, 1)
@@ -116,31 +126,33 @@ def extract_ffmpeg_chapters(filename):
     return ''.join(entries)
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python extract_wav_regions.py <input.wav>")
-        sys.exit(1)
-
-    filename = sys.argv[1]
-    base = os.path.splitext(os.path.basename(filename))[0]
-    output = f"{base}_reconstructed.srt"
-
-    print("📦 Trying to extract embedded region/cue metadata...")
-    riff = extract_riff_metadata(filename)
-    if riff:
-        cues, labels, lengths = riff
-        if cues:
-            print("✅ Found RIFF cue metadata. Generating SRT...")
-            srt = generate_srt_from_riff(cues, labels, lengths)
+    with record_run():
+        if len(sys.argv) < 2:
+            print("Usage: python extract_wav_regions.py <input.wav>")
+            sys.exit(1)
+
+        filename = sys.argv[1]
+        base = os.path.splitext(os.path.basename(filename))[0]
+        output = f"{base}_reconstructed.srt"
+        note_output(output)
+
+        print("📦 Trying to extract embedded region/cue metadata...")
+        riff = extract_riff_metadata(filename)
+        if riff:
+            cues, labels, lengths = riff
+            if cues:
+                print("✅ Found RIFF cue metadata. Generating SRT...")
+                srt = generate_srt_from_riff(cues, labels, lengths)
+                with open(output, "w", encoding="utf-8") as f:
+                    f.write(srt)
+                print(f"✅ SRT file written to {output}")
+                sys.exit(0)
+
+        print("⚠️ No RIFF cue metadata found. Trying to extract FFmpeg-style chapters...")
+        srt = extract_ffmpeg_chapters(filename)
+        if srt:
             with open(output, "w", encoding="utf-8") as f:
                 f.write(srt)
             print(f"✅ SRT file written to {output}")
-            sys.exit(0)
-
-    print("⚠️ No RIFF cue metadata found. Trying to extract FFmpeg-style chapters...")
-    srt = extract_ffmpeg_chapters(filename)
-    if srt:
-        with open(output, "w", encoding="utf-8") as f:
-            f.write(srt)
-        print(f"✅ SRT file written to {output}")
-    else:
-        print("❌ No usable metadata found.")
+        else:
+            print("❌ No usable metadata found.")
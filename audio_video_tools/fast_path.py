@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+"""
+fast_path.py
+
+Decides, from an ffprobe summary of the source (media_scan.py), how little
+work a conversion needs when the source already meets the target:
+
+- "copy": the audio already has the target codec, sample rate and channel
+  count, in the target container; it is stream-copied
+- "rewrap": the same, but in another container (PCM in a MOV or MKV, AAC in
+  an MP4); it is stream-copied into the target container
+- "sample format": integer PCM at the target sample rate and channel count,
+  but with fewer or the same number of bits, or the other byte order; only
+  the sample format is converted, which is lossless
+- "transcode": anything else (resampling, downmixing, another codec, float
+  to integer, or a source that couldn't be probed); the full conversion runs
+
+Only sources with a single audio stream take a fast path, so it always
+reads the same stream FFmpeg's own stream selection would.
+
+convert_audio.py uses this for every file, master.py with
+`--skip-compliant` for sources that already meet their loudness profile,
+and video_only.py to copy files that have nothing to strip. On compliant
+archive material a conversion then runs at disk speed instead of codec
+speed.
+
+Running this file directly shows the plan for a 48 kHz 24-bit WAV:
+  python fast_path.py archive/*.wav
+"""
+
+import os
+import sys
+
+# Integer PCM codecs and their bits per sample
+PCM_BITS = {
+    "pcm_u8": 8, "pcm_s8": 8,
+    "pcm_s16le": 16, "pcm_s16be": 16,
+    "pcm_s24le": 24, "pcm_s24be": 24,
+    "pcm_s32le": 32, "pcm_s32be": 32,
+}
+
+# Output extension -> the demuxer names ffprobe reports for that container
+CONTAINERS = {
+    ".wav": {"wav"},
+    ".mp3": {"mp3"},
+    ".aac": {"aac"},
+    ".eac3": {"eac3"},
+    ".ac3": {"ac3"},
+    ".m4a": {"mov", "mp4", "m4a"},
+}
+
+COPY_MODES = ("copy", "rewrap")
+
+def pcm_bits(stream):
+    """Significant bits of an integer PCM stream (24 for 24-bit audio stored in 32-bit words), or None."""
+    bits = PCM_BITS.get(stream["codec"])
+    return min(bits, stream["bits"] or bits) if bits else None
+
+def plan_audio(info, codec, sample_rate, output_ext, channels=None):
+    """
+    How to turn a probed source into `codec` at `sample_rate` (and
+    `channels`, when given) in an `output_ext` file. Returns (mode, reason).
+    """
+    if not info or info.get("problems") or not info.get("audio"):
+        return "transcode", "source not probed"
+    if info.get("warnings"):
+        return "transcode", "ffprobe logged errors reading the source"
+    if len(info["audio"]) != 1:
+        return "transcode", f"{len(info['audio'])} audio streams"
+    source = info["audio"][0]
+    if source["sample_rate"] != sample_rate:
+        return "transcode", f"resampling {source['sample_rate']} → {sample_rate} Hz"
+    if channels and source["channels"] != channels:
+        return "transcode", f"downmixing {source['channels']} → {channels} channels"
+    if source["codec"] == codec:
+        formats = set((info.get("format") or "").split(","))
+        if formats & CONTAINERS.get(output_ext.lower(), set()):
+            return "copy", f"already {codec} at {sample_rate} Hz"
+        return "rewrap", f"{codec} at {sample_rate} Hz in {info.get('format')}"
+    target_bits, bits = PCM_BITS.get(codec), pcm_bits(source)
+    if target_bits and bits and bits <= target_bits:
+        return "sample format", f"{source['codec']} ({bits}-bit) → {codec}"
+    return "transcode", f"{source['codec']} → {codec}"
+
+def codec_args(mode, codec):
+    """FFmpeg options for a fast-path plan: the single audio stream, copied or with its sample format converted."""
+    return ["-map", "0:a:0", "-c:a", "copy" if mode in COPY_MODES else codec]
+
+def describe(mode, reason):
+    return f"{mode}: {reason}"
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python fast_path.py <file> [<file> ...]")
+        sys.exit(1)
+    from media_scan import probe
+
+    for path in sys.argv[1:]:
+        print(f"{os.path.basename(path)}: {describe(*plan_audio(probe(path), 'pcm_s24le', 48000, '.wav'))}")
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+
+"""
+ffmpeg_runner.py
+
+Shared FFmpeg runner for the audio/video tools.
+
+`run_ffmpeg()` runs an FFmpeg command with `-progress pipe:1`, shows a single
+live status line (percentage, encode speed as a multiple of real time, ETA)
+instead of FFmpeg's own stats output, and appends a JSON record per stage to
+the run log:
+
+    {"tool": "master.py", "stage": "master", "wall": 41.2, "cpu": 160.3,
+     "bytes_in": ..., "bytes_out": ..., "media_duration": 2580.0, "speed": 62.6, ...}
+
+The run log is JSON Lines at `~/.config/ad-tools/run_log.jsonl` by default;
+set `AD_TOOLS_RUN_LOG` to another path, or to an empty string to disable it.
+
+Running this file directly prints a per-tool/per-stage summary of the log:
+  python ffmpeg_runner.py [run_log.jsonl]
+"""
+
+import os
+import sys
+import json
+import time
+import subprocess
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows has no rusage; CPU time is left out of the log
+    resource = None
+
+DEFAULT_RUN_LOG = os.path.expanduser("~/.config/ad-tools/run_log.jsonl")
+
+# Every record of this process, for the run history (run_history.py)
+session_records = []
+
+def run_log_path():
+    return os.environ.get("AD_TOOLS_RUN_LOG", DEFAULT_RUN_LOG)
+
+def probe_duration(path):
+    """Return the container duration of a media file in seconds, or None if it can't be probed."""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", path],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        return None
+
+def input_files(cmd):
+    """Return the existing files passed to FFmpeg with -i."""
+    return [cmd[i + 1] for i, arg in enumerate(cmd[:-1]) if arg == "-i" and os.path.isfile(cmd[i + 1])]
+
+# FFmpeg options that take no value (the others are followed by one)
+FLAG_OPTIONS = {"-y", "-n", "-an", "-vn", "-sn", "-dn", "-shortest", "-nostats", "-hide_banner", "-nostdin",
+                "-copyts", "-start_at_zero", "-accurate_seek", "-noaccurate_seek", "-re", "-stats"}
+
+def output_files(cmd):
+    """Return every output file of an FFmpeg command: the arguments after the last -i input that aren't options or their values."""
+    starts = [i + 2 for i, arg in enumerate(cmd[:-1]) if arg == "-i"]
+    outputs = []
+    i = max(starts, default=1)
+    while i < len(cmd):
+        arg = cmd[i]
+        if arg.startswith("-") and arg != "-":
+            i += 1 if arg in FLAG_OPTIONS else 2
+            continue
+        if arg not in ("-", "pipe:", "pipe:1"):
+            outputs.append(arg)
+        i += 1
+    return outputs
+
+def with_progress_flags(cmd):
+    """Insert the flags that make FFmpeg report progress on stdout and keep stderr quiet."""
+    extra = ["-hide_banner", "-nostats", "-progress", "pipe:1"]
+    if "-v" not in cmd and "-loglevel" not in cmd:
+        extra += ["-loglevel", "error"]
+    return [cmd[0]] + extra + list(cmd[1:])
+
+def format_clock(seconds):
+    seconds = int(max(seconds, 0))
+    return f"{seconds // 3600}:{(seconds % 3600) // 60:02}:{seconds % 60:02}"
+
+def cpu_seconds():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def show_progress(stage, position, duration, speed):
+    if not sys.stderr.isatty():
+        return
+    if duration:
+        percent = min(position / duration * 100, 100)
+        eta = (duration - position) / speed if speed else 0
+        line = f"  {stage}: {percent:5.1f}%  {speed:5.1f}x  ETA {format_clock(eta)}"
+    else:
+        line = f"  {stage}: {format_clock(position)}  {speed:5.1f}x"
+    sys.stderr.write("\r" + line.ljust(60))
+    sys.stderr.flush()
+
+def write_run_log(record):
+    path = run_log_path()
+    if not path:
+        return
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        print(f"⚠️ Could not write run log {path}: {e}")
+
+def run_ffmpeg(cmd, stage=None, duration=None, check=True):
+    """
+    Run an FFmpeg command with live progress and per-stage timing.
+
+    `duration` is the expected output duration in seconds; when omitted it is
+    probed from the longest file input. Raises subprocess.CalledProcessError
+    on failure when `check` is set, like subprocess.run(). Returns the run
+    log record.
+    """
+    stage = stage or "ffmpeg"
+    inputs = input_files(cmd)
+    if duration is None:
+        durations = [d for d in (probe_duration(path) for path in inputs) if d]
+        duration = max(durations) if durations else None
+
+    cpu_before = cpu_seconds()
+    started = datetime.now().isoformat(timespec="seconds")
+    start = time.perf_counter()
+    position = 0.0
+    speed = 0.0
+
+    proc = subprocess.Popen(with_progress_flags(cmd), stdout=subprocess.PIPE, text=True)
+    for line in proc.stdout:
+        key, _, value = line.strip().partition("=")
+        if key == "out_time_us" and value.isdigit():
+            position = int(value) / 1_000_000
+        elif key == "speed" and value.endswith("x"):
+            try:
+                speed = float(value[:-1])
+            except ValueError:
+                pass
+        elif key == "progress":
+            show_progress(stage, position, duration, speed)
+    proc.wait()
+    wall = time.perf_counter() - start
+    cpu_after = cpu_seconds()
+
+    if sys.stderr.isatty():
+        sys.stderr.write("\r" + " " * 60 + "\r")
+
+    outputs = output_files(cmd)
+    media_duration = duration or position or None
+    record = {
+        "tool": os.path.basename(sys.argv[0]),
+        "stage": stage,
+        "started": started,
+        "wall": round(wall, 3),
+        "cpu": round(cpu_after - cpu_before, 3) if cpu_before is not None else None,
+        "bytes_in": sum(os.path.getsize(path) for path in inputs),
+        "bytes_out": sum(os.path.getsize(path) for path in outputs if os.path.isfile(path)),
+        "media_duration": media_duration,
+        "speed": round(media_duration / wall, 2) if media_duration and wall else None,
+        "returncode": proc.returncode,
+        "command": list(cmd),
+    }
+    write_run_log(record)
+    session_records.append(record)
+
+    if proc.returncode == 0:
+        speed_note = f", {record['speed']}x realtime" if record["speed"] else ""
+        print(f"⏱ {stage}: {wall:.1f}s{speed_note}")
+    elif check:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    return record
+
+def summarize(path):
+    """Print total wall/CPU time and average speed per tool and stage from a run log."""
+    totals = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            key = (record["tool"], record["stage"])
+            entry = totals.setdefault(key, {"runs": 0, "failed": 0, "wall": 0.0, "cpu": 0.0, "media": 0.0})
+            entry["runs"] += 1
+            entry["failed"] += record["returncode"] != 0
+            entry["wall"] += record["wall"]
+            entry["cpu"] += record["cpu"] or 0.0
+            entry["media"] += record["media_duration"] or 0.0
+
+    print(f"{'tool':<28}{'stage':<16}{'runs':>6}{'failed':>8}{'wall s':>10}{'cpu s':>10}{'xRT':>8}")
+    for (tool, stage), entry in sorted(totals.items(), key=lambda item: -item[1]["wall"]):
+        xrt = entry["media"] / entry["wall"] if entry["wall"] else 0
+        print(f"{tool:<28}{stage:<16}{entry['runs']:>6}{entry['failed']:>8}"
+              f"{entry['wall']:>10.1f}{entry['cpu']:>10.1f}{xrt:>8.1f}")
+
+if __name__ == "__main__":
+    log = sys.argv[1] if len(sys.argv) > 1 else run_log_path()
+    if not log or not os.path.isfile(log):
+        print(f"No run log found at {log}")
+        sys.exit(1)
+    summarize(log)
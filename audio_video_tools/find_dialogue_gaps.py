@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+"""
+find_dialogue_gaps.py
+
+Finds gaps in a program's dialogue that are long enough to fit AD cues, and
+writes them out as an SRT or a Reaper region list.
+
+The dialogue channel (FC on 5.1/7.1 sources, a mono downmix otherwise) is
+decoded once through FFmpeg, band-limited to the speech range, and reduced to
+a 10 ms energy envelope in dBFS. The envelope is cached next to the source as
+`<source>.<channel>.env.npy`, so trying a different threshold or minimum gap
+length only re-reads the cache instead of decoding the program again.
+
+Output conventions:
+- SRT: one cue per gap (index, timing line, single text line, blank line),
+  the same layout `converters/srt2regions.py` reads, so the gaps can be
+  turned straight into a region WAV
+- Reaper: a region CSV (`#,Name,Start,End,Length`) for the Region/Marker Manager import
+
+Examples:
+  # Gaps of at least 3 seconds, as an SRT next to the source
+  python find_dialogue_gaps.py movie.mkv --min-gap 3
+
+  # Same program, stricter silence threshold, as Reaper regions (uses the cache)
+  python find_dialogue_gaps.py movie.mkv --min-gap 3 --threshold -50 --format reaper
+
+Dependencies:
+- NumPy
+- FFmpeg (`ffmpeg` and `ffprobe`) must be installed
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+from profiling import profile_from_argv, note_output, record_run
+if __name__ == "__main__":
+    profile_from_argv()
+
+import numpy as np
+
+# Envelope resolution and decode rate
+FRAME_SECONDS = 0.01
+DECODE_RATE = 16000
+FRAME_SAMPLES = int(DECODE_RATE * FRAME_SECONDS)
+
+# Samples read from the FFmpeg pipe at a time (about 10 seconds)
+READ_FRAMES = 1000
+
+def format_time(t):
+    h = int(t // 3600)
+    m = int((t % 3600) // 60)
+    s = int(t % 60)
+    ms = int(round((t - int(t)) * 1000))
+    if ms == 1000:
+        s, ms = s + 1, 0
+    return f"{h:02}:{m:02}:{s:02},{ms:03}"
+
+def probe_channels(path):
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "a:0",
+         "-show_entries", "stream=channels", "-of", "json", path],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    streams = json.loads(result.stdout or "{}").get("streams", [])
+    return int(streams[0]["channels"]) if streams else 0
+
+def dialogue_filter(channel, channels):
+    """Return the FFmpeg filter that isolates the dialogue channel and the name used for the cache."""
+    if channel == "auto":
+        channel = "FC" if channels >= 6 else "mix"
+    if channel == "mix":
+        pick = "pan=mono|c0=0.5*c0+0.5*c1" if channels >= 2 else "anull"
+    else:
+        pick = f"pan=mono|c0={channel}"
+    return f"{pick},highpass=f=200,lowpass=f=4000", channel
+
+def envelope_path(source, channel):
+    return f"{source}.{channel}.env.npy"
+
+def compute_envelope(source, audio_filter):
+    """Decode the source once and return its energy envelope in dBFS, one value per 10 ms."""
+    cmd = [
+        "ffmpeg", "-v", "error", "-i", source, "-map", "0:a:0", "-vn",
+        "-af", audio_filter, "-ac", "1", "-ar", str(DECODE_RATE),
+        "-f", "f32le", "-acodec", "pcm_f32le", "-"
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+    block_bytes = READ_FRAMES * FRAME_SAMPLES * 4
+    levels = []
+    leftover = np.empty(0, dtype=np.float32)
+    try:
+        while True:
+            raw = proc.stdout.read(block_bytes)
+            if not raw:
+                break
+            samples = np.concatenate((leftover, np.frombuffer(raw[:len(raw) - len(raw) % 4], dtype="<f4")))
+            usable = len(samples) - len(samples) % FRAME_SAMPLES
+            leftover = samples[usable:]
+            power = (samples[:usable].reshape(-1, FRAME_SAMPLES).astype(np.float64) ** 2).mean(axis=1)
+            levels.append(10 * np.log10(np.maximum(power, 1e-12)))
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"FFmpeg failed to decode {source} (exit code {proc.returncode})")
+    return np.concatenate(levels).astype(np.float16) if levels else np.empty(0, dtype=np.float16)
+
+def load_envelope(source, channel="auto", refresh=False):
+    """Return the cached envelope for a source, decoding it only when the cache is missing or stale."""
+    if not refresh:
+        for name in (["FC", "mix"] if channel == "auto" else [channel]):
+            cache = envelope_path(source, name)
+            if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(source):
+                return np.load(cache)
+
+    audio_filter, channel = dialogue_filter(channel, probe_channels(source))
+    print(f"🔊 Decoding {channel} channel of {os.path.basename(source)}...")
+    envelope = compute_envelope(source, audio_filter)
+    cache = envelope_path(source, channel)
+    np.save(cache, envelope)
+    print(f"💾 Envelope cached to {cache}")
+    return envelope
+
+def find_gaps(envelope, threshold=-40.0, min_gap=2.0, hangover=0.25):
+    """
+    Return (start, end) times in seconds of every stretch quieter than
+    `threshold` dBFS lasting at least `min_gap` seconds. Dialogue frames are
+    widened by `hangover` seconds on each side so pauses between words and
+    breaths don't count as gaps.
+    """
+    active = envelope.astype(np.float32) > threshold
+    pad = int(round(hangover / FRAME_SECONDS))
+    if pad and active.any():
+        # Dilate the active mask with a running window sum
+        window = np.convolve(active.astype(np.int32), np.ones(2 * pad + 1, dtype=np.int32), mode="same")
+        active = window > 0
+
+    quiet = np.concatenate(([False], ~active, [False]))
+    edges = np.flatnonzero(np.diff(quiet.astype(np.int8)))
+    starts, ends = edges[0::2], edges[1::2]
+    keep = (ends - starts) * FRAME_SECONDS >= min_gap
+    return [(float(s * FRAME_SECONDS), float(e * FRAME_SECONDS)) for s, e in zip(starts[keep], ends[keep])]
+
+def write_srt(gaps, output_path):
+    with open(output_path, "w", encoding="utf-8") as f:
+        for i, (start, end) in enumerate(gaps, 1):
+            f.write(f"{i}\n{format_time(start)} --> {format_time(end)}\nGap {i} ({end - start:.1f}s)\n\n")
+
+def write_reaper_regions(gaps, output_path):
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write("#,Name,Start,End,Length\n")
+        for i, (start, end) in enumerate(gaps, 1):
+            f.write(f"R{i},Gap {i},{start:.3f},{end:.3f},{end - start:.3f}\n")
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="find_dialogue_gaps.py",
+        description="Find gaps in dialogue long enough for AD cues and export them as SRT or Reaper regions.",
+    )
+    parser.add_argument("source", help="Program video or audio file")
+    parser.add_argument("output", nargs="?", help="Output file (default: <source>_gaps.srt / _gaps.csv)")
+    parser.add_argument("--min-gap", type=float, default=2.0, help="Minimum gap length in seconds (default: 2.0)")
+    parser.add_argument("--threshold", type=float, default=-40.0, help="Dialogue level threshold in dBFS (default: -40)")
+    parser.add_argument("--hangover", type=float, default=0.25,
+                        help="Seconds of padding kept around dialogue (default: 0.25)")
+    parser.add_argument("--channel", default="auto",
+                        help="Channel to analyse: auto, mix, or an FFmpeg channel name such as FC (default: auto)")
+    parser.add_argument("--format", choices=["srt", "reaper"], default="srt", help="Output format (default: srt)")
+    parser.add_argument("--refresh", action="store_true", help="Ignore the cached envelope and decode again")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.source):
+        print(f"❌ File not found: {args.source}")
+        sys.exit(1)
+
+    base = os.path.splitext(args.source)[0]
+    note_output(args.output or f"{base}_gaps.{'srt' if args.format == 'srt' else 'csv'}")
+
+    envelope = load_envelope(args.source, args.channel, args.refresh)
+    gaps = find_gaps(envelope, args.threshold, args.min_gap, args.hangover)
+
+    if args.format == "srt":
+        output = args.output or f"{base}_gaps.srt"
+        write_srt(gaps, output)
+    else:
+        output = args.output or f"{base}_gaps.csv"
+        write_reaper_regions(gaps, output)
+
+    total = sum(end - start for start, end in gaps)
+    print(f"✅ {len(gaps)} gaps ({total:.0f}s total) written to {output}")
+
+if __name__ == "__main__":
+    with record_run():
+        main()
@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 
-import subprocess
 import os
 import sys
 import urllib.request
 from pathlib import Path
 
+from ffmpeg_runner import run_ffmpeg
+from profiling import profile_from_argv, note_output, record_run
+if __name__ == "__main__":
+    profile_from_argv()
+
 def generate_youtube_info(title_line, subtitle_line, footer_line):
     clean_title = subtitle_line.strip()
     print("\n======================")
@@ -62,7 +66,7 @@ def generate_video(audio_file, title_line, subtitle_line, footer_line, output_fi
         output_file
     ]
 
-    subprocess.run(cmd)
+    run_ffmpeg(cmd, stage="render", check=False)
     generate_youtube_info(title_line, subtitle_line, footer_line)
 
 def process_directory(input_dir, title_line, footer_line, output_dir):
@@ -94,24 +98,27 @@ def check_for_updates(script_path):
         print(f"Could not check for updates: {e}")
 
 if __name__ == "__main__":
-    check_for_updates(__file__)
-
-    mode = input("Run in batch mode? (y/n): ").strip().lower()
-
-    title = input("Main title (e.g. Audio Description Track): ").strip() or "Isolated Audio Description Track"
-    footer = input("Footer (e.g. Audio Only – Sync with your own copy): ").strip() or "Audio Only – Sync with your own copy"
-
-    if mode == "y":
-        input_dir = input("Path to folder of audio files: ").strip()
-        output_dir = input("Output folder for videos: ").strip() or "output"
-        os.makedirs(output_dir, exist_ok=True)
-        process_directory(input_dir, title, footer, output_dir)
-    else:
-        audio = input("Path to a single AD audio file (WAV or MP3): ").strip()
-        if not os.path.isfile(audio):
-            print("File not found.")
-            sys.exit(1)
-
-        subtitle = input("Subtitle (e.g. Earth to Echo (2014)): ").strip() or "Unknown Title"
-        output = input("Output filename (e.g. ad_video.mp4): ").strip() or "ad_video.mp4"
-        generate_video(audio, title, subtitle, footer, output)
+    with record_run():
+        check_for_updates(__file__)
+
+        mode = input("Run in batch mode? (y/n): ").strip().lower()
+
+        title = input("Main title (e.g. Audio Description Track): ").strip() or "Isolated Audio Description Track"
+        footer = input("Footer (e.g. Audio Only – Sync with your own copy): ").strip() or "Audio Only – Sync with your own copy"
+
+        if mode == "y":
+            input_dir = input("Path to folder of audio files: ").strip()
+            output_dir = input("Output folder for videos: ").strip() or "output"
+            os.makedirs(output_dir, exist_ok=True)
+            note_output(output_dir)
+            process_directory(input_dir, title, footer, output_dir)
+        else:
+            audio = input("Path to a single AD audio file (WAV or MP3): ").strip()
+            if not os.path.isfile(audio):
+                print("File not found.")
+                sys.exit(1)
+
+            subtitle = input("Subtitle (e.g. Earth to Echo (2014)): ").strip() or "Unknown Title"
+            output = input("Output filename (e.g. ad_video.mp4): ").strip() or "ad_video.mp4"
+            note_output(output)
+            generate_video(audio, title, subtitle, footer, output)
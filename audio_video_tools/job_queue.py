@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+
+"""
+job_queue.py
+
+Shared work queue that spreads mastering and burn-in jobs over several
+machines. No server is involved: the queue is an SQLite database on the
+storage every render node already mounts.
+
+- The coordinator is the normal tool with `--enqueue`: `master.py <folder>
+  <output> --enqueue queue.db` or `srt_to_sub_time_burn.py --batch
+  --enqueue=queue.db` adds one job per file instead of processing it. Each
+  job holds the tool's complete single-file command line, so every setting
+  travels with it.
+- Workers (`job_queue.py work queue.db`, on any number of nodes and any
+  number per node with `-n`) claim jobs one at a time, inside an exclusive
+  SQLite transaction so two workers can never take the same job, and run
+  the tool on it.
+- A running job's worker updates its heartbeat every `--heartbeat`
+  seconds. A job whose heartbeat is older than `--timeout` (the worker was
+  killed, or its node crashed or lost the share) goes back in the queue for
+  another worker, up to `--max-attempts` tries.
+
+Tools are looked up relative to this file on each worker, so nodes can
+mount the repository at different paths; input and output paths are stored
+as given to the coordinator, so they must be the same on every node.
+
+The database must live on storage with working POSIX locks (local disk,
+NFSv4, SMB with locking). It uses a rollback journal rather than WAL
+because WAL doesn't work over network filesystems.
+
+Usage:
+  python master.py /mnt/media/ep /mnt/media/mastered --profile Netflix --enqueue /mnt/media/queue.db
+  python job_queue.py work /mnt/media/queue.db -n 4
+  python job_queue.py status /mnt/media/queue.db
+  python job_queue.py requeue /mnt/media/queue.db
+  python job_queue.py check -n 8    (claim/requeue self-check on this host)
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from multiprocessing import Process
+
+from profiling import profile_from_argv
+if __name__ == "__main__":
+    profile_from_argv("--profile-run")
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+TOOLS = {
+    "master": os.path.join(TOOLS_DIR, "master.py"),
+    "burn": os.path.join(os.path.dirname(TOOLS_DIR), "converters", "srt_to_sub_time_burn.py"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    tool TEXT NOT NULL,
+    argv TEXT NOT NULL UNIQUE,
+    cwd TEXT NOT NULL,
+    label TEXT,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    heartbeat REAL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    returncode INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+def log(message):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}", flush=True)
+
+def connect(db_path):
+    """Open (and create if needed) the queue database."""
+    db = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+    db.row_factory = sqlite3.Row
+    db.execute("PRAGMA journal_mode=DELETE")
+    db.executescript(SCHEMA)
+    return db
+
+def enqueue(db_path, tool, jobs):
+    """
+    Add jobs for `tool` ("master" or "burn"). Each job is (argv, cwd, label),
+    argv being the tool's arguments for a single file. A job already in the
+    queue is left alone, one that failed is queued again. Returns the number
+    of jobs queued.
+    """
+    if tool not in TOOLS:
+        raise ValueError(f"unknown tool: {tool}")
+    db = connect(db_path)
+    queued = 0
+    try:
+        db.execute("BEGIN IMMEDIATE")
+        for argv, cwd, label in jobs:
+            key = json.dumps(argv)
+            cursor = db.execute(
+                "INSERT INTO jobs (tool, argv, cwd, label, created) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (argv) DO UPDATE SET status = 'queued', attempts = 0, error = NULL "
+                "WHERE status = 'failed'",
+                (tool, key, cwd, label, time.time()))
+            queued += cursor.rowcount
+        db.execute("COMMIT")
+    finally:
+        db.close()
+    return queued
+
+def reap(db, timeout, max_attempts):
+    """Give the jobs of workers that stopped heartbeating back to the queue (or fail them)."""
+    cutoff = time.time() - timeout
+    db.execute("UPDATE jobs SET status = 'failed', worker = NULL, finished = ?, "
+               "error = 'worker stopped responding ' || attempts || ' time(s)' "
+               "WHERE status = 'running' AND heartbeat < ? AND attempts >= ?", (time.time(), cutoff, max_attempts))
+    return db.execute("UPDATE jobs SET status = 'queued', worker = NULL "
+                      "WHERE status = 'running' AND heartbeat < ?", (cutoff,)).rowcount
+
+def claim(db, worker, timeout, max_attempts):
+    """Atomically take the oldest queued job for `worker`. Returns the job row, or None."""
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        requeued = reap(db, timeout, max_attempts)
+        if requeued:
+            log(f"♻️ Requeued {requeued} job(s) from unresponsive workers")
+        row = db.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+        if row is not None:
+            now = time.time()
+            db.execute("UPDATE jobs SET status = 'running', worker = ?, heartbeat = ?, started = ?, "
+                       "attempts = attempts + 1 WHERE id = ?", (worker, now, now, row["id"]))
+        db.execute("COMMIT")
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+    return row
+
+def finish(db, job_id, worker, returncode, error=None):
+    """Record a job's result, unless another worker has taken it over in the meantime."""
+    status = "done" if returncode == 0 else "failed"
+    db.execute("UPDATE jobs SET status = ?, returncode = ?, error = ?, finished = ?, heartbeat = NULL "
+               "WHERE id = ? AND worker = ?", (status, returncode, error, time.time(), job_id, worker))
+
+def beat(db_path, job_id, worker, interval, stop, lost):
+    """Heartbeat thread: refresh the job's heartbeat until `stop` is set; set `lost` if the job was taken away."""
+    db = connect(db_path)
+    try:
+        while not stop.wait(interval):
+            try:
+                updated = db.execute("UPDATE jobs SET heartbeat = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                                     (time.time(), job_id, worker)).rowcount
+            except sqlite3.OperationalError as e:
+                log(f"⚠️ Heartbeat for job {job_id} failed: {e}")
+                continue
+            if not updated:
+                lost.set()
+                return
+    finally:
+        db.close()
+
+def run_job(db_path, job, worker, heartbeat):
+    """Run one claimed job as a child process while heartbeating. Returns the exit code."""
+    cmd = [sys.executable, TOOLS[job["tool"]], *json.loads(job["argv"])]
+    stop, lost = threading.Event(), threading.Event()
+    beater = threading.Thread(target=beat, args=(db_path, job["id"], worker, heartbeat, stop, lost), daemon=True)
+    proc = subprocess.Popen(cmd, cwd=job["cwd"], stdin=subprocess.DEVNULL)
+    beater.start()
+    try:
+        while proc.poll() is None:
+            if lost.is_set():
+                # Another worker requeued and took this job (we looked dead); don't race it on the output
+                log(f"⚠️ Job {job['id']} was reassigned, stopping it here")
+                proc.terminate()
+                proc.wait()
+                break
+            time.sleep(0.5)
+    except BaseException:
+        proc.terminate()
+        proc.wait()
+        raise
+    finally:
+        stop.set()
+        beater.join()
+    return None if lost.is_set() else proc.returncode
+
+def work(db_path, worker=None, heartbeat=10.0, timeout=60.0, max_attempts=3, poll=5.0, exit_when_empty=False):
+    """Claim and run jobs until interrupted (or, with `exit_when_empty`, until the queue is empty)."""
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    db = connect(db_path)
+    log(f"👷 Worker {worker} started on {db_path}")
+    done = 0
+    try:
+        while True:
+            job = claim(db, worker, timeout, max_attempts)
+            if job is None:
+                if exit_when_empty and not db.execute(
+                        "SELECT 1 FROM jobs WHERE status = 'running' LIMIT 1").fetchone():
+                    break
+                time.sleep(poll)
+                continue
+
+            log(f"🚀 [{worker}] job {job['id']}: {job['tool']} {job['label'] or ''}")
+            start = time.perf_counter()
+            try:
+                returncode = run_job(db_path, job, worker, heartbeat)
+            except OSError as e:
+                finish(db, job["id"], worker, -1, str(e))
+                log(f"❌ [{worker}] job {job['id']} could not start: {e}")
+                continue
+            if returncode is None:
+                continue
+            finish(db, job["id"], worker, returncode, None if returncode == 0 else f"exit code {returncode}")
+            done += 1
+            seconds = time.perf_counter() - start
+            if returncode == 0:
+                log(f"✅ [{worker}] job {job['id']} done ({seconds:.1f}s)")
+            else:
+                log(f"❌ [{worker}] job {job['id']} failed with exit code {returncode} ({seconds:.1f}s)")
+    except KeyboardInterrupt:
+        log(f"🛑 Worker {worker} stopping")
+    finally:
+        db.close()
+    return done
+
+def status(db_path):
+    db = connect(db_path)
+    try:
+        counts = dict(db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        print("  ".join(f"{name}: {counts.get(name, 0)}" for name in ("queued", "running", "done", "failed")))
+        now = time.time()
+        for row in db.execute("SELECT * FROM jobs WHERE status IN ('running', 'failed') ORDER BY id"):
+            if row["status"] == "running":
+                print(f"⏳ {row['id']:>5} {row['label']}  on {row['worker']}, "
+                      f"{now - row['started']:.0f}s, last heartbeat {now - row['heartbeat']:.0f}s ago")
+            else:
+                print(f"❌ {row['id']:>5} {row['label']}  {row['error']} (attempts: {row['attempts']})")
+    finally:
+        db.close()
+
+def requeue(db_path):
+    db = connect(db_path)
+    try:
+        count = db.execute("UPDATE jobs SET status = 'queued', attempts = 0, error = NULL, worker = NULL "
+                           "WHERE status = 'failed'").rowcount
+    finally:
+        db.close()
+    print(f"♻️ Requeued {count} failed job(s)")
+
+def claim_all(db_path, worker, log_path):
+    """check() worker: claim and finish jobs until none are left, logging each claimed job id."""
+    db = connect(db_path)
+    try:
+        with open(log_path, "w") as claimed:
+            while (job := claim(db, worker, 60.0, 3)) is not None:
+                claimed.write(f"{job['id']}\n")
+                finish(db, job["id"], worker, 0)
+    finally:
+        db.close()
+
+def check(workers=4, jobs=200):
+    """
+    Self-check of the queue on this host: `workers` processes race for
+    `jobs` jobs (each must be claimed exactly once), then a worker that
+    stops heartbeating has its job requeued, its late result ignored, and
+    the job failed once it runs out of attempts. Returns True if all passed.
+    """
+    failures = []
+    def expect(condition, message):
+        print(f"{'✅' if condition else '❌'} {message}")
+        if not condition:
+            failures.append(message)
+
+    with tempfile.TemporaryDirectory(prefix="adtools_queue_check_") as tmp:
+        db_path = os.path.join(tmp, "queue.db")
+        enqueue(db_path, "master", [([f"input{i}.wav", f"output{i}.wav"], tmp, f"job {i}") for i in range(jobs)])
+        logs = [os.path.join(tmp, f"worker{n}.log") for n in range(workers)]
+        processes = [Process(target=claim_all, args=(db_path, f"check:{n}", log)) for n, log in enumerate(logs)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        claimed = [int(line) for log in logs if os.path.exists(log) for line in open(log)]
+        expect(len(claimed) == jobs and len(set(claimed)) == jobs,
+               f"{workers} workers claimed {len(set(claimed))} of {jobs} jobs, {len(claimed) - len(set(claimed))} twice")
+        db = connect(db_path)
+        try:
+            done = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'done' AND attempts = 1").fetchone()[0]
+            expect(done == jobs, f"{done} of {jobs} jobs done on their first attempt")
+
+            timeout, max_attempts = 60.0, 2
+            enqueue(db_path, "master", [(["stalled.wav", "stalled_out.wav"], tmp, "stalled")])
+            def stall(job):
+                db.execute("UPDATE jobs SET heartbeat = ? WHERE id = ?", (time.time() - timeout - 1, job["id"]))
+
+            job = claim(db, "check:dead", timeout, max_attempts)
+            stall(job)
+            retry = claim(db, "check:live", timeout, max_attempts)
+            expect(retry is not None and retry["id"] == job["id"], "a job without heartbeat is requeued and claimed again")
+            finish(db, job["id"], "check:dead", 0)
+            row = db.execute("SELECT status, worker FROM jobs WHERE id = ?", (job["id"],)).fetchone()
+            expect(row["status"] == "running" and row["worker"] == "check:live",
+                   "the result of the worker that lost the job is ignored")
+            stall(job)
+            expect(claim(db, "check:next", timeout, max_attempts) is None, "nothing is claimable after the last attempt")
+            row = db.execute("SELECT status, attempts FROM jobs WHERE id = ?", (job["id"],)).fetchone()
+            expect(row["status"] == "failed" and row["attempts"] == max_attempts,
+                   f"the job is failed after {max_attempts} attempts")
+        finally:
+            db.close()
+    return not failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared SQLite job queue for running master/burn jobs on several nodes")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    work_parser = commands.add_parser("work", help="Run a worker that claims and processes jobs")
+    work_parser.add_argument("db", help="Queue database on shared storage")
+    work_parser.add_argument("-n", "--workers", type=int, default=1, help="Worker processes on this node (default: 1)")
+    work_parser.add_argument("--heartbeat", type=float, default=10.0, help="Seconds between heartbeats (default: 10)")
+    work_parser.add_argument("--timeout", type=float, default=60.0,
+                             help="Seconds without a heartbeat before a job is requeued (default: 60)")
+    work_parser.add_argument("--max-attempts", type=int, default=3, help="Tries per job before it is failed (default: 3)")
+    work_parser.add_argument("--poll", type=float, default=5.0, help="Seconds between checks of an empty queue (default: 5)")
+    work_parser.add_argument("--exit-when-empty", action="store_true", help="Stop once no jobs are queued or running")
+
+    status_parser = commands.add_parser("status", help="Show job counts, running and failed jobs")
+    status_parser.add_argument("db")
+    requeue_parser = commands.add_parser("requeue", help="Queue failed jobs again")
+    requeue_parser.add_argument("db")
+    check_parser = commands.add_parser("check", help="Check claiming and requeueing with several workers on this host")
+    check_parser.add_argument("-n", "--workers", type=int, default=4, help="Competing worker processes (default: 4)")
+    check_parser.add_argument("--jobs", type=int, default=200, help="Jobs to race for (default: 200)")
+    args = parser.parse_args()
+
+    if args.command == "check":
+        if not check(args.workers, args.jobs):
+            sys.exit(1)
+        return
+
+    if args.command == "status":
+        status(args.db)
+        return
+    if args.command == "requeue":
+        requeue(args.db)
+        return
+
+    options = dict(heartbeat=args.heartbeat, timeout=args.timeout, max_attempts=args.max_attempts,
+                   poll=args.poll, exit_when_empty=args.exit_when_empty)
+    connect(args.db).close()  # Create the schema once, before the workers race for it
+    if args.workers == 1:
+        work(args.db, **options)
+        return
+    workers = [Process(target=work, args=(args.db,), kwargs=options) for _ in range(args.workers)]
+    for process in workers:
+        process.start()
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        for process in workers:
+            process.join()
+
+if __name__ == "__main__":
+    main()
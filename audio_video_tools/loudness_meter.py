@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+
+"""
+loudness_meter.py
+
+Measures EBU R128 / ITU-R BS.1770-4 loudness in-process, without encoding
+anything, and checks the results against the `master.py` loudness profiles.
+
+Audio is streamed in blocks either straight from a PCM WAV file or from an
+FFmpeg raw float pipe (for every other format), so memory use stays flat no
+matter how long the program is. Per block, the meter:
+- K-weights every channel (two-stage biquad, filter state carried between blocks)
+- accumulates 100 ms mean-square sub-blocks used for the 400 ms momentary
+  and 3 s short-term windows
+- oversamples 4x (2x at 96 kHz) with a polyphase FIR to find the true peak
+
+Reported values:
+- Integrated loudness (LUFS), gated at -70 LUFS absolute / -10 LU relative
+- Loudness range (LU), EBU Tech 3342
+- True peak (dBTP), max momentary and max short-term loudness
+
+Examples:
+  # Measure a single file against the Broadcast TV profile
+  python loudness_meter.py mix.wav
+
+  # Check a whole delivery folder for Netflix on all cores, save a JSON report
+  python loudness_meter.py deliveries/ --profile Netflix --json report.json
+
+Dependencies:
+- NumPy and SciPy
+- FFmpeg (`ffmpeg` and `ffprobe`) for anything that isn't a PCM WAV
+"""
+
+import os
+import sys
+import json
+import wave
+import argparse
+import subprocess
+from multiprocessing import Pool
+
+from profiling import profile_from_argv, note_output, record_run
+if __name__ == "__main__":
+    profile_from_argv("--profile-run")
+
+import numpy as np
+from scipy import signal
+
+from master import PROFILES, SUPPORTED_FORMATS, get_files_from_directory
+
+# Seconds of audio decoded per block
+BLOCK_SECONDS = 10
+
+# BS.1770 channel weights, keyed by channel count (LFE is excluded)
+CHANNEL_WEIGHTS = {
+    1: [1.0],
+    2: [1.0, 1.0],
+    3: [1.0, 1.0, 1.0],
+    5: [1.0, 1.0, 1.0, 1.41, 1.41],
+    6: [1.0, 1.0, 1.0, 0.0, 1.41, 1.41],
+    8: [1.0, 1.0, 1.0, 0.0, 1.41, 1.41, 1.41, 1.41],
+}
+
+ABSOLUTE_GATE = -70.0
+INTEGRATED_RELATIVE_GATE = -10.0
+LRA_RELATIVE_GATE = -20.0
+
+def k_weighting_sos(sample_rate):
+    """
+    Return the two K-weighting biquads (high shelf, then RLB high-pass) for
+    any sample rate as a second-order-sections array.
+    """
+    # Stage 1: high shelf modelling the acoustic effect of the head
+    f0 = 1681.974450955533
+    gain = 3.999843853973347
+    q = 0.7071752369554196
+    k = np.tan(np.pi * f0 / sample_rate)
+    vh = 10 ** (gain / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = [
+        (vh + vb * k / q + k * k) / a0,
+        2 * (k * k - vh) / a0,
+        (vh - vb * k / q + k * k) / a0,
+        1.0,
+        2 * (k * k - 1) / a0,
+        (1 - k / q + k * k) / a0,
+    ]
+
+    # Stage 2: revised low-frequency B-curve high-pass
+    f0 = 38.13547087602444
+    q = 0.5003270373238773
+    k = np.tan(np.pi * f0 / sample_rate)
+    a0 = 1 + k / q + k * k
+    highpass = [
+        1.0, -2.0, 1.0,
+        1.0,
+        2 * (k * k - 1) / a0,
+        (1 - k / q + k * k) / a0,
+    ]
+    return np.array([shelf, highpass])
+
+def true_peak_phases(sample_rate):
+    """Return the polyphase interpolation filters used for true-peak detection."""
+    if sample_rate >= 192000:
+        return [np.array([1.0])]
+    factor = 4 if sample_rate < 96000 else 2
+    taps = signal.firwin(12 * factor, 1.0 / factor, window=("kaiser", 8.0)) * factor
+    return [taps[phase::factor] for phase in range(factor)]
+
+def read_wav_blocks(path, block_frames):
+    """
+    Yield (sample_rate, float32 array of shape (frames, channels)) blocks from a
+    PCM WAV file. Raises wave.Error for anything the `wave` module can't read.
+    """
+    with wave.open(path, "rb") as wav:
+        sample_rate = wav.getframerate()
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        while True:
+            raw = wav.readframes(block_frames)
+            if not raw:
+                break
+            if width == 1:
+                data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+            elif width == 2:
+                data = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+            elif width == 3:
+                # Pad each 24-bit sample into the top of an int32 to keep the sign
+                packed = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+                padded = np.zeros((packed.shape[0], 4), dtype=np.uint8)
+                padded[:, 1:] = packed
+                data = padded.view("<i4").ravel().astype(np.float32) / 2147483648
+            elif width == 4:
+                data = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648
+            else:
+                raise wave.Error(f"unsupported sample width: {width}")
+            yield sample_rate, data.reshape(-1, channels)
+
+def probe_audio(path):
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "a:0",
+         "-show_entries", "stream=sample_rate,channels", "-of", "json", path],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    streams = json.loads(result.stdout or "{}").get("streams", [])
+    if not streams:
+        raise ValueError(f"No audio stream found in {path}")
+    return int(streams[0]["sample_rate"]), int(streams[0]["channels"])
+
+def read_ffmpeg_blocks(path, block_frames):
+    """Yield (sample_rate, float32 block) by decoding the first audio stream through FFmpeg."""
+    sample_rate, channels = probe_audio(path)
+    block_bytes = block_frames * channels * 4
+    proc = subprocess.Popen(
+        # -xerror: FFmpeg otherwise exits 0 after decoding what it can of a truncated file
+        ["ffmpeg", "-v", "error", "-xerror", "-i", path, "-map", "0:a:0", "-vn",
+         "-f", "f32le", "-acodec", "pcm_f32le", "-"],
+        stdout=subprocess.PIPE
+    )
+    try:
+        while True:
+            raw = proc.stdout.read(block_bytes)
+            if not raw:
+                break
+            usable = len(raw) - len(raw) % (channels * 4)
+            yield sample_rate, np.frombuffer(raw[:usable], dtype="<f4").reshape(-1, channels)
+    finally:
+        proc.stdout.close()
+        proc.wait()
+    # A truncated or corrupt source must not pass as a measurement of the part that decoded
+    if proc.returncode != 0:
+        raise RuntimeError(f"FFmpeg failed to decode {path} (exit code {proc.returncode})")
+
+def read_blocks(path):
+    """Stream a file as float blocks, reading WAVs directly and everything else via FFmpeg."""
+    if path.lower().endswith(".wav"):
+        try:
+            with wave.open(path, "rb") as wav:
+                block_frames = wav.getframerate() * BLOCK_SECONDS
+                readable = wav.getsampwidth() in (1, 2, 3, 4)
+        except (wave.Error, EOFError):
+            readable = False  # Float or extensible WAV, let FFmpeg decode it
+        if readable:
+            # Only the header decides: an error partway through must not restart the measurement through FFmpeg
+            yield from read_wav_blocks(path, block_frames)
+            return
+    yield from read_ffmpeg_blocks(path, 48000 * BLOCK_SECONDS)
+
+def power_to_lufs(power):
+    with np.errstate(divide="ignore"):
+        return -0.691 + 10 * np.log10(power)
+
+def moving_mean(values, window):
+    if len(values) < window:
+        return np.empty(0)
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    return (cumulative[window:] - cumulative[:-window]) / window
+
+def gated_loudness(block_powers, relative_gate):
+    """Apply the absolute and relative gates and return (gated powers, relative threshold)."""
+    above_absolute = block_powers[power_to_lufs(block_powers) > ABSOLUTE_GATE]
+    if not len(above_absolute):
+        return above_absolute, None
+    threshold = power_to_lufs(above_absolute.mean()) + relative_gate
+    return above_absolute[power_to_lufs(above_absolute) > threshold], threshold
+
+def measure_file(path):
+    """
+    Measure one file. Returns a dict with integrated loudness, LRA, true peak,
+    max momentary/short-term loudness and duration.
+    """
+    sos = zi = phases = phase_states = weights = None
+    sample_rate = hop = 0
+    leftover = None
+    sub_blocks = []
+    peak = 0.0
+    frames = 0
+
+    for rate, block in read_blocks(path):
+        if sos is None:
+            sample_rate = rate
+            channels = block.shape[1]
+            weights = np.array(CHANNEL_WEIGHTS.get(channels, [1.0] * channels))
+            sos = k_weighting_sos(sample_rate)
+            zi = np.zeros((sos.shape[0], 2, channels))
+            phases = true_peak_phases(sample_rate)
+            phase_states = [np.zeros((len(taps) - 1, channels)) for taps in phases]
+            hop = sample_rate // 10
+            leftover = np.empty((0, channels))
+
+        block = block.astype(np.float64)
+        frames += len(block)
+
+        # True peak: run every interpolation phase over the block
+        for i, taps in enumerate(phases):
+            if len(taps) == 1:
+                peak = max(peak, float(np.abs(block).max()))
+                continue
+            interpolated, phase_states[i] = signal.lfilter(taps, [1.0], block, axis=0, zi=phase_states[i])
+            peak = max(peak, float(np.abs(interpolated).max()))
+
+        # K-weighting, then 100 ms mean-square sub-blocks
+        weighted, zi = signal.sosfilt(sos, block, axis=0, zi=zi)
+        weighted = np.concatenate((leftover, weighted))
+        usable = len(weighted) - len(weighted) % hop
+        leftover = weighted[usable:]
+        if usable:
+            squares = (weighted[:usable] ** 2).reshape(-1, hop, weighted.shape[1]).mean(axis=1)
+            sub_blocks.append(squares @ weights)
+
+    if sos is None:
+        raise ValueError(f"No audio decoded from {path}")
+
+    powers = np.concatenate(sub_blocks) if sub_blocks else np.empty(0)
+    momentary = moving_mean(powers, 4)
+    short_term = moving_mean(powers, 30)
+
+    gated, _ = gated_loudness(momentary, INTEGRATED_RELATIVE_GATE)
+    integrated = float(power_to_lufs(gated.mean())) if len(gated) else float("-inf")
+
+    gated_short, _ = gated_loudness(short_term, LRA_RELATIVE_GATE)
+    if len(gated_short):
+        low, high = np.percentile(power_to_lufs(gated_short), [10, 95])
+        loudness_range = float(high - low)
+    else:
+        loudness_range = 0.0
+
+    return {
+        "file": path,
+        "duration": frames / sample_rate,
+        "integrated": round(integrated, 2),
+        "lra": round(loudness_range, 2),
+        "true_peak": round(float(20 * np.log10(peak)) if peak > 0 else float("-inf"), 2),
+        "max_momentary": round(float(power_to_lufs(momentary.max())), 2) if len(momentary) else None,
+        "max_short_term": round(float(power_to_lufs(short_term.max())), 2) if len(short_term) else None,
+    }
+
+def check_profile(result, profile, tolerance=1.0):
+    """
+    Compare a measurement with a loudness profile from `master.py`.
+    Returns a list of failure messages; an empty list means compliant.
+    """
+    failures = []
+    if abs(result["integrated"] - profile["LUFS"]) > tolerance:
+        failures.append(f"integrated {result['integrated']} LUFS outside {profile['LUFS']} ±{tolerance}")
+    if result["true_peak"] > profile["TP"]:
+        failures.append(f"true peak {result['true_peak']} dBTP above {profile['TP']}")
+    if result["lra"] > profile["LRA"]:
+        failures.append(f"LRA {result['lra']} LU above {profile['LRA']}")
+    return failures
+
+def _measure_safely(path):
+    try:
+        return measure_file(path)
+    except Exception as e:
+        return {"file": path, "error": str(e)}
+
+def measure_paths(paths, jobs=None):
+    """Measure many files in parallel, one file per worker process."""
+    if len(paths) == 1:
+        return [_measure_safely(paths[0])]
+    with Pool(processes=jobs or os.cpu_count()) as pool:
+        return pool.map(_measure_safely, paths, chunksize=1)
+
+def report(results, profile_name, tolerance=1.0):
+    """Print a compliance line per result and return True when everything passes."""
+    profile = PROFILES[profile_name]
+    all_ok = True
+    for result in results:
+        name = os.path.basename(result["file"])
+        if "error" in result:
+            print(f"❌ {name}: {result['error']}")
+            all_ok = False
+            continue
+        failures = check_profile(result, profile, tolerance)
+        result["profile"] = profile_name
+        result["compliant"] = not failures
+        summary = f"I={result['integrated']} LUFS  LRA={result['lra']} LU  TP={result['true_peak']} dBTP"
+        if failures:
+            all_ok = False
+            print(f"❌ {name}: {summary} — {'; '.join(failures)}")
+        else:
+            print(f"✅ {name}: {summary}")
+    return all_ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure EBU R128 loudness and check it against a mastering profile")
+    parser.add_argument("input", help="Input file or directory")
+    parser.add_argument("--profile", default="Broadcast TV", choices=list(PROFILES),
+                        help="Loudness profile to check against")
+    parser.add_argument("--tolerance", type=float, default=1.0,
+                        help="Allowed deviation from the target integrated loudness in LU (default: 1.0)")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--json", help="Write the measurements to this JSON file")
+    # --profile-run (cProfile/memory/import timing) is handled by profiling.py before argparse runs
+    args = parser.parse_args()
+
+    if os.path.isdir(args.input):
+        paths = sorted(get_files_from_directory(args.input))
+    elif os.path.isfile(args.input):
+        paths = [args.input]
+    else:
+        print("Invalid input. Please specify a valid file or directory.")
+        sys.exit(1)
+
+    if not paths:
+        print(f"No files matching {', '.join(SUPPORTED_FORMATS)} found.")
+        sys.exit(1)
+
+    note_output(args.json)
+    results = measure_paths(paths, args.jobs)
+    ok = report(results, args.profile, args.tolerance)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Report saved to {args.json}")
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    with record_run():
+        main()
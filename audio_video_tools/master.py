@@ -1,58 +1,225 @@
 #!/usr/bin/env python3
 
 import os
+import sys
 import argparse
-import subprocess
+
+from ffmpeg_runner import run_ffmpeg
+from build_cache import build_key, up_to_date, record_build, forget_build
+from batch_journal import BatchJournal, staged_outputs
+from fast_path import plan_audio, codec_args
+import staging
+from profiling import profile_from_argv, note_output, record_run
+if __name__ == "__main__":
+    profile_from_argv("--profile-run")
 
 # Supported input/output formats
 SUPPORTED_FORMATS = ['.mp4', '.mkv', '.wav', '.mp3', '.aac', '.eac3', '.m4a', '.ac3']
 
-def process_file(input_file, output_file, profile, aggressive_compression, audio_format, bitrate, highpass, samplerate):
+# Pre-defined loudness profiles
+PROFILES = {
+    "Broadcast TV": {"LUFS": -24, "TP": -2, "LRA": 6},
+    "Streaming Platforms": {"LUFS": -16, "TP": -1, "LRA": 6},
+    "Netflix": {"LUFS": -27, "TP": -2, "LRA": 10},
+    "YouTube": {"LUFS": -14, "TP": -1, "LRA": 8},
+    "AudioVault": {"LUFS": -16.3, "TP": -2.6, "LRA": 5},
+}
+PROFILE_CHOICES = list(PROFILES) + ["Custom"]
+
+# Output format -> FFmpeg audio codec, for the --skip-compliant stream copy
+FORMAT_CODECS = {"aac": "aac", "eac3": "eac3", "mp3": "mp3", "wav": "pcm_s24le"}
+
+def master_filters(profile, aggressive_compression, highpass):
     """
-    Process an individual file by extracting, applying compression and loudness normalization,
-    and exporting audio to the specified format.
+    The mastering filter chain as (shared filters, loudness filter). Everything
+    before loudnorm is the same for every profile, so a multi-profile run
+    applies it once and splits only before the per-profile loudnorm.
     """
-    
-    # Base FFmpeg command for audio extraction and processing
-    ffmpeg_cmd = [
-        "ffmpeg",
-        "-i", input_file,
-    ]
-
-    # Construct audio filter chain
-    audio_filters = []
-    
+    shared = []
+
     # Apply high-pass filter at 80Hz if the switch is enabled
     if highpass:
-        audio_filters.append("highpass=f=80")
+        shared.append("highpass=f=80")
 
     # Apply aggressive compression first if enabled
     if aggressive_compression:
-        audio_filters.append("acompressor=threshold=-24dB:ratio=4:attack=5:release=150")
-    
-    # Standard compression and loudness normalization
-    audio_filters.append(f"acompressor=threshold=-18dB:ratio=3:attack=10:release=200,loudnorm=I={profile['LUFS']}:LRA={profile['LRA']}:TP={profile['TP']}")
-    
-    # Add audio filters to the FFmpeg command
-    ffmpeg_cmd += ["-af", ",".join(audio_filters)]
-
-    # Set audio codec, sample rate, and format based on user selection
+        shared.append("acompressor=threshold=-24dB:ratio=4:attack=5:release=150")
+
+    # Standard compression, then loudness normalization to the profile
+    shared.append("acompressor=threshold=-18dB:ratio=3:attack=10:release=200")
+    return shared, f"loudnorm=I={profile['LUFS']}:LRA={profile['LRA']}:TP={profile['TP']}"
+
+def encoder_args(audio_format, bitrate, samplerate):
+    """Audio codec, bitrate and sample rate options for an output format."""
     if audio_format == "aac":
-        ffmpeg_cmd += ["-c:a", "aac", "-b:a", bitrate, "-ar", str(samplerate)]
+        return ["-c:a", "aac", "-b:a", bitrate, "-ar", str(samplerate)]
     elif audio_format == "eac3":
-        ffmpeg_cmd += ["-c:a", "eac3", "-b:a", bitrate, "-ar", str(samplerate)]
+        return ["-c:a", "eac3", "-b:a", bitrate, "-ar", str(samplerate)]
     elif audio_format == "mp3":
-        ffmpeg_cmd += ["-c:a", "libmp3lame", "-q:a", "2", "-ar", str(samplerate)]
+        return ["-c:a", "libmp3lame", "-q:a", "2", "-ar", str(samplerate)]
     elif audio_format == "wav":
-        ffmpeg_cmd += ["-c:a", "pcm_s24le", "-ar", str(samplerate)]  # 24-bit WAV by default
+        return ["-c:a", "pcm_s24le", "-ar", str(samplerate)]  # 24-bit WAV by default
     else:
         raise ValueError(f"Unsupported audio format: {audio_format}")
-    
-    # Set output file path
-    ffmpeg_cmd += [output_file]
+
+def master_command(input_file, output_file, profile, aggressive_compression, audio_format, bitrate, highpass, samplerate):
+    """FFmpeg command that masters one input's first audio stream to one profile."""
+    shared, loudness = master_filters(profile, aggressive_compression, highpass)
+    return (["ffmpeg", "-y", "-i", input_file, "-map", "0:a:0", "-af", ",".join(shared + [loudness])]
+            + encoder_args(audio_format, bitrate, samplerate) + [output_file])
+
+def multi_profile_command(input_file, targets, aggressive_compression, bitrate, highpass, samplerate):
+    """
+    One FFmpeg command for several (output file, profile, format) targets: the
+    source is decoded and run through the shared filters once, then `asplit`
+    feeds a loudnorm and encoder per target. Like master_command(), it reads
+    the first audio stream, so both produce the same audio for a profile.
+    """
+    shared, _ = master_filters(targets[0][1], aggressive_compression, highpass)
+    branches = "".join(f"[s{i}]" for i in range(len(targets)))
+    graph = [f"[0:a:0]{','.join(shared)},asplit={len(targets)}{branches}"]
+    cmd = ["ffmpeg", "-y", "-i", input_file]
+    outputs = []
+    for i, (output_file, profile, audio_format) in enumerate(targets):
+        graph.append(f"[s{i}]{master_filters(profile, aggressive_compression, highpass)[1]}[o{i}]")
+        outputs += ["-map", f"[o{i}]"] + encoder_args(audio_format, bitrate, samplerate) + [output_file]
+    return cmd + ["-filter_complex", ";".join(graph)] + outputs
+
+def measure_loudness(input_file):
+    """
+    Loudness measurement of a source, for --skip-compliant, or None when it
+    can't be measured (the source is then mastered as usual). With staging
+    on, the staged local copy is measured, so the source is read from the
+    network only once.
+    """
+    # Imported here so normal mastering runs don't need NumPy/SciPy
+    from loudness_meter import measure_file
+
+    stager = staging.current()
+    source = stager.localize_inputs(["-i", input_file])[1] if stager else input_file
+    try:
+        return measure_file(source)
+    except Exception as e:
+        print(f"⚠️ Could not measure {os.path.basename(input_file)} ({e}); mastering it")
+        return None
+
+def parse_bitrate(bitrate):
+    """Bits per second from an FFmpeg bitrate like "192k", "1.5M" or "192000"."""
+    scale = {"k": 1000, "m": 1000000}.get(bitrate[-1:].lower(), 1)
+    return int(float(bitrate[:-1] if scale > 1 else bitrate) * scale)
+
+def source_bitrate(info):
+    """Bit rate of a probed source's audio; the container's only counts for an audio-only file. None when unknown."""
+    audio = info["audio"][0]
+    if audio.get("bit_rate"):
+        return audio["bit_rate"]
+    return info.get("bit_rate") if info.get("streams") == 1 else None
+
+def copy_command(input_file, output_file, audio_format, bitrate, samplerate, info):
+    """
+    The stream-copy command for a source that is already in the output's
+    codec and sample rate (or only needs a lossless PCM sample format
+    change), otherwise None. A lossy source is only copied when its bit
+    rate is known and no higher than `bitrate`. Whether the source also
+    meets the loudness profile is up to the caller.
+    """
+    codec = FORMAT_CODECS[audio_format]
+    mode, _ = plan_audio(info, codec, samplerate, os.path.splitext(output_file)[1])
+    if mode == "transcode":
+        return None
+    if audio_format != "wav" and (source_bitrate(info) or float("inf")) > parse_bitrate(bitrate):
+        return None
+    return ["ffmpeg", "-y", "-i", input_file] + codec_args(mode, codec) + [output_file]
+
+def process_file(input_file, output_file, profile, aggressive_compression, audio_format, bitrate, highpass, samplerate, force=False, journal=None, skip_compliant=False, info=None):
+    """
+    Process an individual file by extracting, applying compression and loudness normalization,
+    and exporting audio to the specified format. Skipped when the output is up to date with
+    the same input content and settings, unless `force` is set.
+    """
+    process_file_profiles(input_file, [(output_file, profile, audio_format)], aggressive_compression,
+                          bitrate, highpass, samplerate, force, journal, skip_compliant, info)
+
+def process_file_profiles(input_file, targets, aggressive_compression, bitrate, highpass, samplerate, force=False, journal=None, skip_compliant=False, info=None):
+    """
+    Master one input to several (output file, profile, format) targets from a
+    single decode. Targets that are already up to date, or that a resumed
+    batch's journal shows as finished, are left out of the run. Outputs are
+    written under temporary names and renamed into place once complete.
+    With `skip_compliant`, targets the source already meets are stream-copied
+    instead of mastered (`info` is the source's media_scan probe, if already
+    known). The loudness is measured only once a target has to be built.
+    """
+    if skip_compliant and info is None:
+        from media_scan import probe
+
+        info = probe(input_file)
+    measurement = {}
+
+    def meets(profile):
+        from loudness_meter import check_profile
+
+        if "result" not in measurement:
+            measurement["result"] = measure_loudness(input_file)
+        return measurement["result"] is not None and not check_profile(measurement["result"], profile)
+
+    pending = []
+    for output_file, profile, audio_format in targets:
+        # The single-profile command holds every setting of a target, so it doubles as its build cache parameters
+        cmd = master_command(input_file, output_file, profile, aggressive_compression, audio_format, bitrate, highpass, samplerate)
+        copy = skip_compliant and copy_command(input_file, output_file, audio_format, bitrate, samplerate, info)
+        # Done as a master or as a copy: either way there is nothing to build or measure
+        commands = [cmd] + ([copy] if copy else [])
+        if journal and any(journal.completed(output_file, command) for command in commands):
+            print(f"⏩ Skipping {os.path.basename(output_file)} (already done in this batch)")
+            continue
+        keys = [build_key("master", [input_file], command, versions=[__file__], ffmpeg=True) for command in commands]
+        if not force and any(up_to_date(output_file, key) for key in keys):
+            print(f"⏩ Skipping {os.path.basename(output_file)} (up to date)")
+            continue
+        if copy and meets(profile):
+            # Already compliant and in the output's format: nothing to master, so a copy at disk speed
+            print(f"⏩ {os.path.basename(input_file)} already meets the profile; copying to {os.path.basename(output_file)}")
+            forget_build(output_file)
+            with staged_outputs([output_file], copy, journal, on_commit=lambda output_file=output_file, key=keys[1]: record_build(output_file, key)) as staged_cmd:
+                run_ffmpeg(staged_cmd, stage="copy")
+            continue
+        pending.append((output_file, profile, audio_format, cmd, keys[0]))
+    if not pending:
+        return
+
+    if len(pending) == 1:
+        ffmpeg_cmd = pending[0][3]
+    else:
+        ffmpeg_cmd = multi_profile_command(input_file, [target[:3] for target in pending],
+                                           aggressive_compression, bitrate, highpass, samplerate)
 
     # Execute the FFmpeg command and check for errors
-    subprocess.run(ffmpeg_cmd, check=True)
+    for output_file, *_ in pending:
+        forget_build(output_file)
+    def record_builds():
+        for output_file, _, _, _, key in pending:
+            record_build(output_file, key)
+
+    with staged_outputs([target[0] for target in pending], ffmpeg_cmd, journal, [target[3] for target in pending],
+                        on_commit=record_builds) as staged_cmd:
+        run_ffmpeg(staged_cmd, stage="master")
+
+def output_format(profile_name, forced_ext, requested_format):
+    """Format for a profile's output: the output file's extension wins, AudioVault is always MP3."""
+    if forced_ext:
+        return forced_ext[1:]  # Strip the dot from extension
+    if profile_name == "AudioVault":
+        return "mp3"
+    return requested_format or "aac"
+
+def profile_targets(base, profile_names, profiles, forced_ext, requested_format):
+    """(output file, profile, format) per profile of a multi-profile run, named <base>_<profile>.<format>."""
+    targets = []
+    for name in profile_names:
+        audio_format = output_format(name, forced_ext, requested_format)
+        targets.append((f"{base}_{name.lower().replace(' ', '_')}.{audio_format}", profiles[name], audio_format))
+    return targets
 
 def get_files_from_directory(directory):
     """
@@ -65,14 +232,30 @@ def get_files_from_directory(directory):
                 files.append(os.path.join(root, filename))
     return files
 
+def enqueue_jobs(args, pairs):
+    """Queue a single-file master.py run, with every setting, for each (input, output) pair."""
+    from job_queue import enqueue
+
+    options = ["--profile", args.profile, "--bitrate", args.bitrate, "--samplerate", str(args.samplerate)]
+    options += ["--aggressive"] * args.aggressive + ["--highpass"] * args.highpass + ["--force"] * args.force
+    options += ["--skip-compliant"] * args.skip_compliant
+    jobs = []
+    for input_file, output_file in pairs:
+        argv = [os.path.abspath(input_file), os.path.abspath(output_file)] + options
+        if os.path.splitext(output_file)[1].lower() not in SUPPORTED_FORMATS and args.format:
+            argv += ["--format", args.format]
+        jobs.append((argv, os.getcwd(), os.path.basename(input_file)))
+    print(f"📥 Queued {enqueue(args.enqueue, 'master', jobs)} of {len(jobs)} job(s) in {args.enqueue}")
+
 def main():
     # Argument parser setup
     parser = argparse.ArgumentParser(description="Batch Mastering Script for Audio/Video Files")
     parser.add_argument("input", help="Input file or directory to process")
-    parser.add_argument("output", help="Output file or directory for processed audio")
+    parser.add_argument("output", nargs="?", help="Output file or directory for processed audio")
     parser.add_argument("--profile", type=str, default="Broadcast TV",
-                        choices=["Broadcast TV", "Streaming Platforms", "Netflix", "YouTube", "AudioVault", "Custom"],
-                        help="Select loudness profile for normalization")
+                        help=f"Loudness profile for normalization: {', '.join(PROFILE_CHOICES)}. "
+                             "Several comma-separated profiles are mastered from one decode, "
+                             "each to <output>_<profile>.<format>")
     parser.add_argument("--format", type=str, default=None,
                         choices=["aac", "mp3", "eac3", "wav"],
                         help="Output audio format (overridden if output filename has an extension)")
@@ -84,19 +267,60 @@ def main():
                         help="Apply aggressive compression before normalization")
     parser.add_argument("--highpass", action="store_true",
                         help="Apply high-pass filter at 80Hz to remove subwoofer content")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-master files even if their output is up to date")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted folder batch from its journal, skipping the files it finished")
+    parser.add_argument("--measure", action="store_true",
+                        help="Only measure loudness and report compliance with the profile, without encoding")
+    parser.add_argument("--skip-compliant", action="store_true",
+                        help="Measure each source first and stream-copy it, instead of mastering, when it already "
+                             "meets the profile in the output's codec and sample rate, at no more than --bitrate. "
+                             "Copied files skip compression and the high-pass filter")
+    parser.add_argument("--enqueue", metavar="QUEUE_DB", default=None,
+                        help="Add one job per file to a shared job queue (see job_queue.py) instead of processing here")
+    staging.add_arguments(parser)
+    # --profile-run (cProfile/memory/import timing) is handled by profiling.py before argparse runs
     args = parser.parse_args()
 
-    # Pre-defined loudness profiles
-    profiles = {
-        "Broadcast TV": {"LUFS": -24, "TP": -2, "LRA": 6},
-        "Streaming Platforms": {"LUFS": -16, "TP": -1, "LRA": 6},
-        "Netflix": {"LUFS": -27, "TP": -2, "LRA": 10},
-        "YouTube": {"LUFS": -14, "TP": -1, "LRA": 8},
-        "AudioVault": {"LUFS": -16.3, "TP": -2.6, "LRA": 5},
-    }
+    profile_names = list(dict.fromkeys(name.strip() for name in args.profile.split(",") if name.strip()))
+    unknown = [name for name in profile_names if name not in PROFILE_CHOICES]
+    if unknown or not profile_names:
+        parser.error(f"unknown profile(s): {', '.join(unknown) or 'none given'} (choose from {', '.join(PROFILE_CHOICES)})")
+
+    if args.measure:
+        # Imported here so normal mastering runs don't need NumPy/SciPy
+        from loudness_meter import measure_paths, report
+
+        if "Custom" in profile_names:
+            parser.error("--measure needs one of the pre-defined profiles")
+        if os.path.isdir(args.input):
+            files = get_files_from_directory(args.input)
+        elif os.path.isfile(args.input):
+            files = [args.input]
+        else:
+            print("Invalid input. Please specify a valid file or directory.")
+            sys.exit(1)
+        results = measure_paths(files)
+        ok = True
+        for name in profile_names:
+            if len(profile_names) > 1:
+                print(f"\n{name}:")
+            ok = report(results, name) and ok
+        if not ok:
+            sys.exit(1)
+        return
+
+    if not args.output:
+        parser.error("the following arguments are required: output")
+    note_output(args.output)
+
+    profiles = dict(PROFILES)
 
     # Custom profile input handling
-    if args.profile == "Custom":
+    if "Custom" in profile_names and args.enqueue:
+        parser.error("--enqueue needs one of the pre-defined profiles (workers can't answer the Custom prompts)")
+    if "Custom" in profile_names:
         lufs = float(input("Enter target LUFS: "))
         tp = float(input("Enter true peak (dBTP): "))
         lra = float(input("Enter loudness range (LRA): "))
@@ -110,30 +334,50 @@ def main():
 
     # Determine output format
     output_ext = os.path.splitext(args.output)[1].lower()
-    if output_ext in SUPPORTED_FORMATS:
-        args.format = output_ext[1:]  # Strip the dot from extension
-    elif args.profile == "AudioVault":
-        args.format = "mp3"  # Force MP3 for AudioVault if no extension overrides it
-    elif args.format is None:
-        args.format = "aac"  # Default format if nothing is specified
+    forced_ext = output_ext if output_ext in SUPPORTED_FORMATS else ""
+    single_format = output_format(profile_names[0], forced_ext, args.format)
+
+    def master(input_file, output, journal=None, info=None):
+        """Master one input: `output` is the output file, or with several profiles the base name of the outputs."""
+        if len(profile_names) == 1:
+            process_file(input_file, output, profiles[profile_names[0]], args.aggressive, single_format, args.bitrate, args.highpass, args.samplerate, args.force, journal, args.skip_compliant, info)
+        else:
+            targets = profile_targets(output, profile_names, profiles, forced_ext, args.format)
+            process_file_profiles(input_file, targets, args.aggressive, args.bitrate, args.highpass, args.samplerate, args.force, journal, args.skip_compliant, info)
 
     # Determine if input is a directory or single file
     if os.path.isdir(args.input):
-        files = get_files_from_directory(args.input)
+        # Probe the whole folder up front so unreadable or audio-less files are rejected before any encoding
+        from media_scan import validate_inputs
+
+        infos = validate_inputs(get_files_from_directory(args.input))
+        files = [info["file"] for info in infos]
         os.makedirs(args.output, exist_ok=True)  # Ensure output directory exists
 
-        # Process each file in the directory
-        for file in files:
-            output_file = os.path.join(args.output, os.path.splitext(os.path.basename(file))[0] + f".{args.format}")
-            process_file(file, output_file, profiles[args.profile], args.aggressive, args.format, args.bitrate, args.highpass, args.samplerate)
+        outputs = [os.path.join(args.output, os.path.splitext(os.path.basename(file))[0]) for file in files]
+        if len(profile_names) == 1:
+            outputs = [output + f".{single_format}" for output in outputs]
+        if args.enqueue:
+            enqueue_jobs(args, zip(files, outputs))
+            return
+
+        # Process each file in the directory, journaling the batch so an interrupted run can be resumed
+        with BatchJournal(args.output, "master", resume=args.resume) as journal, \
+                staging.staging(files, args.stage_dir, args.stage_ahead, args.stage_budget):
+            for info, output in zip(infos, outputs):
+                master(info["file"], output, journal, info)
     elif os.path.isfile(args.input):
+        if args.enqueue:
+            enqueue_jobs(args, [(args.input, args.output)])
+            return
         # Process single file
-        process_file(args.input, args.output, profiles[args.profile], args.aggressive, args.format, args.bitrate, args.highpass, args.samplerate)
+        master(args.input, os.path.splitext(args.output)[0] if forced_ext and len(profile_names) > 1 else args.output)
     else:
         print("Invalid input. Please specify a valid file or directory.")
-        return
+        sys.exit(1)
 
     print("Batch processing complete!")
 
 if __name__ == "__main__":
-    main()
+    with record_run():
+        main()
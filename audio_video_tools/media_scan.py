@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+
+"""
+media_scan.py
+
+Probes a batch of media files up front, before any encoding starts, and
+splits them into a validated job list and a list of rejected inputs.
+
+Every file is probed with ffprobe (format and streams, JSON output). The
+probes run concurrently on an asyncio event loop with a bounded number of
+ffprobe processes at a time (`--jobs`), so hundreds of files on a network
+share are scanned in roughly the time of the slowest few.
+
+A file is rejected when:
+- ffprobe can't read it (unreadable, truncated container, missing moov atom)
+- it has no streams or no usable duration
+- it has no audio stream (unless `--no-audio-needed`), or no video stream with `--require-video`
+- its frame rate or audio channel count doesn't match `--fps` / `--channels`
+
+Errors that ffprobe logs while still reading the file (e.g. "non-existing PPS
+0 referenced" at the start of a TS capture) are reported as warnings and
+don't reject it on their own.
+
+master.py, convert_audio.py and srt_to_sub_time_burn.py --batch run their
+folder inputs through this scan, so a bad file is reported at the start of
+the batch instead of failing halfway through it.
+
+Usage:
+  python media_scan.py deliveries/ --require-video --fps 23.976
+  python media_scan.py stems/ --channels 6 --json jobs.json
+
+Requirements:
+- FFmpeg (`ffprobe`) must be installed
+"""
+
+import os
+import sys
+import json
+import shutil
+import asyncio
+import argparse
+
+from profiling import profile_from_argv, note_output, record_run
+if __name__ == "__main__":
+    profile_from_argv()
+
+FFPROBE_CMD = ["ffprobe", "-v", "error", "-print_format", "json", "-show_format", "-show_streams"]
+MEDIA_EXTENSIONS = (".wav", ".mp3", ".aac", ".eac3", ".ac3", ".m4a", ".mp4", ".mkv", ".mov")
+
+def parse_rate(rate):
+    """Frames per second from an ffprobe rate like "24000/1001" (None when unknown)."""
+    try:
+        num, _, denom = rate.partition("/")
+        value = float(num) / float(denom or 1)
+    except (AttributeError, ValueError, ZeroDivisionError):
+        return None
+    return value if value > 0 else None
+
+def parse_duration(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def summarize(path, data):
+    """The parts of an ffprobe report the batch tools care about."""
+    fmt = data.get("format", {})
+    streams = data.get("streams", [])
+    audio = [{
+        "codec": s.get("codec_name"),
+        "channels": s.get("channels"),
+        "channel_layout": s.get("channel_layout"),
+        "sample_rate": int(s["sample_rate"]) if s.get("sample_rate") else None,
+        "sample_fmt": s.get("sample_fmt"),
+        "bits": int(s.get("bits_per_raw_sample") or s.get("bits_per_sample") or 0) or None,
+        "bit_rate": int(s["bit_rate"]) if str(s.get("bit_rate", "")).isdigit() else None,
+    } for s in streams if s.get("codec_type") == "audio"]
+    # Cover art in MP3/M4A shows up as a video stream flagged as an attached picture
+    video = [{
+        "codec": s.get("codec_name"),
+        "width": s.get("width"),
+        "height": s.get("height"),
+        "fps": parse_rate(s.get("avg_frame_rate")) or parse_rate(s.get("r_frame_rate")),
+        # The stream's nominal rate, which the burn-in timecode counts in (get_frame_rate() reads the same field)
+        "frame_rate": parse_rate(s.get("r_frame_rate")),
+    } for s in streams if s.get("codec_type") == "video" and not s.get("disposition", {}).get("attached_pic")]
+    stream_durations = [d for d in (parse_duration(s.get("duration")) for s in streams) if d]
+    return {
+        "file": path,
+        "format": fmt.get("format_name"),
+        "duration": parse_duration(fmt.get("duration")) or max(stream_durations, default=None),
+        "size": int(fmt["size"]) if fmt.get("size") else None,
+        "bit_rate": int(fmt["bit_rate"]) if str(fmt.get("bit_rate", "")).isdigit() else None,
+        "streams": len(streams),
+        "audio": audio,
+        "video": video,
+        "fps": video[0]["fps"] if video else None,
+        "frame_rate": video[0]["frame_rate"] if video else None,
+        "channels": audio[0]["channels"] if audio else None,
+        "channel_layout": audio[0]["channel_layout"] if audio else None,
+    }
+
+def check(info, require_audio=True, require_video=False, fps=None, channels=None, fps_tolerance=0.01):
+    """List the reasons a probed file can't be used (empty when it is fine)."""
+    problems = []
+    if not info["streams"]:
+        problems.append("no streams")
+    if not info["duration"]:
+        problems.append("no duration (truncated or not a media file)")
+    if require_audio and not info["audio"]:
+        problems.append("no audio stream")
+    if require_video and not info["video"]:
+        problems.append("no video stream")
+    if fps and info["video"]:
+        if info["fps"] is None:
+            problems.append("unknown frame rate")
+        elif abs(info["fps"] - fps) > fps_tolerance:
+            problems.append(f"{info['fps']:g} fps (expected {fps:g})")
+    if channels and info["audio"] and info["channels"] != channels:
+        problems.append(f"{info['channels']} audio channels (expected {channels})")
+    return problems
+
+async def probe_file(path, limit, timeout):
+    """Probe one file, holding one of the `limit` ffprobe slots while it runs."""
+    async with limit:
+        proc = await asyncio.create_subprocess_exec(
+            *FFPROBE_CMD, path, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return {"file": path, "problems": [f"ffprobe timed out after {timeout}s"]}
+
+    errors = stderr.decode(errors="replace").strip()
+    if proc.returncode != 0:
+        return {"file": path, "problems": [errors.splitlines()[-1] if errors else f"ffprobe failed ({proc.returncode})"]}
+    try:
+        info = summarize(path, json.loads(stdout or b"{}"))
+    except ValueError:
+        return {"file": path, "problems": ["unreadable ffprobe output"]}
+    # Errors logged on a successful probe (damaged frames, missing parameter sets at the start
+    # of a capture) are passed on as warnings; check() decides whether the summary is usable
+    info["warnings"] = list(dict.fromkeys(f"ffprobe: {line}" for line in errors.splitlines() if line.strip()))
+    info["problems"] = []
+    return info
+
+async def probe_all(paths, jobs, timeout):
+    limit = asyncio.Semaphore(jobs)
+    return await asyncio.gather(*(probe_file(path, limit, timeout) for path in paths))
+
+def scan(paths, jobs=None, timeout=60, **requirements):
+    """
+    Probe every path concurrently and return (accepted, rejected) lists of
+    file summaries in input order. Rejected entries carry a "problems" list.
+    `requirements` are passed to check().
+    """
+    if not paths:
+        return [], []
+    if shutil.which("ffprobe") is None:
+        raise RuntimeError("ffprobe not found; install FFmpeg")
+    accepted, rejected = [], []
+    for info in asyncio.run(probe_all([str(p) for p in paths], jobs or (os.cpu_count() or 4) * 2, timeout)):
+        if not info["problems"]:
+            info["problems"] = check(info, **requirements)
+        (rejected if info["problems"] else accepted).append(info)
+    return accepted, rejected
+
+def probe(path, timeout=60):
+    """
+    Probe one file. Returns its summary ("problems" lists probe failures, "warnings"
+    errors ffprobe logged while reading it), or None when ffprobe isn't installed.
+    """
+    if shutil.which("ffprobe") is None:
+        return None
+    return asyncio.run(probe_all([str(path)], 1, timeout))[0]
+
+def validate_inputs(paths, **requirements):
+    """Scan a batch, report what was rejected and return the accepted file summaries."""
+    if not paths:
+        return []
+    print(f"🔎 Scanning {len(paths)} file(s)...")
+    accepted, rejected = scan(paths, **requirements)
+    for info in accepted:
+        if info["warnings"]:
+            print(f"⚠️ {os.path.basename(info['file'])}: {info['warnings'][-1]}")
+    for info in rejected:
+        print(f"❌ Rejected {os.path.basename(info['file'])}: {'; '.join(info['problems'])}")
+    if rejected:
+        print(f"⚠️ {len(rejected)} of {len(paths)} file(s) rejected; continuing with {len(accepted)}.")
+    return accepted
+
+def find_media(inputs, extensions=MEDIA_EXTENSIONS):
+    """Files given directly, plus media files found (recursively) in folders."""
+    files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files.extend(os.path.join(root, name) for name in sorted(names)
+                             if name.lower().endswith(extensions) and not name.startswith("."))
+        else:
+            files.append(path)
+    return files
+
+def describe(info):
+    parts = [f"{info['duration']:.1f}s"]
+    if info["video"]:
+        video = info["video"][0]
+        parts.append(f"{video['width']}x{video['height']} @ {info['fps']:g} fps" if info["fps"] else f"{video['width']}x{video['height']}")
+    if info["audio"]:
+        parts.append(f"{len(info['audio'])} audio ({info['channel_layout'] or str(info['channels']) + ' ch'})")
+    return ", ".join(parts)
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe and validate a batch of media files with concurrent ffprobe runs.")
+    parser.add_argument("inputs", nargs="+", help="Media files and/or folders (searched recursively)")
+    parser.add_argument("--require-video", action="store_true", help="Reject files without a video stream")
+    parser.add_argument("--no-audio-needed", dest="require_audio", action="store_false",
+                        help="Accept files without an audio stream")
+    parser.add_argument("--fps", type=float, default=None, help="Reject video that isn't at this frame rate")
+    parser.add_argument("--channels", type=int, default=None, help="Reject audio without this many channels")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Concurrent ffprobe processes (default: 2x CPU count)")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds before a probe is abandoned (default: 60)")
+    parser.add_argument("--json", dest="json_file", default=None, help="Write the accepted/rejected job list to this JSON file")
+    args = parser.parse_args()
+
+    files = find_media(args.inputs)
+    if not files:
+        print("⚠️ No media files found.")
+        return
+    try:
+        accepted, rejected = scan(files, args.jobs, args.timeout, require_audio=args.require_audio,
+                                  require_video=args.require_video, fps=args.fps, channels=args.channels)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    for info in accepted:
+        print(f"✅ {info['file']}: {describe(info)}")
+        if info["warnings"]:
+            print(f"   ⚠️ {info['warnings'][-1]}")
+    for info in rejected:
+        print(f"❌ {info['file']}: {'; '.join(info['problems'])}")
+    print(f"\n{len(accepted)} accepted, {len(rejected)} rejected")
+
+    if args.json_file:
+        note_output(args.json_file)
+        with open(args.json_file, "w") as f:
+            json.dump({"accepted": accepted, "rejected": rejected}, f, indent=2)
+        print(f"📝 Job list written to {args.json_file}")
+    if rejected:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    with record_run():
+        main()
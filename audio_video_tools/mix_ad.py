@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+
+"""
+mix_ad.py
+
+Mixes an AD narration track into the program audio of a video and muxes the
+result back in as an additional audio track, all in a single FFmpeg pass.
+
+The program audio is ducked only while a cue from the AD SRT is active. Each
+cue becomes a volume envelope that starts ramping down `--attack` seconds
+before the cue, holds at `--duck` dB for the cue, and ramps back up over
+`--release` seconds after it. Video and the original audio tracks are
+stream-copied untouched. Subtitles and attachments are kept as far as the
+output container can hold them: all of them in MKV; in MP4/MOV, text
+subtitles converted to mov_text, while image subtitles (PGS, VobSub) and
+attachments are dropped; in other containers, none.
+
+Examples:
+  # Mix narration.wav into movie.mkv, ducking 12 dB under each cue
+  python mix_ad.py movie.mkv narration.wav narration.srt
+
+  # Softer duck, slower release, AAC in an MP4
+  python mix_ad.py movie.mp4 narration.wav narration.srt out.mp4 --duck -8 --release 0.8 --codec aac
+
+Dependencies:
+- FFmpeg (`ffmpeg` and `ffprobe`) must be installed
+"""
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+from ffmpeg_runner import run_ffmpeg
+from profiling import profile_from_argv, note_output, record_run
+if __name__ == "__main__":
+    profile_from_argv()
+
+MATROSKA_EXTENSIONS = (".mkv", ".mka")
+MP4_EXTENSIONS = (".mp4", ".m4v", ".mov")
+TEXT_SUBTITLE_CODECS = {"subrip", "srt", "ass", "ssa", "mov_text", "webvtt", "text"}
+
+TIME_PATTERN = re.compile(r'(\d{1,2}):(\d{2}):(\d{2})[,.](\d{3})\s*-->\s*(\d{1,2}):(\d{2}):(\d{2})[,.](\d{3})')
+
+def to_seconds(hours, minutes, seconds, milliseconds):
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds) + int(milliseconds) / 1000
+
+def parse_cue_ranges(srt_path):
+    """
+    Return the (start, end) time of every cue in an SRT file, in seconds.
+    Only the timing lines are read, so BOMs, CRLF line endings and
+    multi-line cue text are all handled the same way.
+    """
+    ranges = []
+    with open(srt_path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            match = TIME_PATTERN.search(line)
+            if match:
+                start = to_seconds(*match.groups()[:4])
+                end = to_seconds(*match.groups()[4:])
+                if end > start:
+                    ranges.append((start, end))
+    return sorted(ranges)
+
+def merge_duck_ranges(ranges, attack, release):
+    """
+    Merge cues whose envelopes would overlap once attack and release are added,
+    so the program never bounces back up between two close cues. Returns a
+    list of non-overlapping (start, end) hold ranges.
+    """
+    merged = []
+    for start, end in ranges:
+        if merged and start - attack <= merged[-1][1] + release:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def build_duck_expression(ranges, duck_db, attack, release):
+    """
+    Build an FFmpeg `volume` expression that is 1.0 outside the cue ranges and
+    drops to `duck_db` inside them, with linear attack/release ramps.
+    """
+    if not ranges:
+        return "1"
+
+    depth = 1 - 10 ** (duck_db / 20)
+    # Avoid dividing by zero when the user asks for hard cuts
+    attack = max(attack, 0.001)
+    release = max(release, 0.001)
+
+    terms = []
+    for start, end in merge_duck_ranges(ranges, attack, release):
+        ramp_in = start - attack
+        ramp_out = end + release
+        terms.append(
+            f"between(t,{ramp_in:.3f},{ramp_out:.3f})"
+            f"*min(1,min((t-{ramp_in:.3f})/{attack:.3f},({ramp_out:.3f}-t)/{release:.3f}))"
+        )
+    return f"1-{depth:.6f}*({'+'.join(terms)})"
+
+def count_audio_streams(video_file):
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "a",
+         "-show_entries", "stream=index", "-of", "csv=p=0", video_file],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    return len([line for line in result.stdout.splitlines() if line.strip()])
+
+def subtitle_codecs(video_file):
+    """Codec name of each subtitle stream, in stream order."""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "s",
+         "-show_entries", "stream=codec_name", "-of", "csv=p=0", video_file],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    return [line.strip() for line in result.stdout.splitlines() if line.strip()]
+
+def subtitle_maps(output_file, subtitles):
+    """
+    -map options for the source's subtitles and attachments that the output
+    container can hold, and the codec options they need.
+    """
+    maps = []
+    ext = os.path.splitext(output_file)[1].lower()
+    if ext in MATROSKA_EXTENSIONS:
+        return maps + ["-map", "0:s?", "-map", "0:t?"], []
+    if ext in MP4_EXTENSIONS:
+        text = [i for i, codec in enumerate(subtitles) if codec in TEXT_SUBTITLE_CODECS]
+        for i in text:
+            maps += ["-map", f"0:s:{i}"]
+        return maps, ["-c:s", "mov_text"] if text else []
+    return maps, []
+
+def build_filtergraph(ranges, program_stream, duck_db, attack, release, narration_gain):
+    expression = build_duck_expression(ranges, duck_db, attack, release)
+    return (
+        f"[0:a:{program_stream}]volume=volume='{expression}':eval=frame[program];"
+        f"[1:a:0]volume={narration_gain}dB[narration];"
+        f"[program][narration]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[ad]"
+    )
+
+def build_ffmpeg_command(video_file, narration_file, output_file, filtergraph, ad_index,
+                         codec, bitrate, title, language, set_default, subtitles=()):
+    maps, subtitle_args = subtitle_maps(output_file, subtitles)
+    cmd = [
+        "ffmpeg", "-y",
+        "-i", video_file,
+        "-i", narration_file,
+        "-filter_complex", filtergraph,
+        # The AD mix goes right after the source's audio streams, so it is audio stream `ad_index`
+        # (and before any attachment: the Matroska muxer rejects filter output mapped after one)
+        "-map", "0:v", "-map", "0:a", "-map", "[ad]", *maps,
+        "-c", "copy", *subtitle_args,
+        f"-c:a:{ad_index}", codec,
+    ]
+    if codec != "pcm_s24le":
+        cmd += [f"-b:a:{ad_index}", bitrate]
+    cmd += [
+        f"-metadata:s:a:{ad_index}", f"title={title}",
+        f"-metadata:s:a:{ad_index}", f"language={language}",
+    ]
+    if set_default:
+        # Clear the default flag on the original audio so players pick the AD mix
+        cmd += ["-disposition:a", "0", f"-disposition:a:{ad_index}", "default"]
+    cmd.append(output_file)
+    return cmd
+
+def mix_ad(video_file, narration_file, srt_file, output_file, duck_db=-12.0, attack=0.3, release=0.5,
+           narration_gain=0.0, program_stream=0, codec="eac3", bitrate="640k",
+           title="English - Audio Description", language="eng", set_default=False, dry_run=False):
+    ranges = parse_cue_ranges(srt_file)
+    if not ranges:
+        print(f"⚠️ No cues found in {srt_file}; the program audio will not be ducked.")
+
+    ad_index = count_audio_streams(video_file)
+    if ad_index == 0 and not dry_run:
+        print(f"❌ No audio stream found in {video_file}.")
+        return False
+
+    filtergraph = build_filtergraph(ranges, program_stream, duck_db, attack, release, narration_gain)
+    cmd = build_ffmpeg_command(video_file, narration_file, output_file, filtergraph, max(ad_index, 1),
+                               codec, bitrate, title, language, set_default, subtitle_codecs(video_file))
+
+    if dry_run:
+        print(" ".join(cmd))
+        return True
+
+    print(f"🎬 {os.path.basename(video_file)} + {os.path.basename(narration_file)} → {output_file} ({len(ranges)} cues)")
+    try:
+        run_ffmpeg(cmd, stage="mix_ad")
+    except subprocess.CalledProcessError as e:
+        print(f"✖ FFmpeg failed on {video_file} (exit code {e.returncode})")
+        return False
+
+    print(f"✅ Done: {output_file}")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="mix_ad.py",
+        description="Duck program audio under AD cues, mix in the narration and mux it as a new audio track in one pass.",
+    )
+    parser.add_argument("video", help="Source video file")
+    parser.add_argument("narration", help="AD narration audio (WAV, MP3, ...)")
+    parser.add_argument("srt", help="AD script SRT used to drive the ducking")
+    parser.add_argument("output", nargs="?", help="Output file (default: <video>_with_AD.mkv)")
+    parser.add_argument("--duck", type=float, default=-12.0, help="Program gain under cues in dB (default: -12)")
+    parser.add_argument("--attack", type=float, default=0.3, help="Seconds to ramp down before each cue (default: 0.3)")
+    parser.add_argument("--release", type=float, default=0.5, help="Seconds to ramp back up after each cue (default: 0.5)")
+    parser.add_argument("--narration-gain", type=float, default=0.0, help="Gain applied to the narration in dB (default: 0)")
+    parser.add_argument("--program-stream", type=int, default=0, help="Index of the program audio stream to duck (default: 0)")
+    parser.add_argument("--codec", choices=["eac3", "ac3", "aac", "pcm_s24le"], default="eac3", help="Codec for the AD mix (default: eac3)")
+    parser.add_argument("--bitrate", default="640k", help="Bitrate for the AD mix (default: 640k)")
+    parser.add_argument("--title", default="English - Audio Description", help="Track title for the AD mix")
+    parser.add_argument("--language", default="eng", help="Language tag for the AD mix (default: eng)")
+    parser.add_argument("--default", action="store_true", help="Mark the AD mix as the default audio track")
+    parser.add_argument("--dry-run", action="store_true", help="Print the FFmpeg command without running it")
+    args = parser.parse_args()
+
+    for path in (args.video, args.narration, args.srt):
+        if not os.path.isfile(path):
+            print(f"❌ File not found: {path}")
+            sys.exit(1)
+
+    output = args.output or os.path.splitext(args.video)[0] + "_with_AD.mkv"
+    note_output(output)
+
+    ok = mix_ad(args.video, args.narration, args.srt, output, args.duck, args.attack, args.release,
+                args.narration_gain, args.program_stream, args.codec, args.bitrate,
+                args.title, args.language, args.default, args.dry_run)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    with record_run():
+        main()
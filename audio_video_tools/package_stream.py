@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+
+"""
+package_stream.py
+
+Packages a title for streaming (HLS and DASH) with main audio and AD as
+separate audio renditions that share one set of video segments.
+
+- The video is stream-copied into fMP4 segments once, in `video/`.
+- Each audio rendition is mastered to a loudness profile (the same filter
+  chain as master.py), encoded and segmented into `audio/<id>/`.
+- `master.m3u8` lists the renditions as EXT-X-MEDIA alternate audio of one
+  group per codec; AD renditions carry
+  CHARACTERISTICS="public.accessibility.describes-video".
+- `manifest.mpd` references the same segments, with an AdaptationSet per
+  audio rendition; AD is signalled with the "alternate" role and the
+  DVB/DASH-IF accessibility descriptors for audio description.
+
+The package folder remembers its renditions (`.adtools_package.json`), so
+a later run only has to name what is new: adding an AD track segments that
+track alone and rewrites the manifests, and the video and other audio
+segments are left untouched. Every rendition goes through the build cache
+(build_cache.py), so a rendition whose source or settings changed is redone
+and the rest are skipped. Renditions are written to a temporary folder and
+swapped into place once complete.
+
+Audio is given as LANGUAGE[:NAME]=FILE, using the first audio stream of
+FILE; the language should be a BCP 47 tag (en, fr-CA, ...) for HLS players.
+
+Examples:
+  # Package a title with its main mix and an English AD mix
+  python package_stream.py episode_pkg --video episode.mkv --main en=mix.wav --ad en=ad_mix.wav --profile Netflix
+
+  # Later: add a French AD mix (only its audio segments are created)
+  python package_stream.py episode_pkg --ad "fr:Français (AD)=ad_fr.wav" --profile Netflix
+
+  # Drop a rendition
+  python package_stream.py episode_pkg --remove ad_fr
+
+Dependencies:
+- FFmpeg with the hls muxer
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import struct
+import argparse
+import subprocess
+import xml.etree.ElementTree as ET
+
+from ffmpeg_runner import run_ffmpeg
+from build_cache import build_key, up_to_date, record_build, forget_build
+from profiling import profile_from_argv, note_output, record_run
+if __name__ == "__main__":
+    profile_from_argv("--profile-run")
+
+import master
+
+PACKAGE_RECORD = ".adtools_package.json"
+AUDIO_FORMATS = {"aac": "mp4a.40.2", "eac3": "ec-3"}
+DESCRIBES_VIDEO = "public.accessibility.describes-video"
+
+def hls_args(directory, segment_seconds):
+    """Muxer options writing fMP4 segments, init.mp4 and index.m3u8 into `directory`."""
+    return ["-f", "hls", "-hls_time", str(segment_seconds), "-hls_playlist_type", "vod",
+            "-hls_segment_type", "fmp4", "-hls_fmp4_init_filename", "init.mp4",
+            "-hls_segment_filename", os.path.join(directory, "seg_%05d.m4s"),
+            os.path.join(directory, "index.m3u8")]
+
+def video_command(source, directory, segment_seconds):
+    return ["ffmpeg", "-y", "-i", source, "-map", "0:v:0", "-c:v", "copy"] + hls_args(directory, segment_seconds)
+
+def audio_command(rendition, directory, segment_seconds):
+    """Master and segment the first audio stream of a rendition's source."""
+    cmd = ["ffmpeg", "-y", "-i", rendition["source"], "-map", "0:a:0"]
+    if rendition["profile"] != "none":
+        shared, loudness = master.master_filters(master.PROFILES[rendition["profile"]], False, rendition["highpass"])
+        cmd += ["-af", ",".join(shared + [loudness])]
+    cmd += master.encoder_args(rendition["format"], rendition["bitrate"], rendition["samplerate"])
+    return cmd + hls_args(directory, segment_seconds)
+
+def package_rendition(package_dir, name, cmd_for, source, force=False):
+    """
+    Segment one rendition into `package_dir/name`, unless it is up to date.
+    `cmd_for(directory)` builds the FFmpeg command for a target folder; the
+    run goes to a temporary folder that replaces the old one when complete.
+    Returns True when the rendition was (re)packaged.
+    """
+    directory = os.path.join(package_dir, name)
+    playlist = os.path.join(directory, "index.m3u8")
+    key = build_key("package_stream", [source], cmd_for(directory), versions=[__file__, master.__file__], ffmpeg=True)
+    if not force and up_to_date(playlist, key):
+        print(f"⏩ {name} (up to date)")
+        return False
+
+    parent, leaf = os.path.split(directory)
+    staging = os.path.join(parent, f".{leaf}.partial")
+    retired = os.path.join(parent, f".{leaf}.old")
+    for path in (staging, retired):
+        shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(staging)
+    forget_build(playlist)
+    try:
+        run_ffmpeg(cmd_for(staging), stage=f"package {name}")
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if os.path.isdir(directory):
+        os.replace(directory, retired)
+    os.replace(staging, directory)
+    shutil.rmtree(retired, ignore_errors=True)
+    record_build(playlist, key)
+    print(f"✅ {name}")
+    return True
+
+# --- Reading the segments back for the manifests ---
+
+def mp4_boxes(data, start=0, end=None):
+    """(type, payload start, box end) of each box between `start` and `end`."""
+    end = len(data) if end is None else end
+    while start + 8 <= end:
+        size, kind = struct.unpack(">I4s", data[start:start + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[start + 8:start + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - start
+        if size < header:
+            return
+        yield kind, start + header, start + size
+        start += size
+
+def find_box(data, path, start=0, end=None):
+    """Payload range of the box at `path` (a list of box types), or None."""
+    for kind, payload, box_end in mp4_boxes(data, start, end):
+        if kind == path[0]:
+            return (payload, box_end) if len(path) == 1 else find_box(data, path[1:], payload, box_end)
+    return None
+
+def sample_entry(init_path):
+    """The first sample entry of an init segment: (fourcc, data, payload start, entry end)."""
+    with open(init_path, "rb") as f:
+        data = f.read()
+    stsd = find_box(data, [b"moov", b"trak", b"mdia", b"minf", b"stbl", b"stsd"])
+    if stsd is None:
+        raise ValueError(f"no sample description in {init_path}")
+    kind, payload, end = next(mp4_boxes(data, stsd[0] + 8, stsd[1]))
+    return kind.decode("ascii", "replace"), data, payload, end
+
+def hevc_codec(fourcc, config):
+    """RFC 6381 codec string from an hvcC payload."""
+    space, tier, idc = config[1] >> 6, (config[1] >> 5) & 1, config[1] & 0x1F
+    compatibility = int(f"{struct.unpack('>I', config[2:6])[0]:032b}"[::-1], 2)
+    constraints = list(config[6:12])
+    while constraints and not constraints[-1]:
+        constraints.pop()
+    return (f"{fourcc}.{['', 'A', 'B', 'C'][space]}{idc}.{compatibility:X}.{'H' if tier else 'L'}{config[12]}"
+            + "".join(f".{byte:X}" for byte in constraints))
+
+def stream_info(init_path):
+    """Codec string and, for video, resolution or, for audio, channel count of an init segment."""
+    fourcc, data, payload, end = sample_entry(init_path)
+    if fourcc in ("avc1", "avc3", "hvc1", "hev1"):
+        width, height = struct.unpack(">HH", data[payload + 24:payload + 28])
+        config = find_box(data, [b"avcC" if fourcc.startswith("avc") else b"hvcC"], payload + 78, end)
+        if config is None:
+            codec = fourcc
+        elif fourcc.startswith("avc"):
+            codec = f"{fourcc}.{data[config[0] + 1:config[0] + 4].hex()}"
+        else:
+            codec = hevc_codec(fourcc, data[config[0]:config[1]])
+        return {"codecs": codec, "width": width, "height": height}
+    channels = struct.unpack(">H", data[payload + 16:payload + 18])[0]
+    codec = {"mp4a": AUDIO_FORMATS["aac"], "ec-3": "ec-3", "ac-3": "ac-3"}.get(fourcc, fourcc)
+    return {"codecs": codec, "channels": channels}
+
+def read_playlist(directory):
+    """Segment (file name, duration) pairs of a media playlist, with peak and average bits per second."""
+    segments, duration = [], None
+    with open(os.path.join(directory, "index.m3u8"), encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("#EXTINF:"):
+                duration = float(line[8:].split(",")[0])
+            elif line and not line.startswith("#") and duration is not None:
+                segments.append((line, duration))
+                duration = None
+    rates = [os.path.getsize(os.path.join(directory, name)) * 8 / seconds for name, seconds in segments if seconds > 0]
+    total = sum(seconds for _, seconds in segments)
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name, _ in segments)
+    return {"segments": segments, "duration": total,
+            "peak": int(max(rates, default=0)), "average": int(size * 8 / total) if total else 0}
+
+def describe_rendition(package_dir, relative):
+    directory = os.path.join(package_dir, relative)
+    info = stream_info(os.path.join(directory, "init.mp4"))
+    info.update(read_playlist(directory))
+    info["path"] = relative
+    return info
+
+# --- Manifests ---
+
+def hls_quote(value):
+    return '"' + str(value).replace('"', "'") + '"'
+
+def audio_groups(renditions):
+    """Audio renditions grouped per codec, main renditions first."""
+    groups = {}
+    for rendition in sorted(renditions, key=lambda r: r["describes_video"]):
+        groups.setdefault(f"audio-{rendition['format']}", []).append(rendition)
+    return groups
+
+def write_hls(package_dir, video, renditions, infos):
+    lines = ["#EXTM3U", "#EXT-X-VERSION:7", "#EXT-X-INDEPENDENT-SEGMENTS", ""]
+    groups = audio_groups(renditions)
+    for group, members in groups.items():
+        default = next((r for r in members if not r["describes_video"]), members[0])
+        for rendition in members:
+            info = infos[rendition["id"]]
+            attributes = [("TYPE", "AUDIO"), ("GROUP-ID", hls_quote(group)), ("LANGUAGE", hls_quote(rendition["language"])),
+                          ("NAME", hls_quote(rendition["name"])), ("DEFAULT", "YES" if rendition is default else "NO"),
+                          ("AUTOSELECT", "YES")]
+            if rendition["describes_video"]:
+                attributes.append(("CHARACTERISTICS", hls_quote(DESCRIBES_VIDEO)))
+            attributes += [("CHANNELS", hls_quote(info["channels"])), ("URI", hls_quote(f"{info['path']}/index.m3u8"))]
+            lines.append("#EXT-X-MEDIA:" + ",".join(f"{name}={value}" for name, value in attributes))
+        lines.append("")
+    for group, members in groups.items() or [(None, [])]:
+        audio = [infos[r["id"]] for r in members]
+        attributes = [
+            ("BANDWIDTH", video["peak"] + max((a["peak"] for a in audio), default=0)),
+            ("AVERAGE-BANDWIDTH", video["average"] + max((a["average"] for a in audio), default=0)),
+            ("CODECS", hls_quote(",".join([video["codecs"]] + sorted({a["codecs"] for a in audio})))),
+            ("RESOLUTION", f"{video['width']}x{video['height']}"),
+        ]
+        if group:
+            attributes.append(("AUDIO", hls_quote(group)))
+        lines.append("#EXT-X-STREAM-INF:" + ",".join(f"{name}={value}" for name, value in attributes))
+        lines.append(f"{video['path']}/index.m3u8")
+    write_atomically(os.path.join(package_dir, "master.m3u8"), "\n".join(lines) + "\n")
+
+def iso_duration(seconds):
+    return f"PT{seconds:.3f}S"
+
+def segment_template(info):
+    """SegmentTemplate with a millisecond SegmentTimeline built from the playlist durations."""
+    template = ET.Element("SegmentTemplate", timescale="1000", startNumber="0",
+                          initialization=f"{info['path']}/init.mp4", media=f"{info['path']}/seg_$Number%05d$.m4s")
+    timeline = ET.SubElement(template, "SegmentTimeline")
+    elapsed, previous, runs = 0.0, 0, []
+    for _, seconds in info["segments"]:
+        elapsed += seconds
+        length = round(elapsed * 1000) - previous
+        previous += length
+        if runs and runs[-1][0] == length:
+            runs[-1][1] += 1
+        else:
+            runs.append([length, 0])
+    start = 0
+    for length, repeats in runs:
+        attributes = {"t": "0"} if start == 0 else {}
+        attributes["d"] = str(length)
+        if repeats:
+            attributes["r"] = str(repeats)
+        ET.SubElement(timeline, "S", attributes)
+        start += length * (repeats + 1)
+    return template
+
+def write_dash(package_dir, video, renditions, infos):
+    duration = max([video["duration"]] + [infos[r["id"]]["duration"] for r in renditions])
+    mpd = ET.Element("MPD", xmlns="urn:mpeg:dash:schema:mpd:2011", type="static",
+                     profiles="urn:mpeg:dash:profile:isoff-live:2011", minBufferTime="PT2S",
+                     mediaPresentationDuration=iso_duration(duration))
+    period = ET.SubElement(mpd, "Period", id="0", start="PT0S")
+
+    adaptation = ET.SubElement(period, "AdaptationSet", id="0", contentType="video", mimeType="video/mp4",
+                               segmentAlignment="true", startWithSAP="1")
+    representation = ET.SubElement(adaptation, "Representation", id="video", codecs=video["codecs"],
+                                   bandwidth=str(video["peak"]), width=str(video["width"]), height=str(video["height"]))
+    representation.append(segment_template(video))
+
+    for index, rendition in enumerate(sorted(renditions, key=lambda r: r["describes_video"]), 1):
+        info = infos[rendition["id"]]
+        adaptation = ET.SubElement(period, "AdaptationSet", id=str(index), contentType="audio", mimeType="audio/mp4",
+                                   lang=rendition["language"], segmentAlignment="true", startWithSAP="1")
+        ET.SubElement(adaptation, "Label").text = rendition["name"]
+        if rendition["describes_video"]:
+            ET.SubElement(adaptation, "Accessibility", schemeIdUri="urn:tva:metadata:cs:AudioPurposeCS:2007", value="1")
+            ET.SubElement(adaptation, "Accessibility", schemeIdUri="urn:mpeg:dash:role:2011", value="description")
+            ET.SubElement(adaptation, "Role", schemeIdUri="urn:mpeg:dash:role:2011", value="alternate")
+        else:
+            ET.SubElement(adaptation, "Role", schemeIdUri="urn:mpeg:dash:role:2011", value="main")
+        representation = ET.SubElement(adaptation, "Representation", id=rendition["id"], codecs=info["codecs"],
+                                       bandwidth=str(info["peak"]), audioSamplingRate=str(rendition["samplerate"]))
+        ET.SubElement(representation, "AudioChannelConfiguration",
+                      schemeIdUri="urn:mpeg:dash:23003:3:audio_channel_configuration:2011", value=str(info["channels"]))
+        representation.append(segment_template(info))
+
+    ET.indent(mpd)
+    write_atomically(os.path.join(package_dir, "manifest.mpd"),
+                     '<?xml version="1.0" encoding="utf-8"?>\n' + ET.tostring(mpd, encoding="unicode") + "\n")
+
+def write_atomically(path, text):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(path + ".tmp", path)
+
+# --- The package record ---
+
+def load_package(package_dir):
+    try:
+        with open(os.path.join(package_dir, PACKAGE_RECORD), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"video": None, "segment_seconds": None, "audio": {}}
+
+def save_package(package_dir, package):
+    write_atomically(os.path.join(package_dir, PACKAGE_RECORD), json.dumps(package, indent=1))
+
+def rendition_id(language, name, describes_video):
+    slug = re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_") if name else ""
+    return "_".join(part for part in ("ad" if describes_video else "main", language.lower(), slug) if part)
+
+def parse_audio_spec(spec, describes_video):
+    """LANGUAGE[:NAME]=FILE -> (id, language, name, file)."""
+    label, separator, path = spec.partition("=")
+    if not separator or not label or not path:
+        raise ValueError(f"expected LANGUAGE[:NAME]=FILE, got {spec!r}")
+    language, _, name = label.partition(":")
+    default_name = f"{language} (Audio Description)" if describes_video else language
+    return rendition_id(language, name, describes_video), language, name or default_name, path
+
+def package(package_dir, package, segment_seconds, force=False):
+    """Bring every rendition of the package up to date and rewrite the manifests."""
+    package_rendition(package_dir, "video",
+                      lambda directory: video_command(package["video"], directory, segment_seconds),
+                      package["video"], force)
+    for rendition in package["audio"].values():
+        package_rendition(package_dir, os.path.join("audio", rendition["id"]),
+                          lambda directory, r=rendition: audio_command(r, directory, segment_seconds),
+                          rendition["source"], force)
+
+    video = describe_rendition(package_dir, "video")
+    renditions = list(package["audio"].values())
+    infos = {r["id"]: describe_rendition(package_dir, f"audio/{r['id']}") for r in renditions}
+    write_hls(package_dir, video, renditions, infos)
+    write_dash(package_dir, video, renditions, infos)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Package a title for HLS/DASH with shared video segments and main/AD audio renditions.")
+    parser.add_argument("output_dir", help="Package folder (created, or updated if it exists)")
+    parser.add_argument("--video", help="Video source; stream-copied into segments (required for a new package)")
+    parser.add_argument("--main", action="append", default=[], metavar="LANG[:NAME]=FILE", help="Add or replace a main audio rendition")
+    parser.add_argument("--ad", action="append", default=[], metavar="LANG[:NAME]=FILE", help="Add or replace an AD rendition")
+    parser.add_argument("--remove", action="append", default=[], metavar="ID", help="Remove a rendition (e.g. ad_fr)")
+    parser.add_argument("--profile", choices=list(master.PROFILES) + ["none"], default="Streaming Platforms",
+                        help="Loudness profile for the audio added in this run; 'none' encodes it as is (default: Streaming Platforms)")
+    parser.add_argument("--format", choices=list(AUDIO_FORMATS), default="aac", help="Audio codec (default: aac)")
+    parser.add_argument("--bitrate", default="192k", help="Audio bitrate (default: 192k)")
+    parser.add_argument("--samplerate", type=int, default=48000, help="Audio sample rate (default: 48000)")
+    parser.add_argument("--highpass", action="store_true", help="Apply an 80 Hz high-pass before mastering")
+    parser.add_argument("--segment", type=float, default=None,
+                        help="Target segment length in seconds; video cuts land on keyframes (default: 6, or the package's)")
+    parser.add_argument("--force", action="store_true", help="Re-segment every rendition even if up to date")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    note_output(args.output_dir)
+    package_record = load_package(args.output_dir)
+
+    if args.video:
+        if not os.path.isfile(args.video):
+            parser.error(f"video not found: {args.video}")
+        package_record["video"] = os.path.abspath(args.video)
+    if not package_record["video"]:
+        parser.error("a new package needs --video")
+    if args.segment is not None:
+        if args.segment <= 0:
+            parser.error("--segment must be positive")
+        package_record["segment_seconds"] = args.segment
+    segment_seconds = package_record["segment_seconds"] or 6
+
+    for specs, describes_video in ((args.main, False), (args.ad, True)):
+        for spec in specs:
+            try:
+                rendition, language, name, path = parse_audio_spec(spec, describes_video)
+            except ValueError as e:
+                parser.error(str(e))
+            if not os.path.isfile(path):
+                parser.error(f"audio not found: {path}")
+            package_record["audio"][rendition] = {
+                "id": rendition, "language": language, "name": name, "describes_video": describes_video,
+                "source": os.path.abspath(path), "profile": args.profile, "format": args.format,
+                "bitrate": args.bitrate, "samplerate": args.samplerate, "highpass": args.highpass,
+            }
+    for rendition in args.remove:
+        if package_record["audio"].pop(rendition, None) is None:
+            parser.error(f"no rendition {rendition!r} (have: {', '.join(package_record['audio']) or 'none'})")
+        shutil.rmtree(os.path.join(args.output_dir, "audio", rendition), ignore_errors=True)
+        print(f"🗑 Removed {rendition}")
+
+    try:
+        package(args.output_dir, package_record, segment_seconds, args.force)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Packaging failed: {e}")
+        sys.exit(1)
+    save_package(args.output_dir, package_record)
+    ad_count = sum(r["describes_video"] for r in package_record["audio"].values())
+    print(f"📦 {args.output_dir}: {len(package_record['audio'])} audio rendition(s), {ad_count} with AD; "
+          f"master.m3u8 and manifest.mpd written")
+
+if __name__ == "__main__":
+    with record_run():
+        main()
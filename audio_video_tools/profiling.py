@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+"""
+profiling.py
+
+Shared `--profile` support for the command-line tools.
+
+A script enables it by calling `profile_from_argv()` before its heavy imports:
+
+    from profiling import profile_from_argv, note_output, record_run
+    if __name__ == "__main__":
+        profile_from_argv()
+    ...
+    if __name__ == "__main__":
+        with record_run():
+            main()
+
+When `--profile` is on the command line it is removed from `sys.argv` (so the
+script's own argument parsing never sees it) and the run is profiled with:
+- cProfile, written as `<name>.profile.pstats` (open with `python -m pstats` or snakeviz)
+- tracemalloc peak memory
+- a per-module import-time breakdown (cumulative, like `python -X importtime`)
+
+A JSON summary with wall/CPU time, peak memory, the slowest imports and the
+top functions by cumulative time is written next to it as
+`<name>.profile.json`. Both files go next to the output the script reports
+through `note_output()`, or into the current directory otherwise.
+
+Tools that already use `--profile` for something else (the loudness profile
+in `master.py`) pass another flag name, e.g. `profile_from_argv("--profile-run")`.
+
+`record_run()` records the run in the run history (see run_history.py).
+Profiled runs are left out of it, since the profiler slows them down.
+"""
+
+import os
+import sys
+import time
+import builtins
+
+import run_history
+
+# json, cProfile, pstats and tracemalloc are imported only once profiling is
+# switched on, so the hook costs nothing on ordinary runs.
+
+_state = {}
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    original = _state["original_import"]
+    if level or name in sys.modules:
+        return original(name, globals, locals, fromlist, level)
+    start = time.perf_counter()
+    _state["depth"] += 1
+    try:
+        return original(name, globals, locals, fromlist, level)
+    finally:
+        _state["depth"] -= 1
+        elapsed = time.perf_counter() - start
+        _state["imports"].setdefault(name, elapsed)
+        if not _state["depth"]:
+            _state["import_time"] += elapsed
+
+def start_profiling():
+    """Start cProfile, tracemalloc and import timing for the rest of the process."""
+    if _state:
+        return
+    import atexit
+    import cProfile
+    import tracemalloc
+
+    _state.update({
+        "script": os.path.basename(sys.argv[0]),
+        "argv": list(sys.argv[1:]),
+        "wall": time.perf_counter(),
+        "cpu": time.process_time(),
+        "imports": {},
+        "depth": 0,
+        "import_time": 0.0,
+        "original_import": builtins.__import__,
+        "output": None,
+    })
+    builtins.__import__ = _timed_import
+    tracemalloc.start()
+    _state["profiler"] = cProfile.Profile()
+    _state["profiler"].enable()
+    atexit.register(_finish)
+
+def profile_from_argv(flag="--profile"):
+    """Start profiling if `flag` was passed, removing it from sys.argv. Returns True when enabled."""
+    if flag not in sys.argv:
+        return False
+    sys.argv.remove(flag)
+    start_profiling()
+    return True
+
+def record_run():
+    """Context manager around a tool's entry point that records the run in the run history, unless it is profiled."""
+    return run_history.recording(enabled=not _state)
+
+def note_output(path):
+    """Tell the profiler where the run's output goes, so the profile is written next to it."""
+    run_history.note_output(path)
+    if _state and not _state["output"] and path:
+        _state["output"] = str(path)
+
+def _report_paths():
+    output = _state["output"]
+    script = os.path.splitext(_state["script"])[0]
+    if not output:
+        return os.path.join(os.getcwd(), f"{script}.profile")
+    if os.path.isdir(output):
+        return os.path.join(output, f"{script}.profile")
+    return f"{os.path.splitext(output)[0]}.{script}.profile"
+
+def _top_functions(stats, limit=25):
+    rows = []
+    for (filename, line, name), (_, calls, total, cumulative, _) in stats.stats.items():
+        if filename == __file__:
+            continue  # The import timer would otherwise top every listing
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{line}({name})",
+            "calls": calls,
+            "total": round(total, 4),
+            "cumulative": round(cumulative, 4),
+        })
+    return sorted(rows, key=lambda row: -row["cumulative"])[:limit]
+
+def _finish():
+    import json
+    import pstats
+    import tracemalloc
+
+    profiler = _state["profiler"]
+    profiler.disable()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    builtins.__import__ = _state["original_import"]
+
+    base = _report_paths()
+    profiler.dump_stats(base + ".pstats")
+
+    imports = sorted(_state["imports"].items(), key=lambda item: -item[1])
+    summary = {
+        "script": _state["script"],
+        "argv": _state["argv"],
+        "wall": round(time.perf_counter() - _state["wall"], 4),
+        "cpu": round(time.process_time() - _state["cpu"], 4),
+        "peak_memory_bytes": peak,
+        "import_time": round(_state["import_time"], 4),
+        "imports": [{"module": name, "seconds": round(seconds, 4)} for name, seconds in imports[:40]],
+        "top_functions": _top_functions(pstats.Stats(profiler)),
+    }
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    slowest = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in imports[:3])
+    print(f"📊 Profile: {summary['wall']:.2f}s wall, {summary['cpu']:.2f}s CPU, "
+          f"peak {peak / 1048576:.1f} MiB, imports {summary['import_time']:.2f}s ({slowest})")
+    print(f"📊 Written to {base}.pstats and {base}.json")
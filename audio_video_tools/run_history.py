@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+
+"""
+run_history.py
+
+Persistent history of every tool run, so slowdowns from an FFmpeg upgrade
+or a script change show up in numbers instead of going unnoticed.
+
+Every tool whose entry point runs inside `record_run()` (see profiling.py)
+records one row per run, when it finishes, in a local SQLite database:
+- tool, argv and loudness profile (the value of `--profile`, if any)
+- the tool's version (a hash of its source) and the FFmpeg version
+- wall time and CPU time, including FFmpeg and other child processes
+- the media duration FFmpeg processed and the resulting speed (xRT), or
+  input MB/s for tools that don't run FFmpeg
+- input and output bytes, and the exit status
+- every FFmpeg stage of the run (see ffmpeg_runner.py), in a `stages` table
+  (stages run in worker processes, as in convert_any.py, aren't seen)
+
+Long-running services (watch_folder.py, job_queue.py) aren't recorded
+themselves; the tool runs they start are.
+
+Runs of FFmpeg tools that skipped all their work (the build cache found the
+outputs up to date) are recorded without a throughput, so they don't count
+in the report.
+
+The database is `~/.config/ad-tools/run_history.sqlite` by default; set
+`AD_TOOLS_RUN_HISTORY` to another path, or to an empty string to turn the
+history off. Recording never fails a tool: if the database can't be
+written, a warning is printed.
+
+`report` groups successful runs by tool and profile and compares the
+throughput of the most recent runs with the runs before them. A one-sided
+Mann-Whitney U test flags slowdowns that are statistically significant
+(p < 0.05) and larger than 10%. When the FFmpeg or tool version changed
+between the two groups, the report says so.
+
+Usage:
+  python run_history.py report
+  python run_history.py report --tool master.py --days 60 --recent 5 --trend
+  python run_history.py recent -n 20
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from contextlib import contextmanager
+
+DEFAULT_HISTORY = os.path.expanduser("~/.config/ad-tools/run_history.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    tool TEXT NOT NULL,
+    profile TEXT,
+    argv TEXT NOT NULL,
+    tool_version TEXT,
+    ffmpeg_version TEXT,
+    host TEXT,
+    started REAL NOT NULL,
+    wall REAL NOT NULL,
+    cpu REAL,
+    media_duration REAL,
+    bytes_in INTEGER,
+    bytes_out INTEGER,
+    throughput REAL,
+    unit TEXT,
+    status INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_tool ON runs (tool, profile, started);
+CREATE TABLE IF NOT EXISTS stages (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    stage TEXT NOT NULL,
+    wall REAL,
+    cpu REAL,
+    media_duration REAL,
+    speed REAL,
+    bytes_in INTEGER,
+    bytes_out INTEGER,
+    returncode INTEGER
+);
+"""
+
+# State of the run being recorded in this process
+_run = {}
+
+def history_path():
+    return os.environ.get("AD_TOOLS_RUN_HISTORY", DEFAULT_HISTORY)
+
+def child_cpu():
+    try:
+        import resource
+    except ImportError:  # Windows: only this process' CPU time is recorded
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def exit_status(code):
+    if code is None:
+        return 0
+    return code if isinstance(code, int) else 1
+
+def start_recording():
+    """Start the run's clock. Costs a few timestamps."""
+    _run.update({
+        "script": os.path.abspath(sys.argv[0]),
+        "argv": list(sys.argv[1:]),
+        "started": time.time(),
+        "wall": time.perf_counter(),
+        "cpu": time.process_time() + child_cpu(),
+        "status": 0,
+        "output": None,
+    })
+
+@contextmanager
+def recording(enabled=True):
+    """
+    Record the tool run the block executes. Its exit status is how the block
+    ends: 0, the code passed to sys.exit(), 130 for Ctrl+C or 1 for an
+    exception (which is re-raised). A no-op when disabled, when the history
+    is off, or inside another recording.
+    """
+    if not enabled or _run or not history_path():
+        yield
+        return
+    start_recording()
+    try:
+        yield
+    except SystemExit as e:
+        _run["status"] = exit_status(e.code)
+        raise
+    except KeyboardInterrupt:
+        _run["status"] = 130
+        raise
+    except BaseException:
+        _run["status"] = 1
+        raise
+    finally:
+        _finish()
+        _run.clear()
+
+def note_output(path):
+    if _run and not _run["output"] and path:
+        _run["output"] = str(path)
+
+def argv_profile(argv):
+    """The value of --profile (master.py's loudness profile), if one was given."""
+    for i, arg in enumerate(argv):
+        if arg == "--profile" and i + 1 < len(argv):
+            return argv[i + 1]
+        if arg.startswith("--profile="):
+            return arg.split("=", 1)[1]
+    return None
+
+def tree_bytes(path, since=0.0):
+    """Size of a file, or of the files in a folder modified since `since`."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                st = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            if st.st_mtime >= since:
+                total += st.st_size
+    return total
+
+def input_bytes(argv, output, since):
+    """Size of the files and folders named on the command line, other than an output file written by the run."""
+    paths = {os.path.abspath(arg) for arg in argv if not arg.startswith("-") and os.path.exists(arg)}
+    if output and os.path.isfile(output) and os.path.getmtime(output) >= since:
+        paths.discard(os.path.abspath(output))
+    return sum(tree_bytes(path) for path in paths)
+
+def output_bytes(output, since):
+    """Size of the noted output: the file, or the files in the folder written during the run."""
+    if not output or not os.path.exists(output):
+        return 0
+    return tree_bytes(output, since)
+
+def connect(path):
+    import sqlite3
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = sqlite3.connect(path, timeout=30)
+    db.executescript(SCHEMA)
+    return db
+
+def _finish():
+    wall = time.perf_counter() - _run["wall"]
+    cpu = time.process_time() + child_cpu() - _run["cpu"]
+    runner = sys.modules.get("ffmpeg_runner")
+    stages = list(getattr(runner, "session_records", []))
+
+    media = sum(stage["media_duration"] or 0 for stage in stages if stage["returncode"] == 0) or None
+    bytes_in = sum(stage["bytes_in"] for stage in stages) if stages else input_bytes(_run["argv"], _run["output"], _run["started"])
+    bytes_out = sum(stage["bytes_out"] for stage in stages) if stages else output_bytes(_run["output"], _run["started"])
+    if media:
+        throughput, unit = media / wall if wall else None, "xRT"
+    elif runner:
+        # An FFmpeg tool that ran no FFmpeg (everything was up to date): nothing to measure
+        throughput, unit = None, "xRT"
+    else:
+        throughput, unit = (bytes_in / 1048576 / wall if wall and bytes_in else None), "MB/s"
+
+    ffmpeg = None
+    if stages:
+        from build_cache import ffmpeg_version
+
+        ffmpeg = ffmpeg_version()
+    try:
+        from build_cache import source_version
+
+        tool_version = source_version(_run["script"])
+    except OSError:
+        tool_version = None
+
+    try:
+        import socket
+
+        db = connect(history_path())
+        try:
+            with db:
+                cursor = db.execute(
+                    "INSERT INTO runs (tool, profile, argv, tool_version, ffmpeg_version, host, started, wall, cpu, "
+                    "media_duration, bytes_in, bytes_out, throughput, unit, status) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (os.path.basename(_run["script"]), argv_profile(_run["argv"]), json.dumps(_run["argv"]),
+                     tool_version, ffmpeg, socket.gethostname(), _run["started"], round(wall, 3), round(cpu, 3),
+                     media, bytes_in, bytes_out, throughput, unit, _run["status"]))
+                db.executemany(
+                    "INSERT INTO stages (run_id, stage, wall, cpu, media_duration, speed, bytes_in, bytes_out, returncode) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(cursor.lastrowid, s["stage"], s["wall"], s["cpu"], s["media_duration"], s["speed"],
+                      s["bytes_in"], s["bytes_out"], s["returncode"]) for s in stages])
+        finally:
+            db.close()
+    except Exception as e:
+        print(f"⚠️ Could not record the run in {history_path()}: {e}")
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+def slowdown_p_value(baseline, recent):
+    """One-sided Mann-Whitney U p-value for "recent runs have lower throughput than the baseline"."""
+    from scipy.stats import mannwhitneyu
+
+    return float(mannwhitneyu(recent, baseline, alternative="less").pvalue)
+
+def version_note(baseline_rows, recent_rows):
+    notes = []
+    for column, label in (("ffmpeg_version", "FFmpeg"), ("tool_version", "tool")):
+        before = {row[column] for row in baseline_rows if row[column]}
+        after = {row[column] for row in recent_rows if row[column]}
+        if after - before:
+            old = ", ".join(sorted(before)) or "?"
+            notes.append(f"{label} changed: {old} → {', '.join(sorted(after - before))}")
+    return "; ".join(notes)
+
+def report(db_path, tool=None, days=90, recent=10, trend=False, threshold=0.10, alpha=0.05):
+    """Print throughput per tool/profile, flagging significant slowdowns of the recent runs. Returns the flagged groups."""
+    import sqlite3
+
+    db = connect(db_path)
+    db.row_factory = sqlite3.Row
+    try:
+        query = "SELECT * FROM runs WHERE started >= ?" + (" AND tool = ?" if tool else "") + " ORDER BY started"
+        rows = db.execute(query, (time.time() - days * 86400,) + ((tool,) if tool else ())).fetchall()
+    finally:
+        db.close()
+    if not rows:
+        print("No runs recorded in that period.")
+        return []
+
+    groups = {}
+    for row in rows:
+        groups.setdefault((row["tool"], row["profile"] or "-", row["unit"]), []).append(row)
+
+    print(f"{'tool':<28}{'profile':<20}{'runs':>5}{'failed':>7}{'before':>10}{'recent':>10}{'change':>8}{'p':>8}")
+    flagged = []
+    for (name, profile, unit), group in sorted(groups.items()):
+        ok = [row for row in group if row["status"] == 0 and row["throughput"]]
+        failed = sum(row["status"] != 0 for row in group)
+        line = f"{name:<28}{profile[:19]:<20}{len(group):>5}{failed:>7}"
+        if len(ok) < recent + 3:
+            median_all = f"{median([row['throughput'] for row in ok]):.1f}" if ok else "-"
+            print(f"{line}{median_all:>10}{'':>10}{'':>8}{'':>8}  {unit}, too few runs to compare")
+            continue
+        baseline_rows, recent_rows = ok[:-recent], ok[-recent:]
+        baseline = [row["throughput"] for row in baseline_rows]
+        latest = [row["throughput"] for row in recent_rows]
+        change = median(latest) / median(baseline) - 1
+        p = slowdown_p_value(baseline, latest)
+        flag = ""
+        if p < alpha and change < -threshold:
+            flagged.append((name, profile))
+            note = version_note(baseline_rows, recent_rows)
+            flag = "  ⚠️ slower" + (f" ({note})" if note else "")
+        print(f"{line}{median(baseline):>10.1f}{median(latest):>10.1f}{change:>+8.0%}{p:>8.3f}  {unit}{flag}")
+
+        if trend:
+            months = {}
+            for row in ok:
+                months.setdefault(time.strftime("%Y-%m", time.localtime(row["started"])), []).append(row["throughput"])
+            for month, values in sorted(months.items()):
+                print(f"{'':<28}{month:<20}{len(values):>5}{'':>7}{median(values):>10.1f}")
+    return flagged
+
+def recent_runs(db_path, count=20):
+    import sqlite3
+
+    db = connect(db_path)
+    db.row_factory = sqlite3.Row
+    try:
+        rows = db.execute("SELECT * FROM runs ORDER BY started DESC LIMIT ?", (count,)).fetchall()
+    finally:
+        db.close()
+    for row in reversed(rows):
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(row["started"]))
+        speed = f"{row['throughput']:.1f} {row['unit']}" if row["throughput"] else "-"
+        status = "✅" if row["status"] == 0 else f"❌ {row['status']}"
+        print(f"{when}  {status:<5} {row['tool']:<28}{row['profile'] or '':<16}{row['wall']:>9.1f}s  {speed}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Tool run history: recent runs and throughput regression report")
+    commands = parser.add_subparsers(dest="command", required=True)
+    report_parser = commands.add_parser("report", help="Throughput per tool and profile, flagging significant slowdowns")
+    report_parser.add_argument("--tool", default=None, help="Only this tool (script name, e.g. master.py)")
+    report_parser.add_argument("--days", type=float, default=90, help="Runs from the last N days (default: 90)")
+    report_parser.add_argument("--recent", type=int, default=10, help="Recent runs compared with the ones before (default: 10)")
+    report_parser.add_argument("--threshold", type=float, default=0.10,
+                               help="Smallest slowdown that is flagged, as a fraction (default: 0.10)")
+    report_parser.add_argument("--trend", action="store_true", help="Also show the median throughput per month")
+    report_parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if any slowdown is flagged")
+    recent_parser = commands.add_parser("recent", help="List the latest runs")
+    recent_parser.add_argument("-n", type=int, default=20, help="Number of runs (default: 20)")
+    parser.add_argument("--db", default=None, help=f"History database (default: $AD_TOOLS_RUN_HISTORY or {DEFAULT_HISTORY})")
+    args = parser.parse_args()
+
+    db_path = args.db or history_path()
+    if not db_path or not os.path.isfile(db_path):
+        print(f"No run history found at {db_path}")
+        sys.exit(1)
+    if args.command == "recent":
+        recent_runs(db_path, args.n)
+        return
+    flagged = report(db_path, args.tool, args.days, args.recent, args.trend, args.threshold)
+    if flagged and args.fail_on_regression:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+"""
+sources.py
+
+Input/output helpers that let the converter functions work on files or in memory.
+
+Anywhere a converter takes a "source" it accepts:
+- a path (`str` or `pathlib.Path`)
+- `bytes` / `bytearray` holding the file's content
+- an open file-like object (text or binary), e.g. `io.BytesIO`, an upload stream
+
+and anywhere it takes a "target" it accepts a path, a writable file-like
+object, or `None` to get the result back instead of writing it.
+
+A plain `str` is always treated as a path; wrap text content in `io.StringIO`
+or encode it to bytes.
+"""
+
+import io
+import os
+from contextlib import contextmanager
+
+def is_path(value):
+    return isinstance(value, (str, os.PathLike))
+
+def read_bytes(source):
+    """Return the full content of a source as bytes."""
+    if is_path(source):
+        with open(source, "rb") as f:
+            return f.read()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    data = source.read()
+    return data.encode("utf-8") if isinstance(data, str) else data
+
+def read_text(source, encoding="utf-8-sig"):
+    """
+    Return the text of a source with newlines normalized to "\\n", the way
+    text-mode open() would. A UTF-8 byte order mark is dropped.
+    """
+    if hasattr(source, "read") and not isinstance(source, (io.RawIOBase, io.BufferedIOBase)):
+        data = source.read()
+        text = data if isinstance(data, str) else data.decode(encoding)
+    else:
+        text = read_bytes(source).decode(encoding)
+    return text.lstrip("\ufeff").replace("\r\n", "\n").replace("\r", "\n")
+
+@contextmanager
+def open_binary(source):
+    """Yield a seekable binary file object for a source. File objects passed in are not closed."""
+    if is_path(source):
+        with open(source, "rb") as f:
+            yield f
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+    elif hasattr(source, "seek") and source.seekable() and not isinstance(source, io.TextIOBase):
+        yield source
+    else:
+        yield io.BytesIO(read_bytes(source))
+
+def write_text(target, text, encoding="utf-8"):
+    """Write text to a path or file-like target. With `target=None` the text is returned instead."""
+    if target is None:
+        return text
+    if is_path(target):
+        with open(target, "w", encoding=encoding) as f:
+            f.write(text)
+    elif isinstance(target, io.TextIOBase):
+        target.write(text)
+    else:
+        target.write(text.encode(encoding))
+    return None
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+
+"""
+staging.py
+
+Optional local staging for batches whose sources live on network storage.
+Without it, FFmpeg reads each source over the network while it encodes, so
+the encoder stalls on I/O and parallel jobs compete for bandwidth.
+
+With `--stage-dir <local scratch folder>` (master.py, convert_audio.py,
+video_only.py and srt_to_sub_time_burn.py --batch):
+- A background thread copies the next `--stage-ahead` inputs of the batch
+  (default 2) to the scratch folder while the current job encodes, one file
+  at a time with large sequential reads. Jobs then read their input from
+  local disk.
+- The copies are bounded by `--stage-budget` (GB of scratch space, default
+  20), counting both staged inputs and outputs waiting to be moved back. A
+  source larger than the whole budget is read from the network as before.
+- Outputs are written to the scratch folder and moved back by a second
+  background thread while the next job runs. Each one is copied to its
+  temporary name next to the real output, then renamed into place and
+  journaled as done, exactly as batch_journal.py does for unstaged runs.
+  An output whose move-back never finished is therefore redone by
+  `--resume`.
+
+Nothing changes in how jobs are described: build cache keys and journal
+entries use the original paths, so a staged and an unstaged run of the
+same batch skip the same work. Inputs are hashed while they are copied, so
+recording a build doesn't read the source from the network again.
+
+The hook is batch_journal.staged_outputs(), which swaps in the local paths
+while a staging context (`staging()`) is active.
+"""
+
+import os
+import queue
+import hashlib
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from build_cache import file_stamp, remember_hash
+
+# Bytes per read/write when copying to and from scratch
+CHUNK_SIZE = 16 << 20
+DEFAULT_AHEAD = 2
+DEFAULT_BUDGET_GB = 20
+
+_current = None
+
+def current():
+    """The active Stager, or None when staging is off."""
+    return _current
+
+def copy_file(source, target, cancelled=lambda: False, digest=None):
+    """
+    Copy with large sequential reads and writes, feeding the data to the
+    hashlib object `digest` if given. Returns False if `cancelled()` became
+    true (the copy is removed).
+    """
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(src.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while True:
+            if cancelled():
+                break
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                return True
+            if digest:
+                digest.update(chunk)
+            dst.write(chunk)
+    os.remove(target)
+    return False
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def input_indices(cmd):
+    return [i + 1 for i, arg in enumerate(cmd[:-1]) if arg == "-i"]
+
+class Stager:
+    """Prefetches a batch's inputs to local scratch and moves finished outputs back in the background."""
+
+    def __init__(self, inputs, scratch, ahead=DEFAULT_AHEAD, budget_gb=DEFAULT_BUDGET_GB):
+        self.inputs = list(dict.fromkeys(os.path.abspath(path) for path in inputs))
+        self.index = {path: i for i, path in enumerate(self.inputs)}
+        os.makedirs(scratch, exist_ok=True)
+        self.scratch = tempfile.mkdtemp(prefix="adtools_stage_", dir=scratch)
+        self.ahead = ahead
+        self.budget = int(budget_gb * (1 << 30))
+
+        self.condition = threading.Condition()
+        self.ready = {path: threading.Event() for path in self.inputs}
+        self.local = {}  # source -> local copy
+        self.sizes = {}  # local file -> bytes counted against the budget
+        self.used = 0
+        self.position = 0  # Index of the input the current job reads
+        self.closing = False
+        self.outputs = 0
+        self.prefetched = 0
+        self.moved = 0
+        self.failed_moves = []
+
+        self.moves = queue.Queue()
+        self.prefetcher = threading.Thread(target=self._prefetch, name="stage-prefetch", daemon=True)
+        self.mover = threading.Thread(target=self._move_back, name="stage-move-back", daemon=True)
+        self.prefetcher.start()
+        self.mover.start()
+
+    # --- Inputs ---
+
+    def _prefetch(self):
+        for i, source in enumerate(self.inputs):
+            try:
+                size = os.path.getsize(source)
+            except OSError:
+                self.ready[source].set()
+                continue
+            with self.condition:
+                # Stay within `ahead` inputs of the current job and within the budget (unless scratch is empty)
+                while not self.closing and (i > self.position + self.ahead or self.used and self.used + size > self.budget):
+                    self.condition.wait()
+                if self.closing:
+                    break
+                if i < self.position or size > self.budget:
+                    self.ready[source].set()
+                    continue
+                self.used += size
+            local = os.path.join(self.scratch, f"in{i:05d}_{os.path.basename(source)}")
+            digest = hashlib.sha256()
+            try:
+                stamp = file_stamp(source)
+                copied = copy_file(source, local, lambda: self.closing, digest)
+                if copied and file_stamp(source) == stamp:
+                    # The build cache needs this hash once the job is done; the source isn't read a second time for it
+                    remember_hash(source, stamp, digest.hexdigest())
+            except OSError as e:
+                print(f"⚠️ Could not stage {os.path.basename(source)} ({e}); reading it from its source")
+                remove_quietly(local)
+                copied = False
+            with self.condition:
+                if copied:
+                    self.local[source] = local
+                    self.sizes[local] = size
+                    self.prefetched += 1
+                else:
+                    self.used -= size
+                self.condition.notify_all()
+            self.ready[source].set()
+        for event in self.ready.values():
+            event.set()
+
+    def _drop(self, source):
+        local = self.local.pop(source, None)
+        if local:
+            remove_quietly(local)
+            self.used -= self.sizes.pop(local)
+            self.condition.notify_all()
+
+    def localize_inputs(self, cmd):
+        """`cmd` with each staged -i input replaced by its local copy, waiting for the copy if it is still running."""
+        cmd = list(cmd)
+        for i in input_indices(cmd):
+            source = os.path.abspath(cmd[i])
+            if source not in self.index:
+                continue
+            with self.condition:
+                self.position = max(self.position, self.index[source])
+                # Inputs before this one were finished or skipped: their copies aren't needed anymore
+                for earlier in self.inputs[:self.index[source]]:
+                    self._drop(earlier)
+                self.condition.notify_all()
+            self.ready[source].wait()
+            with self.condition:
+                cmd[i] = self.local.get(source, cmd[i])
+        return cmd
+
+    def release_inputs(self, cmd):
+        """Delete the local copies of a finished job's inputs (`cmd` with the original paths)."""
+        with self.condition:
+            for i in input_indices(cmd):
+                self._drop(os.path.abspath(cmd[i]))
+
+    # --- Outputs ---
+
+    def local_output(self, path):
+        """Scratch path for an output (keeps the extension, so FFmpeg picks the same muxer)."""
+        self.outputs += 1
+        return os.path.join(self.scratch, f"out{self.outputs:05d}_{os.path.basename(path)}")
+
+    def move_back(self, moves, finish):
+        """
+        Queue finished (local file, destination) pairs to be copied back;
+        `finish()` runs once all of them are in place.
+        """
+        with self.condition:
+            for local, _ in moves:
+                self.sizes[local] = os.path.getsize(local)
+                self.used += self.sizes[local]
+        self.moves.put((moves, finish))
+
+    def _move_back(self):
+        while True:
+            item = self.moves.get()
+            if item is None:
+                return
+            moves, finish = item
+            try:
+                for local, destination in moves:
+                    copy_file(local, destination)
+                finish()
+                self.moved += len(moves)
+            except Exception as e:
+                names = ", ".join(os.path.basename(destination) for _, destination in moves)
+                print(f"❌ Could not move {names} back from scratch: {e}")
+                self.failed_moves.append(names)
+                for _, destination in moves:
+                    remove_quietly(destination)
+            finally:
+                with self.condition:
+                    for local, _ in moves:
+                        remove_quietly(local)
+                        self.used -= self.sizes.pop(local, 0)
+                    self.condition.notify_all()
+
+    def close(self):
+        """Stop prefetching, wait for every queued move-back and remove the scratch folder."""
+        with self.condition:
+            self.closing = True
+            self.condition.notify_all()
+        pending = self.moves.qsize()
+        if pending:
+            print(f"📤 Waiting for {pending} output(s) to be moved back...")
+        self.moves.put(None)
+        self.mover.join()
+        self.prefetcher.join()
+        shutil.rmtree(self.scratch, ignore_errors=True)
+        print(f"📦 Staging: {self.prefetched} input(s) prefetched, {self.moved} output(s) moved back"
+              + (f", {len(self.failed_moves)} move(s) failed" if self.failed_moves else ""))
+
+@contextmanager
+def staging(inputs, scratch=None, ahead=DEFAULT_AHEAD, budget_gb=DEFAULT_BUDGET_GB):
+    """Stage a batch's inputs and outputs through `scratch` for the duration of the block; a no-op without `scratch`."""
+    global _current
+    if not scratch:
+        yield None
+        return
+    stager = Stager(inputs, scratch, ahead, budget_gb)
+    _current = stager
+    try:
+        yield stager
+    finally:
+        _current = None
+        stager.close()
+
+def add_arguments(parser):
+    """The --stage-* options shared by the batch tools."""
+    parser.add_argument("--stage-dir", default=None,
+                        help="Local scratch folder: prefetch inputs to it and move outputs back in the background "
+                             "(for sources on network storage)")
+    parser.add_argument("--stage-ahead", type=int, default=DEFAULT_AHEAD,
+                        help=f"Inputs to prefetch ahead of the current job (default: {DEFAULT_AHEAD})")
+    parser.add_argument("--stage-budget", type=float, default=DEFAULT_BUDGET_GB,
+                        help=f"Scratch space the staging may use, in GB (default: {DEFAULT_BUDGET_GB})")
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+"""
+subtitle_xml.py
+
+Streaming readers for XML subtitle formats:
+- USF (`<USFSubtitles>`), with `start` plus `stop` or `duration` per subtitle
+- TTML / DFXP (`<tt>`, any of the W3C namespaces, including the old 2006 DFXP one)
+- EBU-TT and EBU-TT-D, which are TTML profiles
+
+`iter_xml_cues()` detects the format from the root element and yields
+`cues.Cue` tuples in document order. It is built on `iterparse`: every cue's
+element is removed from the tree as soon as it has been read, so memory
+stays flat however long the file is.
+
+TTML time expressions supported:
+- clock time `hh:mm:ss`, `hh:mm:ss.fff` and frame-based `hh:mm:ss:ff[.sub]`
+- offset time `<n>h`, `m`, `s`, `ms`, `f` (frames) and `t` (ticks)
+- `ttp:frameRate`, `ttp:frameRateMultiplier`, `ttp:subFrameRate`,
+  `ttp:tickRate`, `ttp:timeBase="smpte"` with `ttp:dropMode="dropNTSC"`
+- `begin`/`end`/`dur` on `p`, offset by the `begin` of enclosing `body`/`div`
+  containers; a `p` without timing takes the range of its timed `span`s
+"""
+
+import re
+import xml.etree.ElementTree as ET
+
+from cues import Cue
+from sources import open_binary
+
+OFFSET_TIME = re.compile(r"^([\d.]+)(h|ms|m|s|f|t)$")
+CLOCK_TIME = re.compile(r"^(\d+):(\d{2}):(\d{2})(?:(\.\d+)|:(\d+)(?:\.(\d+))?)?$")
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+def local_attributes(elem):
+    """Element attributes keyed by local name (namespace prefixes dropped)."""
+    return {local_name(key): value for key, value in elem.attrib.items()}
+
+class TimingParameters:
+    """The ttp: parameters from a TTML root element that time expressions depend on."""
+
+    def __init__(self, attributes):
+        self.frame_rate = float(attributes.get("frameRate", 30))
+        numerator, _, denominator = attributes.get("frameRateMultiplier", "1 1").partition(" ")
+        self.effective_frame_rate = self.frame_rate * float(numerator) / float(denominator or 1)
+        self.sub_frame_rate = float(attributes.get("subFrameRate", 1))
+        if "tickRate" in attributes:
+            self.tick_rate = float(attributes["tickRate"])
+        elif "frameRate" in attributes:
+            self.tick_rate = self.frame_rate * self.sub_frame_rate
+        else:
+            self.tick_rate = 1.0
+        self.smpte = attributes.get("timeBase") == "smpte"
+        self.drop_ntsc = attributes.get("dropMode") == "dropNTSC"
+
+    def parse(self, expression):
+        """Seconds for a TTML time expression."""
+        expression = expression.strip()
+        match = OFFSET_TIME.match(expression)
+        if match:
+            value, metric = float(match.group(1)), match.group(2)
+            if metric == "f":
+                return value / self.effective_frame_rate
+            if metric == "t":
+                return value / self.tick_rate
+            return value * {"h": 3600, "m": 60, "s": 1, "ms": 0.001}[metric]
+
+        match = CLOCK_TIME.match(expression)
+        if not match:
+            raise ValueError(f"Unsupported time expression: {expression}")
+        hours, minutes, seconds = (int(group) for group in match.groups()[:3])
+        fraction, frames, sub_frames = match.groups()[3:]
+        if frames is None:
+            return hours * 3600 + minutes * 60 + seconds + float(fraction or 0)
+
+        frames = int(frames) + (int(sub_frames) / self.sub_frame_rate if sub_frames else 0)
+        if not self.smpte:
+            return hours * 3600 + minutes * 60 + seconds + frames / self.effective_frame_rate
+        # SMPTE time base: the label counts frames at the nominal rate, real time runs at the effective rate
+        count = (hours * 3600 + minutes * 60 + seconds) * round(self.frame_rate) + frames
+        if self.drop_ntsc:
+            total_minutes = hours * 60 + minutes
+            count -= 2 * (total_minutes - total_minutes // 10)
+        return count / self.effective_frame_rate
+
+def element_text(elem):
+    """Text of a subtitle element, with <br/> as line breaks and XML whitespace collapsed per line."""
+    parts = []
+
+    def collect(node):
+        if node.text:
+            parts.append(node.text)
+        for child in node:
+            if local_name(child.tag) == "br":
+                parts.append("\n")
+            else:
+                collect(child)
+            if child.tail:
+                parts.append(child.tail)
+
+    collect(elem)
+    lines = (" ".join(line.split()) for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+def ttml_range(elem, timing, offset):
+    """(start, end) of a TTML element in seconds, or None if it carries no timing."""
+    attributes = elem.attrib
+    if "begin" not in attributes and "end" not in attributes:
+        return None
+    begin = offset + timing.parse(attributes.get("begin", "0s"))
+    if "end" in attributes:
+        end = offset + timing.parse(attributes["end"])
+    elif "dur" in attributes:
+        end = begin + timing.parse(attributes["dur"])
+    else:
+        return None
+    return begin, end
+
+def span_range(elem, timing, offset):
+    """Range covered by the timed spans of a `p` that has no timing of its own."""
+    ranges = [ttml_range(span, timing, offset) for span in elem.iter() if span is not elem]
+    ranges = [r for r in ranges if r]
+    if not ranges:
+        return None
+    return min(start for start, _ in ranges), max(end for _, end in ranges)
+
+def iter_ttml(events, root):
+    timing = TimingParameters(local_attributes(root))
+    stack = [root]
+    offsets = [0.0]  # begin of each enclosing time container
+    number = 0
+    for event, elem in events:
+        name = local_name(elem.tag)
+        if event == "start":
+            stack.append(elem)
+            if name in ("body", "div"):
+                begin = elem.get("begin")
+                offsets.append(offsets[-1] + (timing.parse(begin) if begin else 0.0))
+            continue
+
+        stack.pop()
+        if name in ("body", "div"):
+            offsets.pop()
+        elif name == "p":
+            timed = ttml_range(elem, timing, offsets[-1]) or span_range(elem, timing, offsets[-1])
+            text = element_text(elem)
+            if timed and text:
+                number += 1
+                yield Cue(number, timed[0], timed[1], text)
+            stack[-1].remove(elem)  # Drop the finished cue so the tree never grows
+
+def usf_seconds(value):
+    """Seconds for a USF time (`hh:mm:ss.ddd`, `mm:ss.ddd` or `ss.ddd`)."""
+    parts = value.strip().replace(",", ".").split(":")
+    if not 1 <= len(parts) <= 3:
+        raise ValueError(f"Unsupported USF time: {value}")
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+def usf_range(elem):
+    """(start, end) of a USF subtitle: `start` plus `stop` or `duration`."""
+    start, stop, duration = elem.get("start"), elem.get("stop"), elem.get("duration")
+    if start is None or (stop is None and duration is None):
+        raise ValueError(f"USF subtitle without start and stop/duration (attributes: {dict(elem.attrib)})")
+    begin = usf_seconds(start)
+    return begin, usf_seconds(stop) if stop is not None else begin + usf_seconds(duration)
+
+def iter_usf(events, root):
+    stack = [root]
+    number = 0
+    for event, elem in events:
+        if event == "start":
+            stack.append(elem)
+            continue
+        stack.pop()
+        if local_name(elem.tag) == "subtitle":
+            text = "".join(t.text or "" for t in elem.iter() if local_name(t.tag) == "text").strip()
+            number += 1
+            yield Cue(number, *usf_range(elem), text)
+            stack[-1].remove(elem)
+
+def detect_format(root_tag):
+    name = local_name(root_tag)
+    if name == "tt":
+        return "ttml"
+    if name == "USFSubtitles":
+        return "usf"
+    return None
+
+def iter_xml_cues(source):
+    """
+    Yield the cues of a USF, TTML/DFXP or EBU-TT(-D) document given as a path,
+    bytes or binary file-like object. Raises ValueError for other XML.
+    """
+    with open_binary(source) as f:
+        events = ET.iterparse(f, events=("start", "end"))
+        _, root = next(events)
+        fmt = detect_format(root.tag)
+        if fmt is None:
+            raise ValueError(f"Not a USF or TTML document (root element <{local_name(root.tag)}>)")
+        yield from (iter_ttml if fmt == "ttml" else iter_usf)(events, root)
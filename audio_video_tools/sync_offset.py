@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+
+"""
+sync_offset.py
+
+Finds how an AD mix lines up with a candidate program source (another cut,
+a PAL or NTSC version, a file with a different pre-roll). It measures the
+start offset and any linear drift, then writes the results as a retimed
+SRT and as FFmpeg `atempo`/`adelay` parameters that conform the AD track
+to the source.
+
+Both files are decoded once to a mono, speech-band energy envelope at 10 ms
+resolution, the same way find_dialogue_gaps.py does. Each envelope is
+cached next to its file as `<file>.downmix.env.npy`. The envelopes are
+compared by their frame-to-frame changes, which the program audio under the
+AD narration shares with the source:
+
+1. Coarse: the whole envelopes, averaged to 100 ms, are cross-correlated
+   with one FFT for each candidate speed ratio (1, 24/23.976, 25/24,
+   25/23.976 and their inverses). The strongest peak gives the speed and a
+   rough offset.
+2. Fine: windows spread over the AD mix are cross-correlated at 10 ms
+   resolution, each only within a couple of seconds of where the coarse
+   result puts it, with sub-sample peak interpolation.
+3. A straight line fitted through the window positions gives the final
+   offset and speed (drift). Windows that don't agree with the fit, e.g.
+   where the cut differs, are dropped.
+
+A 2-hour pair takes a few seconds once decoded, instead of a brute-force
+scan.
+
+The mapping is `source time = offset + speed x AD time`. To conform the AD
+track, apply `atempo=1/speed`, then delay by the offset (or trim when it is
+negative).
+
+Examples:
+  python sync_offset.py ad_mix.wav program_v2.mkv
+  python sync_offset.py ad_mix.wav program_pal.mxf --srt ad_script.srt -o ad_script_pal.srt
+  python sync_offset.py ad_mix.wav program.mov --no-drift --json sync.json
+
+Dependencies:
+- NumPy
+- FFmpeg (`ffmpeg`) must be installed
+"""
+
+import os
+import sys
+import json
+import argparse
+
+from profiling import profile_from_argv, note_output, record_run
+if __name__ == "__main__":
+    profile_from_argv()
+
+import numpy as np
+
+from cues import parse_srt_cues, write_srt
+from find_dialogue_gaps import FRAME_SECONDS, compute_envelope, envelope_path
+
+ENVELOPE_FILTER = "highpass=f=200,lowpass=f=4000"
+COARSE_FACTOR = 10  # 100 ms coarse steps
+SPEED_CANDIDATES = [1.0, 24 / 23.976, 25 / 24, 25 / 23.976]
+FINE_WINDOW = 30.0  # seconds per fine window
+FINE_SEARCH = 2.0  # seconds searched either side of the coarse estimate
+FINE_WINDOWS = 12
+MIN_CONFIDENCE = 0.2
+
+def load_envelope(path, refresh=False):
+    """Full-mix mono envelope of a file in dBFS per 10 ms, decoded once and cached next to it."""
+    cache = envelope_path(path, "downmix")
+    if not refresh and os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(path):
+        return np.load(cache)
+    print(f"🔊 Decoding {os.path.basename(path)}...")
+    envelope = compute_envelope(path, ENVELOPE_FILTER)
+    np.save(cache, envelope)
+    return envelope
+
+def onsets(envelope, factor=1):
+    """Frame-to-frame level changes, averaged over `factor` frames and normalized, which is what gets correlated."""
+    levels = np.maximum(envelope.astype(np.float32), -60.0)
+    if factor > 1:
+        usable = len(levels) - len(levels) % factor
+        levels = levels[:usable].reshape(-1, factor).mean(axis=1)
+    changes = np.diff(levels, prepend=levels[:1])
+    spread = changes.std()
+    return (changes - changes.mean()) / spread if spread else changes
+
+def resample(signal, speed):
+    """`signal` read `speed` times faster, so that index k holds the value at position speed x k."""
+    if speed == 1.0:
+        return signal
+    positions = np.arange(0, (len(signal) - 1) / speed) * speed
+    return np.interp(positions, np.arange(len(signal)), signal)
+
+def cross_correlate(a, b):
+    """
+    Cross-correlation of two signals via FFT: value at lag L is sum(a[k] * b[k + L]),
+    lags from -(len(a) - 1) to len(b) - 1. Returns (lags, values).
+    """
+    size = 1 << int(np.ceil(np.log2(len(a) + len(b) - 1)))
+    spectrum = np.conj(np.fft.rfft(a, size)) * np.fft.rfft(b, size)
+    values = np.fft.irfft(spectrum, size)
+    values = np.concatenate((values[size - len(a) + 1:], values[:len(b)]))
+    return np.arange(-(len(a) - 1), len(b)), values
+
+def peak(lags, values):
+    """Lag of the highest value, refined to a fraction of a step with a parabola through its neighbours."""
+    i = int(np.argmax(values))
+    offset = 0.0
+    if 0 < i < len(values) - 1:
+        left, centre, right = values[i - 1], values[i], values[i + 1]
+        denominator = left - 2 * centre + right
+        if denominator:
+            offset = 0.5 * (left - right) / denominator
+    return lags[i] + offset, values[i]
+
+def coarse_match(ad, source, speeds):
+    """Best (speed, offset in seconds, score) over the candidate speeds, from whole-file correlations at 100 ms."""
+    step = FRAME_SECONDS * COARSE_FACTOR
+    a = onsets(ad, COARSE_FACTOR)
+    s = onsets(source, COARSE_FACTOR)
+    best = None
+    for speed in speeds:
+        scaled = resample(s, speed)
+        lag, value = peak(*cross_correlate(a, scaled))
+        overlap = min(len(a), len(scaled))
+        score = value / overlap
+        if best is None or score > best[2]:
+            best = (speed, speed * lag * step, score)
+    return best
+
+def fine_matches(ad, source, speed, offset, windows=FINE_WINDOWS):
+    """
+    (AD time, source time, confidence) for windows spread over the AD mix,
+    each matched at 10 ms resolution near the coarse estimate.
+    """
+    a = onsets(ad)
+    s = onsets(source)
+    width = int(FINE_WINDOW / FRAME_SECONDS)
+    search = int(FINE_SEARCH / FRAME_SECONDS)
+    if len(a) <= width:
+        starts = [0]
+        width = len(a)
+    else:
+        starts = np.linspace(0, len(a) - width, windows).astype(int)
+
+    matches = []
+    for start in starts:
+        window = a[start:start + width]
+        if not window.any():
+            continue
+        # Source position the coarse result predicts for the window, read at the coarse speed
+        predicted = (offset + speed * start * FRAME_SECONDS) / FRAME_SECONDS
+        first = int(predicted) - search
+        positions = first + np.arange(int(width * speed) + 2 * search)
+        inside = (positions >= 0) & (positions < len(s) - 1)
+        if inside.sum() < width:
+            continue  # The window falls outside the source
+        segment = np.zeros(len(positions))
+        segment[inside] = s[positions[inside]]
+        scaled = resample(segment, speed)[:width + int(2 * search / speed)]
+        lag, value = peak(*cross_correlate(window, scaled))
+        confidence = value / np.sqrt((window ** 2).sum() * (scaled[max(int(lag), 0):int(lag) + width] ** 2).sum() or 1.0)
+        source_time = (first + lag * speed) * FRAME_SECONDS
+        matches.append((start * FRAME_SECONDS, source_time, float(confidence)))
+    return matches
+
+def fit_line(matches, fit_speed=True, tolerance=0.1):
+    """
+    Least-squares offset and speed through the fine matches (speed fixed
+    at 1 without `fit_speed`), refitted without the matches that are more
+    than `tolerance` seconds off. Returns (offset, speed, matches used, worst residual).
+    """
+    used = [m for m in matches if m[2] >= MIN_CONFIDENCE]
+    for _ in range(3):
+        if not used:
+            return None
+        ad_times = np.array([m[0] for m in used])
+        source_times = np.array([m[1] for m in used])
+        if fit_speed and len(used) >= 2:
+            speed, offset = np.polyfit(ad_times, source_times, 1)
+        else:
+            speed, offset = 1.0, float(np.median(source_times - ad_times))
+        residuals = np.abs(source_times - (offset + speed * ad_times))
+        keep = residuals <= tolerance
+        if keep.all():
+            break
+        used = [m for m, k in zip(used, keep) if k]
+    return float(offset), float(speed), used, float(residuals.max()) if len(residuals) else 0.0
+
+def find_sync(ad_path, source_path, drift=True, refresh=False):
+    """Measure the offset and speed that map the AD mix's timeline onto the source's."""
+    ad = load_envelope(ad_path, refresh)
+    source = load_envelope(source_path, refresh)
+    if not len(ad) or not len(source):
+        raise ValueError("no audio decoded")
+
+    speeds = [1.0]
+    if drift:
+        speeds = sorted({s for candidate in SPEED_CANDIDATES for s in (candidate, 1 / candidate)})
+    speed, offset, score = coarse_match(ad, source, speeds)
+    matches = fine_matches(ad, source, speed, offset)
+    fitted = fit_line(matches, fit_speed=drift)
+    result = {"ad": ad_path, "source": source_path, "coarse_offset": offset, "coarse_speed": speed,
+              "coarse_score": float(score), "windows": matches}
+    if fitted is None:
+        print("⚠️ No fine window matched with confidence; using the coarse estimate")
+        result.update(offset=offset, speed=speed, windows_used=0, residual=None)
+    else:
+        result.update(offset=fitted[0], speed=fitted[1], windows_used=len(fitted[2]), residual=fitted[3])
+    return result
+
+def ffmpeg_filter(offset, speed):
+    """FFmpeg audio filter that conforms the AD track to the source timeline."""
+    filters = []
+    if abs(speed - 1.0) > 1e-6:
+        filters.append(f"atempo={1 / speed:.6f}")
+    if offset > 0:
+        filters.append(f"adelay={round(offset * 1000)}:all=1")
+    elif offset < 0:
+        filters.append(f"atrim=start={-offset:.3f},asetpts=PTS-STARTPTS")
+    return ",".join(filters) or "anull"
+
+def retime_cues(cues, offset, speed):
+    """Cues moved onto the source timeline; cues that would start before zero are dropped."""
+    moved = []
+    for cue in cues:
+        start, end = offset + speed * cue.start, offset + speed * cue.end
+        if end <= 0:
+            continue
+        moved.append(cue._replace(start=max(start, 0.0), end=end))
+    return moved
+
+def describe_speed(speed):
+    if abs(speed - 1.0) < 1e-5:
+        return "no drift"
+    for name, ratio in (("23.976 → 24", 24 / 23.976), ("24 → 25 (PAL speed-up)", 25 / 24),
+                        ("23.976 → 25 (PAL speed-up)", 25 / 23.976)):
+        for label, value in ((name, 1 / ratio), (f"inverse of {name}", ratio)):
+            if abs(speed - value) < 2e-4:
+                return label
+    return f"{(speed - 1) * 100:+.3f}%"
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the offset and drift between an AD mix and a program source.")
+    parser.add_argument("ad", help="AD mix (the timeline the AD script is timed to)")
+    parser.add_argument("source", help="Candidate program source to sync to")
+    parser.add_argument("--srt", default=None, help="AD script to retime onto the source")
+    parser.add_argument("-o", "--output", default=None, help="Retimed SRT (default: <srt>_synced.srt)")
+    parser.add_argument("--no-drift", dest="drift", action="store_false", help="Measure only an offset (same speed)")
+    parser.add_argument("--json", dest="json_file", default=None, help="Write the measurements to a JSON file")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached envelopes and decode again")
+    args = parser.parse_args()
+
+    for path in (args.ad, args.source):
+        if not os.path.isfile(path):
+            print(f"❌ File not found: {path}")
+            sys.exit(1)
+
+    try:
+        result = find_sync(args.ad, args.source, args.drift, args.refresh)
+    except (RuntimeError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    offset, speed = result["offset"], result["speed"]
+    result["ffmpeg_filter"] = ffmpeg_filter(offset, speed)
+    residual = f", worst window off by {result['residual'] * 1000:.0f} ms" if result["residual"] is not None else ""
+    print(f"⏱ Offset: {offset:+.3f}s  Speed: {speed:.6f} ({describe_speed(speed)})")
+    print(f"   {result['windows_used']} of {len(result['windows'])} windows agree{residual}")
+    print(f"🎚 Conform the AD track with: -af \"{result['ffmpeg_filter']}\"")
+
+    if args.srt:
+        output = args.output or f"{os.path.splitext(args.srt)[0]}_synced.srt"
+        note_output(output)
+        count = write_srt(retime_cues(parse_srt_cues(args.srt), offset, speed), output)
+        print(f"✅ {count} cues retimed to {output}")
+    if args.json_file:
+        with open(args.json_file, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"📝 Measurements written to {args.json_file}")
+
+if __name__ == "__main__":
+    with record_run():
+        main()
@@ -2,7 +2,15 @@
 
 import subprocess
 import os
-import sys
+import shutil
+import argparse
+
+from ffmpeg_runner import run_ffmpeg
+from batch_journal import staged_outputs
+import staging
+from profiling import profile_from_argv, note_output, record_run
+if __name__ == "__main__":
+    profile_from_argv()
 
 def extract_video_stream(input_file):
     """
@@ -21,6 +29,18 @@ def extract_video_stream(input_file):
     file_name, ext = os.path.splitext(base_name)  # Split the name and extension
     output_file = f"vo_{file_name}{ext}"  # Add 'vo_' prefix to the name
 
+    # Nothing to strip when the file holds nothing but one video stream: a plain copy runs at disk speed
+    from media_scan import probe
+
+    info = probe(input_file)
+    if info and not info["problems"] and not info["warnings"] and info["streams"] == 1 and len(info["video"]) == 1:
+        # Spelled like an FFmpeg job so the copy gets the same temporary name and staging as one
+        copy = ["-i", input_file, output_file]
+        with staged_outputs([output_file], copy,
+                            on_commit=lambda: print(f"Already video-only; copied to '{output_file}'.")) as (_, source, target):
+            shutil.copyfile(source, target)
+        return
+
     # FFmpeg command to copy only the video stream
     command = [
         "ffmpeg", "-i", input_file,
@@ -31,18 +51,21 @@ def extract_video_stream(input_file):
     ]
 
     try:
-        # Run the command
-        subprocess.run(command, check=True)
-        print(f"Video-only file saved as '{output_file}'.")
+        # Run the command; the output is written under a temporary name (and through local scratch with --stage-dir)
+        with staged_outputs([output_file], command,
+                            on_commit=lambda: print(f"Video-only file saved as '{output_file}'.")) as staged_command:
+            run_ffmpeg(staged_command, stage="video_only")
     except subprocess.CalledProcessError as e:
         print(f"Error: Failed to extract video stream. {e}")
 
 if __name__ == "__main__":
-    # Check if an argument was provided
-    if len(sys.argv) != 2:
-        print("Usage: python3 video_only.py <input_video_file>")
-        sys.exit(1)
-
-    # Get the input video file from the arguments
-    input_video = sys.argv[1]
-    extract_video_stream(input_video)
+    with record_run():
+        parser = argparse.ArgumentParser(description="Strip audio from videos, keeping the first video stream (written as vo_<name>).")
+        parser.add_argument("inputs", nargs="+", help="Input video file(s)")
+        staging.add_arguments(parser)
+        args = parser.parse_args()
+
+        note_output(args.inputs[0])
+        with staging.staging(args.inputs, args.stage_dir, args.stage_ahead, args.stage_budget):
+            for input_video in args.inputs:
+                extract_video_stream(input_video)
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+
+"""
+watch_folder.py
+
+Long-running watcher for ingest folders. Every new or changed file dropped
+into a watched folder is handed to the matching tool as soon as it has
+finished uploading:
+
+- `.srt`  -> converters/srt_to_studioscript.py  -> <name>_studioscript.xlsx
+- `.csv`  -> converters/frazier_csv_to_studioscript.py -> <name>_studioscript.xlsx
+- `.wav`  -> extract_wav_regions.py (session WAVs) -> <name>_reconstructed.srt
+- program files (`.mp4`, `.mkv`, `.m4a`, `.mp3`, ...) -> master.py -> <name>_mastered.<format>
+
+Deliverables are written to `<watched folder>/processed/` (or `--output`),
+mirroring any subfolders. Each job runs as its own process, at most
+`--jobs` at a time.
+
+How changes are detected:
+- Linux: inotify (through libc, no extra packages), plus a full rescan every
+  `--rescan` seconds because inotify never sees writes made by other hosts
+  on NFS/SMB shares
+- Elsewhere, or with `--poll`: a directory scan every `--interval` seconds
+
+A file is only dispatched once its size and modification time have stayed
+the same for `--settle` seconds, so half-copied uploads are left alone.
+Temporary upload names (`.part`, `.tmp`, `.crdownload`, hidden files) are
+ignored until they are renamed.
+
+The size/mtime of every file processed successfully is kept in a state file
+(`~/.config/ad-tools/watch_state.json` by default), so restarting the
+watcher only processes what changed while it was down.
+
+Usage:
+  python watch_folder.py /mnt/ingest --frame-rate 23.976 --profile Netflix --jobs 4
+"""
+
+import os
+import sys
+import json
+import time
+import struct
+import select
+import argparse
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from master import SUPPORTED_FORMATS, PROFILES
+from profiling import profile_from_argv, note_output
+if __name__ == "__main__":
+    profile_from_argv("--profile-run")
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+CONVERTERS_DIR = os.path.join(os.path.dirname(TOOLS_DIR), "converters")
+
+DEFAULT_STATE = os.path.expanduser("~/.config/ad-tools/watch_state.json")
+PROGRAM_FORMATS = [ext for ext in SUPPORTED_FORMATS if ext != ".wav"]
+TEMPORARY_SUFFIXES = (".part", ".partial", ".tmp", ".crdownload", ".download", "~")
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct("iIII")
+
+def log(message):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}", flush=True)
+
+def is_candidate(path):
+    name = os.path.basename(path)
+    return not name.startswith(".") and not name.lower().endswith(TEMPORARY_SUFFIXES)
+
+def file_signature(path):
+    """(size, mtime_ns) of a file, or None if it has gone away."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+def scan(folders, excluded):
+    """Return every candidate file under the watched folders."""
+    found = set()
+    for folder in folders:
+        for root, dirs, names in os.walk(folder):
+            dirs[:] = [d for d in dirs if not d.startswith(".") and os.path.join(root, d) not in excluded]
+            found.update(os.path.join(root, name) for name in names if is_candidate(name))
+    return found
+
+class PollingWatcher:
+    """Reports files whose size or mtime changed since the previous scan."""
+
+    def __init__(self, folders, excluded, interval):
+        self.folders, self.excluded, self.interval = folders, excluded, interval
+        self.seen = {}
+        self.last_scan = 0.0
+
+    def changes(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        if time.monotonic() - self.last_scan < self.interval:
+            return set()
+        self.last_scan = time.monotonic()
+        current = {path: file_signature(path) for path in scan(self.folders, self.excluded)}
+        changed = {path for path, sig in current.items() if sig and self.seen.get(path) != sig}
+        self.seen = current
+        return changed
+
+    def close(self):
+        pass
+
+class InotifyWatcher:
+    """Reports files touched according to inotify, watching every subfolder."""
+
+    def __init__(self, folders, excluded, rescan):
+        import ctypes
+        import ctypes.util
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.folders, self.excluded, self.rescan = folders, excluded, rescan
+        self.last_rescan = time.monotonic()
+        self.watches = {}
+        for folder in folders:
+            self.add_tree(folder)
+
+    def add_tree(self, folder):
+        for root, dirs, _ in os.walk(folder):
+            dirs[:] = [d for d in dirs if not d.startswith(".") and os.path.join(root, d) not in self.excluded]
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root), WATCH_MASK)
+            if wd >= 0:
+                self.watches[wd] = root
+
+    def changes(self, timeout):
+        changed = set()
+        if self.rescan and time.monotonic() - self.last_rescan >= self.rescan:
+            self.last_rescan = time.monotonic()
+            changed |= scan(self.folders, self.excluded)
+
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return changed
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                log("⚠️ inotify queue overflowed, rescanning")
+                changed |= scan(self.folders, self.excluded)
+                continue
+            if wd not in self.watches or not name:
+                continue
+            path = os.path.join(self.watches[wd], name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and path not in self.excluded:
+                    # A folder copied or moved in may already hold files
+                    self.add_tree(path)
+                    changed |= scan([path], self.excluded)
+            elif is_candidate(path):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+def make_watcher(args, folders, excluded):
+    if not args.poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(folders, excluded, args.rescan)
+        except (OSError, AttributeError) as e:
+            log(f"⚠️ inotify unavailable ({e}), falling back to polling")
+    return PollingWatcher(folders, excluded, args.interval)
+
+def output_dir_for(path, args):
+    """The folder a file's deliverables go to: processed/ (or --output) plus the file's subfolder."""
+    for folder in args.folders:
+        if path.startswith(folder + os.sep):
+            base = args.output or os.path.join(folder, "processed")
+            return os.path.join(base, os.path.relpath(os.path.dirname(path), folder))
+    return args.output or os.path.dirname(path)
+
+def build_job(path, args):
+    """Return (command, output path) for the tool that handles `path`, or None if no tool does."""
+    ext = os.path.splitext(path)[1].lower()
+    name = os.path.splitext(os.path.basename(path))[0]
+    out_dir = os.path.normpath(output_dir_for(path, args))
+    python = sys.executable
+
+    if ext == ".srt":
+        output = os.path.join(out_dir, f"{name}_studioscript.xlsx")
+        cmd = [python, os.path.join(CONVERTERS_DIR, "srt_to_studioscript.py"), path, output, str(args.frame_rate)]
+        if args.template:
+            cmd += ["--template", args.template]
+    elif ext == ".csv":
+        output = os.path.join(out_dir, f"{name}_studioscript.xlsx")
+        cmd = [python, os.path.join(CONVERTERS_DIR, "frazier_csv_to_studioscript.py"), path, output]
+        if args.template:
+            cmd += ["--template", args.template]
+    elif ext == ".wav":
+        # extract_wav_regions.py writes <name>_reconstructed.srt into the working directory
+        output = os.path.join(out_dir, f"{name}_reconstructed.srt")
+        cmd = [python, os.path.join(TOOLS_DIR, "extract_wav_regions.py"), path]
+    elif ext in PROGRAM_FORMATS:
+        output = os.path.join(out_dir, f"{name}_mastered.{args.format}")
+        cmd = [python, os.path.join(TOOLS_DIR, "master.py"), path, output, "--profile", args.profile]
+    else:
+        return None
+    return cmd, output
+
+def run_job(path, cmd, output):
+    """Run one tool as a child process. Returns (success, seconds, last lines of output)."""
+    out_dir = os.path.dirname(output)
+    os.makedirs(out_dir, exist_ok=True)
+    if os.path.exists(output):
+        os.remove(output)  # The input changed, so the old deliverable is stale (and FFmpeg would prompt)
+
+    start = time.perf_counter()
+    result = subprocess.run(cmd, cwd=out_dir, stdin=subprocess.DEVNULL,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="replace")
+    tail = "\n".join(result.stdout.strip().splitlines()[-10:])
+    success = result.returncode == 0 and os.path.exists(output)
+    return success, time.perf_counter() - start, tail
+
+def load_state(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return {key: tuple(value) for key, value in json.load(f).items()}
+    except (OSError, ValueError):
+        return {}
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp, path)
+
+def watch(args):
+    args.folders = [os.path.abspath(folder) for folder in args.folders]
+    excluded = {os.path.join(folder, "processed") for folder in args.folders}
+    if args.output:
+        args.output = os.path.abspath(args.output)
+        excluded.add(args.output)
+    note_output(args.output)
+
+    state = load_state(args.state)
+    watcher = make_watcher(args, args.folders, excluded)
+    mode = "inotify" if isinstance(watcher, InotifyWatcher) else f"polling every {args.interval:g}s"
+    log(f"👀 Watching {', '.join(args.folders)} ({mode}, {args.jobs} worker(s))")
+
+    pending = {}   # path -> (signature, time the signature was first seen)
+    running = {}   # future -> (path, signature, output)
+    rerun = set()  # paths that changed again while their job was running
+    failed = {}    # path -> signature of the version that failed, so it isn't retried until it changes
+
+    # Anything that changed while the watcher was not running
+    candidates = scan(args.folders, excluded)
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        try:
+            while True:
+                now = time.monotonic()
+                for path in candidates:
+                    sig = file_signature(path)
+                    if sig and (path not in pending or pending[path][0] != sig):
+                        pending[path] = (sig, now)
+
+                # Debounce: dispatch files whose size/mtime have been stable for --settle seconds
+                busy = {path for path, _, _ in running.values()}
+                for path, (sig, since) in list(pending.items()):
+                    current = file_signature(path)
+                    if current is None:
+                        del pending[path]
+                    elif current != sig:
+                        pending[path] = (current, now)
+                    elif now - since >= args.settle:
+                        if path in busy:
+                            rerun.add(path)
+                            continue
+                        del pending[path]
+                        job = build_job(path, args)
+                        if job is None or sig in (state.get(path), failed.get(path)):
+                            continue
+                        cmd, output = job
+                        log(f"🚀 {os.path.basename(path)} -> {os.path.basename(cmd[1])}")
+                        running[pool.submit(run_job, path, cmd, output)] = (path, sig, output)
+
+                for future in [f for f in running if f.done()]:
+                    path, sig, output = running.pop(future)
+                    try:
+                        success, seconds, tail = future.result()
+                    except Exception as e:
+                        success, seconds, tail = False, 0.0, str(e)
+                    if success:
+                        state[path] = sig
+                        save_state(args.state, state)
+                        log(f"✅ {os.path.basename(path)} -> {output} ({seconds:.1f}s)")
+                    else:
+                        failed[path] = sig
+                        log(f"❌ {os.path.basename(path)} failed after {seconds:.1f}s\n{tail}")
+                    if path in rerun:
+                        rerun.discard(path)
+                        pending[path] = (file_signature(path), time.monotonic())
+
+                # Wake up quickly while something is settling or running, otherwise wait for events
+                timeout = 0.5 if pending or running else 5.0
+                candidates = watcher.changes(timeout)
+        except KeyboardInterrupt:
+            log("🛑 Stopping, waiting for running jobs to finish...")
+        finally:
+            watcher.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch ingest folders and run the matching conversion for every new or changed file")
+    parser.add_argument("folders", nargs="+", help="Folder(s) to watch, including subfolders")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Folder for deliverables (default: a 'processed' folder inside each watched folder)")
+    parser.add_argument("--frame-rate", type=float, default=23.976,
+                        help="Frame rate for SRT to studio script conversion (default: 23.976)")
+    parser.add_argument("--template", default=None, help="Studio script Excel template")
+    parser.add_argument("--profile", default="Broadcast TV", choices=list(PROFILES),
+                        help="Loudness profile used by master.py for program files")
+    parser.add_argument("--format", default="aac", choices=["aac", "mp3", "eac3", "wav"],
+                        help="Output format for mastered program files (default: aac)")
+    parser.add_argument("-j", "--jobs", type=int, default=max(1, min(4, os.cpu_count() or 1)),
+                        help="Maximum number of jobs running at once")
+    parser.add_argument("--settle", type=float, default=3.0,
+                        help="Seconds a file's size must stay unchanged before it is processed (default: 3)")
+    parser.add_argument("--poll", action="store_true", help="Poll instead of using inotify")
+    parser.add_argument("--interval", type=float, default=2.0, help="Polling interval in seconds (default: 2)")
+    parser.add_argument("--rescan", type=float, default=300.0,
+                        help="With inotify, also rescan every N seconds to catch writes from other hosts; 0 disables (default: 300)")
+    parser.add_argument("--state", default=DEFAULT_STATE, help=f"State file (default: {DEFAULT_STATE})")
+    args = parser.parse_args()
+
+    for folder in args.folders:
+        if not os.path.isdir(folder):
+            parser.error(f"not a folder: {folder}")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    watch(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+"""
+fixtures.py
+
+Generators for the synthetic inputs used by `run_benchmarks.py`.
+
+Every generator writes a file of a requested size (number of cues or seconds
+of media) and returns its path, so each converter can be timed at several
+scales without shipping real client material.
+"""
+
+import os
+import struct
+import subprocess
+
+CUE_SPACING = 4.0
+CUE_LENGTH = 2.5
+
+def cue_times(count, frame_rate=25):
+    """Yield (index, start_seconds, end_seconds) for `count` evenly spaced cues."""
+    for i in range(1, count + 1):
+        start = 1.0 + (i - 1) * CUE_SPACING
+        yield i, start, start + CUE_LENGTH
+
+def cue_text(i):
+    if i % 5 == 0:
+        return f"[FAST] Cue {i}: she turns away from the window and crosses the room."
+    return f"Cue {i}: he picks up the letter, reads it and sets it down again."
+
+def srt_time(seconds):
+    ms = int(round(seconds * 1000))
+    return f"{ms // 3600000:02}:{ms // 60000 % 60:02}:{ms // 1000 % 60:02},{ms % 1000:03}"
+
+def smpte_time(seconds, frame_rate=25):
+    frames = int(round(seconds * frame_rate))
+    return (f"{frames // (3600 * frame_rate):02}:{frames // (60 * frame_rate) % 60:02}:"
+            f"{frames // frame_rate % 60:02}:{frames % frame_rate:02}")
+
+def make_srt(path, count, crlf=False, bom=False, multiline=False):
+    """Write an SRT with `count` cues, optionally with CRLF endings, a UTF-8 BOM and two-line cues."""
+    blocks = []
+    for i, start, end in cue_times(count):
+        text = cue_text(i)
+        if multiline:
+            text = text.replace(": ", ":\n", 1)
+        blocks.append(f"{i}\n{srt_time(start)} --> {srt_time(end)}\n{text}\n")
+    content = "\n".join(blocks) + "\n"
+    if crlf:
+        content = content.replace("\n", "\r\n")
+    with open(path, "w", encoding="utf-8-sig" if bom else "utf-8", newline="") as f:
+        f.write(content)
+    return path
+
+def make_accessible_txt(path, count):
+    """Write a plain-text script in the IN/OUT layout read by `txt_to_srt.py`."""
+    with open(path, "w", encoding="utf-8") as f:
+        for i, start, end in cue_times(count):
+            f.write(f"Line {i}:\nIN: {srt_time(start)[:8]}\nOUT: {srt_time(end + 1)[:8]}\n"
+                    f"{cue_text(i)}\nDuration: 3 seconds\n\n")
+    return path
+
+def make_frazier_csv(path, count, frame_rate=25):
+    """Write a semicolon-separated Frazier export with Position/Start/End/Text/Dialogue columns."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Position;Start;End;Text;Dialogue\n")
+        for i, start, end in cue_times(count):
+            dialogue = "[laughs] Over there." if i % 3 == 0 else "0"
+            text = cue_text(i).replace(";", ",")
+            f.write(f"{i};{smpte_time(start, frame_rate)};{smpte_time(end, frame_rate)};{text};{dialogue}\n")
+    return path
+
+def make_studioscript_xlsx(path, count, schema="line", frame_rate=25):
+    """
+    Write a studio-script workbook. `schema="line"` uses the Line Number /
+    Timecode In layout read by `xls_to_srt.py`, `schema="event"` the
+    Event Number / TimeCode In layout read by `xls_to_srt_v2.py`.
+    """
+    import openpyxl
+
+    if schema == "line":
+        headers = ["Line Number", "Timecode In", "Timecode Out", "Script (en)", "On Screen Note (en)"]
+    else:
+        headers = ["Event Number", "TimeCode In", "TimeCode Out", "Event", "Notes"]
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(headers)
+    for i, start, end in cue_times(count):
+        ws.append([i, smpte_time(start, frame_rate), smpte_time(end, frame_rate), cue_text(i), None])
+    wb.save(path)
+    return path
+
+def make_usf(path, count):
+    """Write a USF subtitle file with `count` subtitles."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<USFSubtitles version="1.0">\n<subtitles>\n')
+        for i, start, end in cue_times(count):
+            f.write(f'<subtitle start="{srt_time(start).replace(",", ".")}" stop="{srt_time(end).replace(",", ".")}">'
+                    f'<text>{cue_text(i)}</text></subtitle>\n')
+        f.write("</subtitles>\n</USFSubtitles>\n")
+    return path
+
+def make_rpp_template(path):
+    """Write a minimal Reaper project to inject markers into."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<REAPER_PROJECT 0.1 "7.0/macOS-arm64" 1700000000\n'
+                '  RIPPLE 0\n  TEMPO 120 4 4\n  SAMPLERATE 48000 0 0\n'
+                '  <TRACK {00000000-0000-0000-0000-000000000001}\n    NAME "AD"\n  >\n>\n')
+    return path
+
+def make_riff_wav(path, count, sample_rate=48000, seconds=1.0):
+    """
+    Write a short mono 16-bit WAV carrying `count` cue points with `labl` and
+    `ltxt` entries, like a region WAV exported from Reaper or Logic.
+    """
+    frames = b"\x00\x00" * int(sample_rate * seconds)
+
+    cue_data = struct.pack("<I", count)
+    adtl = b""
+    for i, start, end in cue_times(count):
+        offset = int(start * sample_rate)
+        cue_data += struct.pack("<II4sIII", i, offset, b"data", 0, 0, offset)
+        label = cue_text(i).encode("utf-8") + b"\x00"
+        if len(label) % 2:
+            label += b"\x00"
+        adtl += struct.pack("<4sII", b"labl", len(label) + 4, i) + label
+        adtl += struct.pack("<4sIII4sHHHH", b"ltxt", 20, i, int((end - start) * sample_rate), b"rgn ", 0, 0, 0, 0)
+
+    chunks = (
+        b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16)
+        + b"data" + struct.pack("<I", len(frames)) + frames
+        + b"cue " + struct.pack("<I", len(cue_data)) + cue_data
+        + b"LIST" + struct.pack("<I", len(adtl) + 4) + b"adtl" + adtl
+    )
+    with open(path, "wb") as f:
+        f.write(b"RIFF" + struct.pack("<I", len(chunks) + 4) + b"WAVE" + chunks)
+    return path
+
+def make_media(path, seconds, video=False, channels=2):
+    """Generate short test media with FFmpeg's lavfi sources (sine tone, optional test pattern)."""
+    layout = {1: "mono", 2: "stereo", 6: "5.1"}[channels]
+    cmd = ["ffmpeg", "-v", "error", "-y",
+           "-f", "lavfi", "-i", f"sine=f=440:r=48000:d={seconds}"]
+    if video:
+        cmd += ["-f", "lavfi", "-i", f"testsrc=s=640x360:r=25:d={seconds}",
+                "-map", "1:v", "-map", "0:a", "-c:v", "libx264", "-preset", "ultrafast"]
+    cmd += ["-af", f"aformat=channel_layouts={layout}", path]
+    subprocess.run(cmd, check=True)
+    return path
+
+def fixture_path(directory, name):
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, name)
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+
+"""
+run_benchmarks.py
+
+Times every converter and tool against synthetic fixtures at several scales
+and reports throughput and peak memory, optionally comparing with a stored
+baseline.
+
+Each case is run `--repeat` times and the fastest run is kept. Peak memory is
+measured in a separate run under `tracemalloc` (Python allocations) so the
+timing runs aren't slowed down by it; for FFmpeg-based cases the child
+process' max RSS is reported instead. Media cases are skipped when FFmpeg
+isn't installed, and cases whose dependencies (pandas, openpyxl, srt,
+moviepy) can't be imported are skipped with a note.
+
+Timings depend on the machine, so no baseline is committed: record one on
+each machine that checks for regressions (a CI runner, a render node) from
+a known-good checkout, and compare later runs on that machine with it.
+A run without a baseline, or with cases missing from it, says so; with
+`--fail-on-regression` it fails, since nothing was checked.
+
+Examples:
+  # Record the baseline on this machine (benchmarks/baseline.json)
+  python benchmarks/run_benchmarks.py --save-baseline
+
+  # Run everything and compare with that baseline
+  python benchmarks/run_benchmarks.py
+
+  # Only the SRT converters, and store the results as the new baseline
+  python benchmarks/run_benchmarks.py --filter srt --save-baseline
+
+  # Fail (exit 1) if anything got more than 25% slower than the baseline
+  python benchmarks/run_benchmarks.py --fail-on-regression --tolerance 1.25
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import runpy
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+from pathlib import Path
+
+import fixtures
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+CUE_SCALES = [100, 1000, 5000]
+SRT_VARIANTS = {
+    "plain": {},
+    "crlf+bom": {"crlf": True, "bom": True},
+    "multiline": {"multiline": True},
+}
+
+# Tools run in this process (run_script) must not land in the run history as real runs
+os.environ["AD_TOOLS_RUN_HISTORY"] = ""
+
+_modules = {}
+
+def load_tool(relative_path):
+    """Load a tool's functions without running its command-line entry point."""
+    if relative_path not in _modules:
+        path = os.path.join(ROOT, relative_path)
+        sys.path.insert(0, os.path.dirname(path))
+        try:
+            _modules[relative_path] = runpy.run_path(path, run_name="benchmark")
+        finally:
+            sys.path.pop(0)
+    return _modules[relative_path]
+
+def run_script(relative_path, *args):
+    """Run a script that has no functions to call, as if from the command line."""
+    path = os.path.join(ROOT, relative_path)
+    saved_argv = sys.argv
+    sys.argv = [path] + [str(arg) for arg in args]
+    try:
+        runpy.run_path(path, run_name="__main__")
+    finally:
+        sys.argv = saved_argv
+
+def fixed_frame_rate(namespace, rate=25.0):
+    """Replace a tool's ffprobe/moviepy frame-rate lookup so only the conversion itself is timed."""
+    # run_path() hands back a copy of the globals, so patch the dict the functions actually use
+    namespace["get_frame_rate"].__globals__["get_frame_rate"] = lambda _video: rate
+    return namespace
+
+# Case builders: each takes (workdir, scale, variant) and returns the callable to time.
+
+def srt_fixture(workdir, scale, variant):
+    return fixtures.make_srt(fixtures.fixture_path(workdir, f"in_{scale}_{variant}.srt"), scale, **SRT_VARIANTS[variant])
+
+def case_srt_to_studioscript(workdir, scale, variant):
+    tool = load_tool("converters/srt_to_studioscript.py")
+    srt_path = srt_fixture(workdir, scale, variant)
+    return lambda: tool["srt_to_excel"](srt_path, os.path.join(workdir, "out.xlsx"), 25, None)
+
+def case_srt2regions(workdir, scale, variant):
+    tool = load_tool("converters/srt2regions.py")
+    srt_path = srt_fixture(workdir, scale, variant)
+    return lambda: tool["add_region_markers"](srt_path, os.path.join(workdir, "out_regions.wav"))
+
+def case_srt_to_reaper_markers(workdir, scale, variant):
+    tool = load_tool("converters/srt_to_reaper_markers.py")
+    srt_path = srt_fixture(workdir, scale, variant)
+    template = fixtures.make_rpp_template(os.path.join(workdir, "template.rpp"))
+    return lambda: tool["inject_markers_into_rpp"](template, tool["srt_to_markers"](srt_path),
+                                                   os.path.join(workdir, "out.rpp"))
+
+def case_srt_to_rtf_accessible(workdir, scale, variant):
+    tool = load_tool("converters/srt_to_rtf_accessible.py")
+    srt_path = srt_fixture(workdir, scale, variant)
+    return lambda: tool["convert_srt_to_accessible_formats"](srt_path, False, True)
+
+def case_srt_to_audition(workdir, scale, variant):
+    tool = fixed_frame_rate(load_tool("converters/srt_to_audition.py"))
+    srt_path = srt_fixture(workdir, scale, variant)
+    video = os.path.join(workdir, "placeholder.mp4")
+    open(video, "a").close()
+    return lambda: tool["convert_srt_to_csv"](srt_path, video)
+
+def case_audacity_r2(workdir, scale, variant):
+    srt_path = srt_fixture(workdir, scale, variant)
+    return lambda: run_script("audacity_helpers/srt_2_audacity_r2.py", srt_path, os.path.join(workdir, "labels.txt"))
+
+def case_audacity_r3(workdir, scale, variant):
+    srt_path = srt_fixture(workdir, scale, variant)
+    return lambda: run_script("audacity_helpers/2audacity_r3.py", srt_path, os.path.join(workdir, "labels.txt"))
+
+def case_txt_to_srt(workdir, scale, variant):
+    tool = load_tool("converters/txt_to_srt.py")
+    txt_path = fixtures.make_accessible_txt(os.path.join(workdir, f"script_{scale}.txt"), scale)
+    return lambda: tool["process_txt_to_srt"](txt_path)
+
+def case_usf_to_srt(workdir, scale, variant):
+    tool = load_tool("converters/usf_to_srt.py")
+    usf_path = fixtures.make_usf(os.path.join(workdir, f"subs_{scale}.usf"), scale)
+    return lambda: tool["usf_to_srt"](usf_path)
+
+def case_xls_to_srt(workdir, scale, variant):
+    tool = fixed_frame_rate(load_tool("converters/xls_to_srt.py"))
+    xlsx = fixtures.make_studioscript_xlsx(os.path.join(workdir, f"script_{scale}.xlsx"), scale, "line")
+    return lambda: tool["excel_to_srt"](xlsx, os.path.join(workdir, "out.srt"), None)
+
+def case_xls_to_srt_v2(workdir, scale, variant):
+    tool = fixed_frame_rate(load_tool("converters/xls_to_srt_v2.py"))
+    xlsx = fixtures.make_studioscript_xlsx(os.path.join(workdir, f"events_{scale}.xlsx"), scale, "event")
+    return lambda: tool["excel_to_srt"](xlsx, os.path.join(workdir, "out.srt"), None)
+
+def case_frazier_csv(workdir, scale, variant):
+    tool = load_tool("converters/frazier_csv_to_studioscript.py")
+    csv_path = fixtures.make_frazier_csv(os.path.join(workdir, f"frazier_{scale}.csv"), scale)
+    return lambda: tool["csv_to_excel"](csv_path, os.path.join(workdir, "out.xlsx"), None)
+
+def case_extract_wav_regions(workdir, scale, variant):
+    tool = load_tool("audio_video_tools/extract_wav_regions.py")
+    wav = fixtures.make_riff_wav(os.path.join(workdir, f"regions_{scale}.wav"), scale)
+
+    def run():
+        cues, labels, lengths = tool["extract_riff_metadata"](wav)
+        tool["generate_srt_from_riff"](cues, labels, lengths)
+    return run
+
+def case_convert_audio(workdir, scale, variant):
+    tool = load_tool("audio_video_tools/convert_audio.py")
+    media = fixtures.make_media(os.path.join(workdir, f"program_{scale}.ac3"), scale, channels=6)
+    outdir = os.path.join(workdir, "converted")
+
+    def run():
+        shutil.rmtree(outdir, ignore_errors=True)
+        os.makedirs(outdir)
+        tool["convert_to_wav"](media, Path(outdir), "stereo")
+    return run
+
+def case_master(workdir, scale, variant):
+    tool = load_tool("audio_video_tools/master.py")
+    media = fixtures.make_media(os.path.join(workdir, f"mix_{scale}.wav"), scale)
+    output = os.path.join(workdir, "mastered.m4a")
+
+    def run():
+        if os.path.exists(output):
+            os.remove(output)
+        tool["process_file"](media, output, tool["PROFILES"]["Broadcast TV"], False, "aac", "192k", False, 48000)
+    return run
+
+def case_video_only(workdir, scale, variant):
+    tool = load_tool("audio_video_tools/video_only.py")
+    media = fixtures.make_media(os.path.join(workdir, f"program_{scale}.mp4"), scale, video=True)
+
+    def run():
+        output = f"vo_program_{scale}.mp4"
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(output)
+        tool["extract_video_stream"](media)
+        os.remove(output)
+    return run
+
+# (name, builder, scales, SRT variants, unit, uses FFmpeg)
+CASES = [
+    ("srt_to_studioscript", case_srt_to_studioscript, CUE_SCALES, list(SRT_VARIANTS), "cues", False),
+    ("srt2regions", case_srt2regions, [10, 50, 100], list(SRT_VARIANTS), "cues", False),
+    ("srt_to_reaper_markers", case_srt_to_reaper_markers, CUE_SCALES, list(SRT_VARIANTS), "cues", False),
+    ("srt_to_rtf_accessible", case_srt_to_rtf_accessible, CUE_SCALES, list(SRT_VARIANTS), "cues", False),
+    ("srt_to_audition", case_srt_to_audition, CUE_SCALES, list(SRT_VARIANTS), "cues", False),
+    ("srt_2_audacity_r2", case_audacity_r2, CUE_SCALES, list(SRT_VARIANTS), "cues", False),
+    ("2audacity_r3", case_audacity_r3, CUE_SCALES, list(SRT_VARIANTS), "cues", False),
+    ("txt_to_srt", case_txt_to_srt, CUE_SCALES, ["plain"], "cues", False),
+    ("usf_to_srt", case_usf_to_srt, CUE_SCALES, ["plain"], "cues", False),
+    ("xls_to_srt", case_xls_to_srt, CUE_SCALES, ["plain"], "cues", False),
+    ("xls_to_srt_v2", case_xls_to_srt_v2, CUE_SCALES, ["plain"], "cues", False),
+    ("frazier_csv_to_studioscript", case_frazier_csv, CUE_SCALES, ["plain"], "cues", False),
+    ("extract_wav_regions", case_extract_wav_regions, CUE_SCALES, ["plain"], "cues", False),
+    ("convert_audio", case_convert_audio, [10, 60, 300], ["plain"], "s", True),
+    ("master", case_master, [10, 60, 300], ["plain"], "s", True),
+    ("video_only", case_video_only, [10, 60], ["plain"], "s", True),
+]
+
+def child_max_rss():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss * 1024 if sys.platform != "darwin" else rss
+
+def measure(run, repeat, uses_ffmpeg):
+    """Return (best wall time, peak memory in bytes) for a prepared case."""
+    best = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    if uses_ffmpeg:
+        return best, child_max_rss()
+
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+def run_case(builder, case_dir, scale, variant, repeat, uses_ffmpeg):
+    os.makedirs(case_dir, exist_ok=True)
+    cwd = os.getcwd()
+    # Some tools write next to the current directory, keep that inside the scratch area
+    os.chdir(case_dir)
+    try:
+        run = builder(case_dir, scale, variant)
+        return measure(run, repeat, uses_ffmpeg)
+    finally:
+        os.chdir(cwd)
+
+def run_cases(selected, repeat, workdir):
+    results = {}
+    have_ffmpeg = shutil.which("ffmpeg") and shutil.which("ffprobe")
+    for name, builder, scales, variants, unit, uses_ffmpeg in selected:
+        if uses_ffmpeg and not have_ffmpeg:
+            print(f"  skip {name}: FFmpeg not installed")
+            continue
+        try:
+            for variant in variants:
+                for scale in scales:
+                    key = f"{name}[{variant}]@{scale}"
+                    try:
+                        wall, peak = run_case(builder, os.path.join(workdir, name), scale, variant, repeat, uses_ffmpeg)
+                    except ImportError:
+                        raise
+                    except (Exception, SystemExit) as e:
+                        print(f"  fail {key}: {type(e).__name__}: {e}")
+                        results[key] = {"error": f"{type(e).__name__}: {e}"}
+                        continue
+                    results[key] = {
+                        "scale": scale,
+                        "unit": unit,
+                        "wall": round(wall, 6),
+                        "throughput": round(scale / wall, 2) if wall else None,
+                        "peak_bytes": peak,
+                    }
+        except ImportError as e:
+            print(f"  skip {name}: {e}")
+    return results
+
+def print_report(results, baseline, tolerance):
+    """Print the results table; returns the list of regressed case keys."""
+    regressions = []
+    print(f"\n{'case':<50}{'time':>10}{'throughput':>16}{'peak MiB':>10}{'vs base':>10}")
+    for key, result in results.items():
+        if "error" in result:
+            print(f"{key:<50}{'ERROR':>10}  {result['error']}")
+            continue
+        ratio = ""
+        base = baseline.get(key)
+        if base and "wall" in base and base["wall"]:
+            factor = result["wall"] / base["wall"]
+            ratio = f"{factor:.2f}x"
+            if factor > tolerance:
+                regressions.append(key)
+                ratio += " ⚠️"
+        peak = f"{result['peak_bytes'] / 1048576:.1f}" if result["peak_bytes"] else "-"
+        throughput = f"{result['throughput']:.0f} {result['unit']}/s" if result["throughput"] else "-"
+        print(f"{key:<50}{result['wall'] * 1000:>8.1f}ms{throughput:>16}{peak:>10}{ratio:>10}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the converters and tools on synthetic fixtures")
+    parser.add_argument("--filter", help="Only run cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case, fastest is kept (default: 3)")
+    parser.add_argument("--quick", action="store_true", help="Only run the smallest scale of each case")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="Slowdown factor versus the baseline that counts as a regression (default: 1.25)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on any regression")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    selected = [case for case in CASES if not args.filter or args.filter in case[0]]
+    if args.quick:
+        selected = [case[:2] + (case[2][:1],) + case[3:] for case in selected]
+
+    workdir = tempfile.mkdtemp(prefix="adtools_bench_")
+    try:
+        results = run_cases(selected, args.repeat, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = print_report(results, baseline, args.tolerance)
+    unchecked = [key for key, value in results.items() if "error" not in value and not baseline.get(key)]
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        baseline.update({key: value for key, value in results.items() if "error" not in value})
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.baseline}")
+
+    if unchecked and not args.save_baseline:
+        if not baseline:
+            print(f"\n⚠️ No baseline at {args.baseline}: nothing was checked for regressions.")
+        else:
+            print(f"\n⚠️ {len(unchecked)} case(s) have no baseline entry and were not checked.")
+        print("   Record one on this machine with --save-baseline (see the top of this file).")
+    if regressions:
+        print(f"\n⚠️ {len(regressions)} case(s) slower than {args.tolerance}x baseline")
+    if args.fail_on_regression and (regressions or unchecked and not args.save_baseline):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
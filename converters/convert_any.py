@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+
+"""
+convert_any.py
+
+Converts subtitle and script files of any supported format to one target
+format, without having to know which converter script handles what. Each
+input's format is identified by sniffing its first few KB (the extension is
+ignored), then it is read with the matching converter's parser:
+
+  srt          SubRip                                   (cues.py)
+  usf          USF XML                                  (subtitle_xml.py)
+  ttml         TTML / DFXP / EBU-TT(-D) XML             (subtitle_xml.py)
+  frazier      Frazier CSV export                       (frazier_csv_to_studioscript.py)
+  xlsx-line    studio script, Line Number layout        (xls_to_srt.py)
+  xlsx-event   studio script, Event Number layout       (xls_to_srt_v2.py)
+  txt          accessible IN/OUT text script            (txt_to_srt.py)
+  audacity     Audacity label track                     (2audacity_r3.py / srt_2_audacity_r2.py output)
+
+and written as `--to` srt or any export_all.py format (studioscript, rtf,
+txt, reaper, audition, regions, audacity, audacity-r2).
+
+Folders are searched recursively and their files converted in parallel, one
+file per worker process, so a whole mixed-format client archive is
+normalized with one command. With `-o`, the archive's folder structure is
+recreated under the output folder. Inputs that would get the same output
+name (episode.srt and episode.usf) keep their extension in it
+(episode_srt.*, episode_usf.*); unrecognised files never take a name.
+
+Usage:
+  python convert_any.py archive/ --to srt -o normalized/ --frame-rate 25
+  python convert_any.py episode.dfxp script.xlsx --to studioscript --frame-rate 23.976
+  python convert_any.py archive/ --detect
+"""
+
+import io
+import os
+import re
+import sys
+import argparse
+import importlib
+from collections import Counter
+from multiprocessing import Pool
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'audio_video_tools'))
+sys.path.insert(1, os.path.join(HERE, '..', 'audacity_helpers'))
+from profiling import profile_from_argv, note_output, record_run
+if __name__ == "__main__":
+    profile_from_argv()
+
+from cues import Cue, TIMING, parse_srt_cues, write_srt
+from sources import read_text
+
+SNIFF_BYTES = 4096
+SOURCE_FORMATS = ["srt", "usf", "ttml", "frazier", "xlsx-line", "xlsx-event", "txt", "audacity"]
+TARGET_FORMATS = ["srt", "studioscript", "rtf", "txt", "reaper", "audition", "regions", "audacity", "audacity-r2"]
+# Extensions picked up when searching folders; files named on the command line are always sniffed
+CANDIDATE_EXTENSIONS = (".srt", ".usf", ".xml", ".ttml", ".dfxp", ".csv", ".xlsx", ".txt")
+
+XML_ROOT = re.compile(r"<(?![?!])(?:[\w.-]+:)?([\w.-]+)")
+AUDACITY_LINE = re.compile(r"^\d+(?:\.\d+)?\t\d+(?:\.\d+)?(?:\t|$)")
+TXT_TIMECODE = re.compile(r"^IN: \d+:\d{2}:\d{2}\s*$", re.M)
+
+class Skipped(Exception):
+    """An input that isn't converted (unrecognised, or already in the target format)."""
+
+def sniff_workbook(path):
+    """Studio script layout from an XLSX header row (read-only, first row only)."""
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        header = next(wb.active.iter_rows(max_row=1, values_only=True), ())
+    finally:
+        wb.close()
+    if "Line Number" in header:
+        return "xlsx-line"
+    if "Event Number" in header:
+        return "xlsx-event"
+    return None
+
+def sniff_format(path):
+    """Identify a file's format from its first few KB. Returns None when it isn't recognised."""
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    if head.startswith(b"PK\x03\x04"):
+        return sniff_workbook(path)
+
+    text = head.decode("utf-8", errors="replace").lstrip("\ufeff").replace("\r\n", "\n").lstrip()
+    if text.startswith("<"):
+        root = XML_ROOT.search(text)
+        name = root.group(1) if root else None
+        return {"USFSubtitles": "usf", "tt": "ttml"}.get(name)
+
+    first_line = text.split("\n", 1)[0]
+    if {"Position", "Start", "End", "Text"} <= {field.strip() for field in first_line.split(";")}:
+        return "frazier"
+    if TIMING.search(text):
+        return "srt"
+    if TXT_TIMECODE.search(text) and "OUT:" in text:
+        return "txt"
+    if AUDACITY_LINE.match(first_line):
+        return "audacity"
+    return None
+
+def audacity_to_cues(source):
+    """Cues from an Audacity label track (start, end and label, tab-separated, in seconds)."""
+    cues = []
+    for line in read_text(source).split("\n"):
+        fields = line.split("\t")
+        if len(fields) < 2 or not AUDACITY_LINE.match(line):
+            continue  # Blank lines and the "\" frequency lines of spectral labels
+        label = fields[2].strip() if len(fields) > 2 else ""
+        cues.append(Cue(len(cues) + 1, float(fields[0]), float(fields[1]), label))
+    return cues
+
+def excel_cues(path, frame_rate, script):
+    srt_text = importlib.import_module(script).excel_to_srt(path, None, frame_rate=frame_rate)
+    return parse_srt_cues(io.StringIO(srt_text))
+
+def read_cues(path, fmt, frame_rate=None):
+    """Parse a file of a known source format into cues."""
+    if fmt in ("frazier", "xlsx-line", "xlsx-event") and frame_rate is None:
+        raise ValueError(f"{fmt} timecodes are in frames; --frame-rate is required")
+    if fmt == "srt":
+        return parse_srt_cues(path)
+    if fmt in ("usf", "ttml"):
+        return list(importlib.import_module("subtitle_xml").iter_xml_cues(path))
+    if fmt == "frazier":
+        return importlib.import_module("frazier_csv_to_studioscript").frazier_to_cues(path, frame_rate)
+    if fmt == "xlsx-line":
+        return excel_cues(path, frame_rate, "xls_to_srt")
+    if fmt == "xlsx-event":
+        return excel_cues(path, frame_rate, "xls_to_srt_v2")
+    if fmt == "txt":
+        return importlib.import_module("txt_to_srt").txt_to_cues(path)
+    if fmt == "audacity":
+        return audacity_to_cues(path)
+    raise ValueError(f"unknown source format: {fmt}")
+
+def target_path(base, target):
+    if target == "srt":
+        return f"{base}.srt"
+    return importlib.import_module("export_all").output_paths(base)[target]
+
+def convert_file(path, output_base, args, fmt=None):
+    """Sniff (unless `fmt` is known), parse and write one file. Returns (source format, cue count, output path)."""
+    fmt = fmt or args.source_format or sniff_format(path)
+    if fmt is None:
+        raise Skipped("unrecognised format")
+    output = target_path(output_base, args.target)
+    if os.path.abspath(output) == os.path.abspath(path):
+        raise Skipped("the output would overwrite the input (use -o)")
+
+    cues = read_cues(path, fmt, args.frame_rate)
+    if not cues:
+        raise ValueError(f"no cues found ({fmt})")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    if args.target == "srt":
+        write_srt(cues, output)
+    else:
+        importlib.import_module("export_all").WRITERS[args.target](cues, output, args)
+    return fmt, len(cues), output
+
+def _convert_safely(job):
+    path, output_base, args, fmt = job
+    try:
+        fmt, count, output = convert_file(path, output_base, args, fmt)
+        return {"file": path, "format": fmt, "cues": count, "output": output}
+    except Skipped as e:
+        return {"file": path, "skipped": e.args[0]}
+    except Exception as e:
+        return {"file": path, "error": str(e)}
+
+def _detect_safely(path):
+    try:
+        return {"file": path, "format": sniff_format(path)}
+    except Exception as e:
+        return {"file": path, "error": str(e)}
+
+def run_pool(worker, jobs, processes=None):
+    """Run jobs in parallel, one file per worker process."""
+    if len(jobs) == 1:
+        return [worker(jobs[0])]
+    with Pool(processes=processes or os.cpu_count()) as pool:
+        return pool.map(worker, jobs, chunksize=1)
+
+def collect_inputs(paths, output_dir=None):
+    """
+    Expand the command-line paths into (file, output base) pairs. Folders are
+    searched recursively; with an output folder their structure is kept.
+    """
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(CANDIDATE_EXTENSIONS) and not name.startswith("."):
+                        file = os.path.join(root, name)
+                        relative = os.path.relpath(file, path)
+                        base = os.path.join(output_dir, relative) if output_dir else file
+                        inputs.append((file, os.path.splitext(base)[0]))
+        else:
+            base = os.path.join(output_dir, os.path.basename(path)) if output_dir else path
+            inputs.append((path, os.path.splitext(base)[0]))
+    return inputs
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert mixed subtitle/script files to one format, detecting each input's format.")
+    parser.add_argument("paths", nargs="+", help="Files and/or folders (searched recursively)")
+    parser.add_argument("--to", dest="target", choices=TARGET_FORMATS, default="srt", help="Target format (default: srt)")
+    parser.add_argument("--from", dest="source_format", choices=SOURCE_FORMATS, default=None,
+                        help="Treat every input as this format instead of sniffing it")
+    parser.add_argument("--detect", action="store_true", help="Only print the detected format of each input")
+    parser.add_argument("-o", "--output-dir", default=None, help="Output folder (default: next to each input)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--frame-rate", type=float, default=None,
+                        help="Frame rate for frame-based timecodes (Frazier CSV, studio script XLSX, studioscript/audition output)")
+    parser.add_argument("--template", default=os.path.expanduser("~/Documents/studioscript_template.xlsx"),
+                        help="Studio script Excel template")
+    parser.add_argument("--rpp-template", default=None, help="Base Reaper project for --to reaper")
+    parser.add_argument("--tc", "--timecodes", dest="timecodes", action="store_true",
+                        help="Include IN/OUT timecodes in RTF and text scripts")
+    parser.add_argument("--rate", type=int, default=48000, help="Region WAV sample rate (default: 48000)")
+    parser.add_argument("--bitdepth", type=int, default=24, help="Region WAV bit depth (default: 24)")
+    parser.add_argument("--channels", type=int, default=1, help="Region WAV channels (default: 1)")
+    args = parser.parse_args()
+
+    if args.target == "reaper" and not args.rpp_template:
+        parser.error("--to reaper needs --rpp-template")
+    if args.target in ("studioscript", "audition") and args.frame_rate is None:
+        parser.error(f"--to {args.target} needs --frame-rate")
+
+    inputs = collect_inputs(args.paths, args.output_dir)
+    if not inputs:
+        print("⚠️ No input files found.")
+        return
+
+    if args.detect:
+        for result in run_pool(_detect_safely, [file for file, _ in inputs], args.jobs):
+            if "error" in result:
+                print(f"❌ {result['file']}: {result['error']}")
+            else:
+                print(f"{result['format'] or 'unknown':<11} {result['file']}")
+        return
+
+    # Sniff everything first, so an unrecognised file can't take the output name of one that converts
+    failed = 0
+    formats = {}
+    if args.source_format:
+        formats = {file: args.source_format for file, _ in inputs}
+    else:
+        for result in run_pool(_detect_safely, [file for file, _ in inputs], args.jobs):
+            if "error" in result:
+                failed += 1
+                print(f"❌ {result['file']}: {result['error']}")
+            elif result["format"] is None:
+                print(f"⚠️ Skipped {result['file']}: unrecognised format")
+            else:
+                formats[result["file"]] = result["format"]
+    recognised = [(file, base) for file, base in inputs if file in formats]
+
+    # Inputs with the same name (episode.srt and episode.usf) keep their extension in it: episode_srt.*, episode_usf.*
+    names = Counter(base for _, base in recognised)
+    seen = {}
+    jobs = []
+    for file, base in recognised:
+        if names[base] > 1:
+            base = f"{base}_{os.path.splitext(file)[1][1:].lower()}"
+        if base in seen:
+            print(f"⚠️ Skipped {file}: same output name as {seen[base]}")
+            continue
+        seen[base] = file
+        jobs.append((file, base, args, formats[file]))
+    if not jobs:
+        sys.exit(1 if failed else 0)
+    note_output(args.output_dir or target_path(jobs[0][1], args.target))
+
+    for result in run_pool(_convert_safely, jobs, args.jobs):
+        if "skipped" in result:
+            print(f"⚠️ Skipped {result['file']}: {result['skipped']}")
+        elif "error" in result:
+            failed += 1
+            print(f"❌ {result['file']}: {result['error']}")
+        else:
+            print(f"✅ {result['file']} ({result['format']}, {result['cues']} cues) -> {result['output']}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    with record_run():
+        main()
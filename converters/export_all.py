@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+"""
+export_all.py
+
+Writes a title's whole deliverable set from one SRT in one process. The SRT
+is read and parsed once, and every selected writer works from the same cues
+(the writers are the functions of the individual converter scripts, so the
+output is the same as running each script on its own):
+
+  studioscript  <name>_studioscript.xlsx   (srt_to_studioscript.py)
+  rtf           <name>.rtf                 (srt_to_rtf_accessible.py)
+  txt           <name>.txt                 (srt_to_rtf_accessible.py --pt)
+  reaper        <name>.rpp                 (srt_to_reaper_markers.py, needs --rpp-template)
+  audition      <name>.csv                 (srt_to_audition.py)
+  regions       <name>_regions.wav         (srt2regions.py)
+  audacity      <name>_audacity.txt        (2audacity_r3.py)
+  audacity-r2   <name>_audacity_r2.txt     (srt_2_audacity_r2.py)
+
+Writers run concurrently on a thread pool: the file writers (the region WAV
+in particular) spend their time in I/O, so they overlap with building the
+Excel workbook.
+
+Usage:
+  python export_all.py episode.srt --frame-rate 23.976
+  python export_all.py episode.srt --video episode.mp4 --formats studioscript,rtf,audition --timecodes
+"""
+
+import os
+import sys
+import time
+import argparse
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'audio_video_tools'))
+sys.path.insert(1, os.path.join(HERE, '..', 'audacity_helpers'))
+from profiling import profile_from_argv, note_output, record_run
+if __name__ == "__main__":
+    profile_from_argv()
+
+from cues import parse_srt_cues
+
+FORMATS = ["studioscript", "rtf", "txt", "reaper", "audition", "regions", "audacity", "audacity-r2"]
+
+def output_paths(base):
+    return {
+        "studioscript": f"{base}_studioscript.xlsx",
+        "rtf": f"{base}.rtf",
+        "txt": f"{base}.txt",
+        "reaper": f"{base}.rpp",
+        "audition": f"{base}.csv",
+        "regions": f"{base}_regions.wav",
+        "audacity": f"{base}_audacity.txt",
+        "audacity-r2": f"{base}_audacity_r2.txt",
+    }
+
+def write_studioscript(cues, path, args):
+    tool = importlib.import_module("srt_to_studioscript")
+    rows = tool.cues_to_rows(cues, tool.normalize_frame_rate(args.frame_rate))
+    tool.srt_to_excel(rows, path, args.frame_rate, args.template)
+
+def write_rtf(cues, path, args):
+    importlib.import_module("srt_to_rtf_accessible").write_rtf(cues, path, args.timecodes)
+
+def write_txt(cues, path, args):
+    importlib.import_module("srt_to_rtf_accessible").write_plain_text(cues, path, args.timecodes)
+
+def write_reaper(cues, path, args):
+    importlib.import_module("srt_to_reaper_markers").add_cue_regions(cues, args.rpp_template, path)
+
+def write_audition(cues, path, args):
+    tool = importlib.import_module("srt_to_audition")
+    tool.write_audition_csv(tool.cues_to_audition_rows(cues, args.frame_rate), path)
+
+def write_regions(cues, path, args):
+    tool = importlib.import_module("srt2regions")
+    tool.write_region_wav(tool.cues_to_regions(cues), path, args.rate, args.bitdepth, args.channels)
+
+def write_audacity(cues, path, args):
+    with open(path, "w") as f:
+        f.write(importlib.import_module("2audacity_r3").audacity_labels(cues))
+
+def write_audacity_r2(cues, path, args):
+    with open(path, "w") as f:
+        f.write(importlib.import_module("srt_2_audacity_r2").audacity_labels(cues))
+
+WRITERS = {
+    "studioscript": write_studioscript,
+    "rtf": write_rtf,
+    "txt": write_txt,
+    "reaper": write_reaper,
+    "audition": write_audition,
+    "regions": write_regions,
+    "audacity": write_audacity,
+    "audacity-r2": write_audacity_r2,
+}
+
+# Tool module behind each writer, imported up front so the threads only do the writing
+WRITER_MODULES = {
+    "studioscript": "srt_to_studioscript",
+    "rtf": "srt_to_rtf_accessible",
+    "txt": "srt_to_rtf_accessible",
+    "reaper": "srt_to_reaper_markers",
+    "audition": "srt_to_audition",
+    "regions": "srt2regions",
+    "audacity": "2audacity_r3",
+    "audacity-r2": "srt_2_audacity_r2",
+}
+
+def run_writer(fmt, cues, path, args):
+    start = time.perf_counter()
+    WRITERS[fmt](cues, path, args)
+    return time.perf_counter() - start
+
+def export_all(srt_file, formats, args):
+    start = time.perf_counter()
+    cues = parse_srt_cues(srt_file)
+    if not cues:
+        print(f"❌ No cues found in {srt_file}")
+        return False
+    print(f"📄 Parsed {len(cues)} cues from {srt_file} in {time.perf_counter() - start:.3f}s")
+
+    base = os.path.join(args.output_dir or os.path.dirname(srt_file), os.path.splitext(os.path.basename(srt_file))[0])
+    paths = output_paths(base)
+    note_output(paths[formats[0]])
+
+    for fmt in formats:
+        importlib.import_module(WRITER_MODULES[fmt])
+
+    ok = True
+    with ThreadPoolExecutor(max_workers=args.jobs or len(formats)) as pool:
+        futures = {fmt: pool.submit(run_writer, fmt, cues, paths[fmt], args) for fmt in formats}
+        for fmt, future in futures.items():
+            try:
+                print(f"✅ {fmt}: {paths[fmt]} ({future.result():.2f}s)")
+            except Exception as e:
+                ok = False
+                print(f"❌ {fmt} failed: {e}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse an SRT once and write any set of DAW and script formats from it.")
+    parser.add_argument("srt_file", help="Path to the SRT file")
+    parser.add_argument("--formats", default=None,
+                        help=f"Comma-separated formats to write (default: all, reaper only with --rpp-template). Choices: {', '.join(FORMATS)}")
+    parser.add_argument("--frame-rate", type=float, default=None,
+                        help="Frame rate for the studio script and Audition timecodes (e.g. 23.976, 25)")
+    parser.add_argument("--video", default=None, help="Read the frame rate from this video instead of --frame-rate")
+    parser.add_argument("--output-dir", default=None, help="Folder for the outputs (default: next to the SRT)")
+    parser.add_argument("--template", default=os.path.expanduser("~/Documents/studioscript_template.xlsx"),
+                        help="Studio script Excel template")
+    parser.add_argument("--rpp-template", default=None, help="Base Reaper project to add the markers to")
+    parser.add_argument("--tc", "--timecodes", dest="timecodes", action="store_true",
+                        help="Include IN/OUT timecodes in the RTF and text scripts")
+    parser.add_argument("--rate", type=int, default=48000, help="Region WAV sample rate (default: 48000)")
+    parser.add_argument("--bitdepth", type=int, default=24, help="Region WAV bit depth (default: 24)")
+    parser.add_argument("--channels", type=int, default=1, help="Region WAV channels (default: 1)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Writer threads (default: one per format)")
+    args = parser.parse_args()
+
+    if args.formats:
+        formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+        unknown = [fmt for fmt in formats if fmt not in FORMATS]
+        if unknown:
+            parser.error(f"unknown format(s): {', '.join(unknown)}")
+    else:
+        formats = [fmt for fmt in FORMATS if fmt != "reaper" or args.rpp_template]
+    if "reaper" in formats and not args.rpp_template:
+        parser.error("the reaper format needs --rpp-template")
+
+    if args.video:
+        args.frame_rate = importlib.import_module("srt_to_audition").get_frame_rate(args.video)
+    if args.frame_rate is None and ("studioscript" in formats or "audition" in formats):
+        parser.error("--frame-rate or --video is required for the studioscript and audition formats")
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    if not export_all(args.srt_file, formats, args):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    with record_run():
+        main()
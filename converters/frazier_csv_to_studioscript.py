@@ -1,22 +1,40 @@
 #!/usr/bin/env python3
 
-import pandas as pd
-import openpyxl
-from openpyxl.styles import Font, Alignment
-from openpyxl.utils.dataframe import dataframe_to_rows
 import argparse
+import csv
+import io
 import os
 import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'audio_video_tools'))
+from profiling import profile_from_argv, note_output, record_run
+from sources import read_text
+from cues import Cue, smpte_seconds
+if __name__ == "__main__":
+    profile_from_argv()
 
 def extract_dialogue_notes(dialogue):
     """Extract content from dialogue, retaining square brackets."""
-    if pd.isna(dialogue) or dialogue == "0":
+    if not isinstance(dialogue, str) or dialogue == "0":
         return None  # Skip empty or placeholder fields
     match = re.search(r'\[(.*?)\]', dialogue)  # Match content in square brackets
     return f"[{match.group(1)}]" if match else dialogue  # Retain brackets or return full dialogue
 
+def frazier_to_cues(source, frame_rate):
+    """Cues from a Frazier CSV export (path, bytes or file-like object), timecodes read at `frame_rate`."""
+    cues = []
+    for row in csv.DictReader(io.StringIO(read_text(source)), delimiter=";"):
+        number = int(row["Position"]) if row["Position"].strip().isdigit() else len(cues) + 1
+        start, end = smpte_seconds(row["Start"], frame_rate), smpte_seconds(row["End"], frame_rate)
+        cues.append(Cue(number, start, end, row["Text"].strip()))
+    return cues
+
 def create_default_template():
     """Create a default Excel workbook with headers and formatting."""
+    import openpyxl
+    from openpyxl.styles import Font, Alignment
+
     wb = openpyxl.Workbook()
     ws = wb.active
     ws.title = "Studio Script"
@@ -35,6 +53,12 @@ def create_default_template():
 
 def csv_to_excel(input_csv, output_excel, template_path=None):
     """Convert CSV to Excel studio script format using a template or default layout."""
+    # Heavy imports live here so --help and argument errors stay fast
+    import pandas as pd
+    import openpyxl
+    from openpyxl.styles import Alignment
+    from openpyxl.utils.dataframe import dataframe_to_rows
+
     # Read the CSV file
     csv_data = pd.read_csv(input_csv, sep=";")
 
@@ -65,23 +89,25 @@ def csv_to_excel(input_csv, output_excel, template_path=None):
     print(f"Excel file saved to: {output_excel}")
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Convert CSV to Studio Script Excel format")
-    parser.add_argument("input_csv", help="Path to the input CSV file")
-    parser.add_argument(
-        "output_excel", nargs="?", help="Path to the output Excel file (optional, defaults to appending '_studioscript.xlsx')"
-    )
-    parser.add_argument("--template", help="Path to the Excel template file", default=None)
-    args = parser.parse_args()
-
-    # Determine the default output file name if not provided
-    if not args.output_excel:
-        base_name = os.path.splitext(os.path.basename(args.input_csv))[0]
-        args.output_excel = f"{base_name}_studioscript.xlsx"
-
-    # Default template path (if none provided)
-    DEFAULT_TEMPLATE_PATH = "~/Documents/studioscript_template.xlsx"
-    if not args.template:
-        args.template = os.path.expanduser(DEFAULT_TEMPLATE_PATH)
-
-    # Run the conversion
-    csv_to_excel(args.input_csv, args.output_excel, args.template)
+    with record_run():
+        parser = argparse.ArgumentParser(description="Convert CSV to Studio Script Excel format")
+        parser.add_argument("input_csv", help="Path to the input CSV file")
+        parser.add_argument(
+            "output_excel", nargs="?", help="Path to the output Excel file (optional, defaults to appending '_studioscript.xlsx')"
+        )
+        parser.add_argument("--template", help="Path to the Excel template file", default=None)
+        args = parser.parse_args()
+
+        # Determine the default output file name if not provided
+        if not args.output_excel:
+            base_name = os.path.splitext(os.path.basename(args.input_csv))[0]
+            args.output_excel = f"{base_name}_studioscript.xlsx"
+
+        # Default template path (if none provided)
+        DEFAULT_TEMPLATE_PATH = "~/Documents/studioscript_template.xlsx"
+        if not args.template:
+            args.template = os.path.expanduser(DEFAULT_TEMPLATE_PATH)
+
+        # Run the conversion
+        note_output(args.output_excel)
+        csv_to_excel(args.input_csv, args.output_excel, args.template)
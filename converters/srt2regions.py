@@ -6,57 +6,65 @@ import os
 import argparse
 from glob import glob
 
-def time_to_seconds(time_str):
-    hms, ms = time_str.strip().split(',')
-    h, m, s = map(int, hms.split(':'))
-    return h * 3600 + m * 60 + s + int(ms) / 1000
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'audio_video_tools'))
+from profiling import profile_from_argv, note_output, record_run
+from cues import parse_srt_cues
+from cue_diff import diff_cues, describe, load_revision, save_revision
+if __name__ == "__main__":
+    profile_from_argv()
 
-def time_to_sample(time_str, sample_rate):
-    return int(time_to_seconds(time_str) * sample_rate)
+def seconds_to_sample(seconds, sample_rate):
+    return int(seconds * sample_rate)
 
 def parse_srt(srt_path):
-    with open(srt_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-
-    regions = []
-    i = 0
-    while i < len(lines):
-        if lines[i].strip().isdigit():
-            start_end = lines[i+1].strip()
-            start, end = start_end.split(' --> ')
-            name = lines[i+2].strip() if (i + 2) < len(lines) else f'Region {i}'
-            regions.append((start, end, name))
-            i += 4
-        else:
-            i += 1
-    return regions
+    """(start, end, name) per cue, times in seconds; the name is the cue's first text line."""
+    return cues_to_regions(parse_srt_cues(srt_path))
 
-def create_blank_audio(duration_seconds, sample_rate, bit_depth, channels):
-    num_samples = int(duration_seconds * sample_rate)
-    silent_frame = b'\x00' * (bit_depth // 8)
-    return silent_frame * num_samples * channels
+def cues_to_regions(cues):
+    return [(cue.start, cue.end, cue.text.split('\n')[0].strip() or f'Region {cue.number}') for cue in cues]
 
-def add_region_markers(srt_path, output_path, sample_rate=48000, bit_depth=24, nchannels=1):
-    sampwidth = bit_depth // 8
-    regions = parse_srt(srt_path)
+def write_silence(out_file, num_bytes, chunk_size=1 << 20):
+    """Write `num_bytes` of digital silence without building the whole buffer in memory."""
+    chunk = b'\x00' * min(chunk_size, num_bytes)
+    remaining = num_bytes
+    while remaining > 0:
+        out_file.write(chunk[:remaining])
+        remaining -= len(chunk)
+
+def add_region_markers(srt_path, output_path, sample_rate=48000, bit_depth=24, nchannels=1, peaks=False, revise=False):
+    cues = parse_srt_cues(srt_path)
+    regions = cues_to_regions(cues)
 
     if not regions:
         print(f"No regions found in {srt_path}. Skipping.")
         return
 
-    last_end_time = max(time_to_seconds(end) for _, end, _ in regions)
-    frames = create_blank_audio(last_end_time, sample_rate, bit_depth, nchannels)
+    settings = {"rate": sample_rate, "bitdepth": bit_depth, "channels": nchannels}
+    if not (revise and revise_region_wav(cues, regions, output_path, settings)):
+        write_region_wav(regions, output_path, sample_rate, bit_depth, nchannels)
+    save_revision(output_path, cues, settings)
+    if peaks:
+        from waveform_peaks import peaks_post_step
+
+        peaks_post_step(output_path)
+
+def region_data_size(regions, sample_rate, sampwidth, nchannels):
+    last_end_time = max(end for _, end, _ in regions)
+    data_size = int(last_end_time * sample_rate) * sampwidth * nchannels
 
-    if len(frames) % 2 != 0:
-        frames += b'\x00'
+    if data_size % 2 != 0:
+        data_size += 1
+    return data_size
 
+def region_chunks(regions, sample_rate):
+    """The cue and LIST/adtl chunks that carry the regions, which follow the (silent) data chunk."""
     cue_data = struct.pack('<I', len(regions))
     labl_chunks = b''
     ltxt_chunks = b''
 
     for idx, (start, end, name) in enumerate(regions, start=1):
-        start_sample = time_to_sample(start, sample_rate)
-        end_sample = time_to_sample(end, sample_rate)
+        start_sample = seconds_to_sample(start, sample_rate)
+        end_sample = seconds_to_sample(end, sample_rate)
         length = end_sample - start_sample
 
         cue_data += struct.pack('<I', idx)
@@ -79,36 +87,94 @@ def add_region_markers(srt_path, output_path, sample_rate=48000, bit_depth=24, n
     cue_chunk = b'cue ' + struct.pack('<I', len(cue_data)) + cue_data
     adtl_data = labl_chunks + ltxt_chunks
     list_chunk = b'LIST' + struct.pack('<I', len(adtl_data) + 4) + b'adtl' + adtl_data
+    return cue_chunk, list_chunk
 
-    riff_size = (
+def riff_size_of(data_size, cue_chunk, list_chunk):
+    return (
         (8 + 16) +               # fmt
-        (8 + len(frames)) +      # data
+        (8 + data_size) +        # data
         (8 + len(cue_chunk)) +   # cue
         (8 + len(list_chunk))    # LIST
     )
 
+def fmt_chunk(sample_rate, bit_depth, nchannels):
+    sampwidth = bit_depth // 8
+    byte_rate = sample_rate * nchannels * sampwidth
+    block_align = nchannels * sampwidth
+    return b'fmt ' + struct.pack('<IHHIIHH',
+                                 16, 1, nchannels, sample_rate,
+                                 byte_rate, block_align, bit_depth)
+
+def write_region_wav(regions, output_path, sample_rate=48000, bit_depth=24, nchannels=1):
+    data_size = region_data_size(regions, sample_rate, bit_depth // 8, nchannels)
+    cue_chunk, list_chunk = region_chunks(regions, sample_rate)
+    riff_size = riff_size_of(data_size, cue_chunk, list_chunk)
+
     with open(output_path, 'wb') as out_file:
         out_file.write(b'RIFF')
         out_file.write(struct.pack('<I', riff_size))
         out_file.write(b'WAVE')
-
-        byte_rate = sample_rate * nchannels * sampwidth
-        block_align = nchannels * sampwidth
-        out_file.write(b'fmt ')
-        out_file.write(struct.pack('<IHHIIHH',
-                                   16, 1, nchannels, sample_rate,
-                                   byte_rate, block_align, bit_depth))
+        out_file.write(fmt_chunk(sample_rate, bit_depth, nchannels))
 
         out_file.write(b'data')
-        out_file.write(struct.pack('<I', len(frames)))
-        out_file.write(frames)
+        out_file.write(struct.pack('<I', data_size))
+        write_silence(out_file, data_size)
 
         out_file.write(cue_chunk)
         out_file.write(list_chunk)
 
     print(f"✅ Created: {output_path}")
 
-def batch_process(sample_rate, bit_depth, channels):
+def patch_region_wav(regions, output_path, sample_rate=48000, bit_depth=24, nchannels=1):
+    """
+    Rewrite only the parts of an existing region WAV that depend on the
+    cues: the sizes in the header, the length of the silent data chunk
+    (truncated, or extended with zeros by the filesystem) and the cue and
+    LIST chunks after it. The result is byte-identical to write_region_wav().
+    """
+    data_size = region_data_size(regions, sample_rate, bit_depth // 8, nchannels)
+    cue_chunk, list_chunk = region_chunks(regions, sample_rate)
+
+    with open(output_path, 'r+b') as wav:
+        header = wav.read(44)
+        if len(header) < 44 or header[:4] != b'RIFF' or header[8:12] != b'WAVE' or header[36:40] != b'data' \
+                or header[12:36] != fmt_chunk(sample_rate, bit_depth, nchannels):
+            raise ValueError("not a region WAV written by this script")
+        old_data_size = struct.unpack('<I', header[40:44])[0]
+
+        # Cut the old chunks off first, so a longer data chunk is padded with silence and not with old chunk bytes
+        wav.truncate(44 + min(old_data_size, data_size))
+        wav.truncate(44 + data_size)
+        wav.seek(44 + data_size)
+        wav.write(cue_chunk)
+        wav.write(list_chunk)
+        wav.seek(4)
+        wav.write(struct.pack('<I', riff_size_of(data_size, cue_chunk, list_chunk)))
+        wav.seek(40)
+        wav.write(struct.pack('<I', data_size))
+
+def revise_region_wav(cues, regions, output_path, settings):
+    """
+    Update a region WAV from a revised script in place. Returns False when
+    it has to be written from scratch instead.
+    """
+    previous, reason = load_revision(output_path, settings)
+    if previous is None:
+        print(f"↻ Full render of {output_path}: {reason}")
+        return False
+    diff = diff_cues(previous, cues)
+    if not diff["spans"]:
+        print(f"⏩ {output_path}: no cue changes")
+        return True
+    try:
+        patch_region_wav(regions, output_path, settings["rate"], settings["bitdepth"], settings["channels"])
+    except (OSError, ValueError) as e:
+        print(f"↻ Full render of {output_path}: {e}")
+        return False
+    print(f"✅ Revised: {output_path} ({describe(diff)})")
+    return True
+
+def batch_process(sample_rate, bit_depth, channels, peaks=False, revise=False):
     srt_files = glob("*.srt")
     video_exts = [".mp4", ".mov", ".mkv"]
 
@@ -120,23 +186,29 @@ def batch_process(sample_rate, bit_depth, channels):
             continue
 
         output_wav = base + '_regions.wav'
-        add_region_markers(srt_file, output_wav, sample_rate, bit_depth, channels)
+        add_region_markers(srt_file, output_wav, sample_rate, bit_depth, channels, peaks, revise)
 
 if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description='Generate a blank WAV file with region markers from SRTs.')
-    parser.add_argument('srt_path', nargs='?', help='Path to the SRT file (single file mode)')
-    parser.add_argument('--rate', type=int, default=48000, help='Sample rate in Hz (default: 48000)')
-    parser.add_argument('--bitdepth', type=int, default=24, help='Bit depth (default: 24)')
-    parser.add_argument('--channels', type=int, default=1, help='Number of audio channels (default: 1)')
-    parser.add_argument('--batch', action='store_true', help='Batch mode: process all matching SRT + video file pairs')
-
-    args = parser.parse_args()
-
-    if args.batch:
-        batch_process(args.rate, args.bitdepth, args.channels)
-    elif args.srt_path:
-        output_wav = os.path.splitext(args.srt_path)[0] + '_regions.wav'
-        add_region_markers(args.srt_path, output_wav, args.rate, args.bitdepth, args.channels)
-    else:
-        print("❌ Error: Please provide an SRT file or use --batch")
-        sys.exit(1)
+    with record_run():
+        parser = argparse.ArgumentParser(description='Generate a blank WAV file with region markers from SRTs.')
+        parser.add_argument('srt_path', nargs='?', help='Path to the SRT file (single file mode)')
+        parser.add_argument('--rate', type=int, default=48000, help='Sample rate in Hz (default: 48000)')
+        parser.add_argument('--bitdepth', type=int, default=24, help='Bit depth (default: 24)')
+        parser.add_argument('--channels', type=int, default=1, help='Number of audio channels (default: 1)')
+        parser.add_argument('--batch', action='store_true', help='Batch mode: process all matching SRT + video file pairs')
+        parser.add_argument('--revise', action='store_true',
+                            help='Update an existing region WAV in place from a revised SRT, rewriting only what the changed cues affect')
+        parser.add_argument('--peaks', action='store_true', help='Also write waveform peak files for the region WAV (see waveform_peaks.py)')
+
+        args = parser.parse_args()
+
+        if args.batch:
+            note_output(os.getcwd())
+            batch_process(args.rate, args.bitdepth, args.channels, args.peaks, args.revise)
+        elif args.srt_path:
+            output_wav = os.path.splitext(args.srt_path)[0] + '_regions.wav'
+            note_output(output_wav)
+            add_region_markers(args.srt_path, output_wav, args.rate, args.bitdepth, args.channels, args.peaks, args.revise)
+        else:
+            print("❌ Error: Please provide an SRT file or use --batch")
+            sys.exit(1)
@@ -1,10 +1,17 @@
 import sys
 import os
-from moviepy.editor import VideoFileClip
-import pandas as pd
 import re
+import csv
 from datetime import datetime, timedelta
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'audio_video_tools'))
+from profiling import profile_from_argv, note_output, record_run
+from cues import parse_srt_cues
+if __name__ == "__main__":
+    profile_from_argv()
+
+AUDITION_COLUMNS = ['Name', 'Start', 'Duration', 'Time Format', 'Type', 'Description']
+
 # Convert a time string into a timedelta object
 def str_to_timedelta(time_str):
     return datetime.strptime(time_str, '%H:%M:%S,%f') - datetime(1900, 1, 1)
@@ -19,6 +26,8 @@ def timedelta_to_smpte_timecode(t_delta, fps):
 
 # Extract the frame rate from the given video file
 def get_frame_rate(video_file_path):
+    # moviepy is slow to import, so only load it when a frame rate is needed
+    from moviepy.editor import VideoFileClip
     try:
         with VideoFileClip(video_file_path) as clip:
             return clip.fps
@@ -33,6 +42,30 @@ def process_subtitle_text(text):
         return match.group(2), match.group(1).upper()  # Return stripped text and the indicator
     return text, ""  # Return original text and empty description if no indicator is found
 
+# Build Audition marker rows from parsed cues
+def cues_to_audition_rows(cues, fps):
+    rows = []
+    for cue in cues:
+        start_time = timedelta(seconds=cue.start)
+        duration = timedelta(seconds=cue.end) - start_time
+        text, description = process_subtitle_text(cue.text.replace('\n', ' '))
+        rows.append({
+            'Name': text,
+            'Start': timedelta_to_smpte_timecode(start_time, fps),
+            'Duration': timedelta_to_smpte_timecode(duration, fps),
+            'Time Format': f'{fps} fps',
+            'Type': 'Cue',
+            'Description': description
+        })
+    return rows
+
+# Write marker rows as the tab-separated CSV Audition imports
+def write_audition_csv(rows, csv_file_path):
+    with open(csv_file_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=AUDITION_COLUMNS, delimiter='\t', lineterminator=os.linesep)
+        writer.writeheader()
+        writer.writerows(rows)
+
 # Convert SRT file to CSV format with added functionality for indicators
 def convert_srt_to_csv(srt_file_path, video_file_path):
     if not os.path.exists(srt_file_path):
@@ -46,33 +79,13 @@ def convert_srt_to_csv(srt_file_path, video_file_path):
     csv_file_path = srt_file_path.replace('.srt', '.csv')
 
     try:
-        with open(srt_file_path, 'r', encoding='utf-8') as file:
-            srt_content = file.read()
+        cues = parse_srt_cues(srt_file_path)
     except Exception as e:
         print(f"Error reading SRT file: {e}")
         sys.exit(1)
 
     try:
-        entries = re.split(r'\n\n', srt_content.strip())
-        csv_data = []
-        for entry in entries:
-            lines = entry.split('\n')
-            if len(lines) >= 3:
-                sequence = lines[0]
-                times = re.split(r' --> ', lines[1])
-                start_time = str_to_timedelta(times[0])
-                end_time = str_to_timedelta(times[1])
-                duration = end_time - start_time
-                text, description = process_subtitle_text(' '.join(lines[2:]).replace('\n', ' '))
-                csv_data.append({
-                    'Name': text,
-                    'Start': timedelta_to_smpte_timecode(start_time, fps),
-                    'Duration': timedelta_to_smpte_timecode(duration, fps),
-                    'Time Format': f'{fps} fps',
-                    'Type': 'Cue',
-                    'Description': description
-                })
-        pd.DataFrame(csv_data).to_csv(csv_file_path, index=False, sep='\t', header=True)
+        write_audition_csv(cues_to_audition_rows(cues, fps), csv_file_path)
         print(f"Converted SRT file saved to {csv_file_path}")
         print(f"The frame rate of the video is: {fps} fps")
     except Exception as e:
@@ -85,12 +98,14 @@ def get_user_input(prompt):
 
 # Main script execution
 if __name__ == "__main__":
-    if len(sys.argv) == 3:
-        srt_file_path = sys.argv[1]
-        video_file_path = sys.argv[2]
-    else:
-        print("You did not provide the required SRT and video file paths.")
-        srt_file_path = get_user_input("Please enter the full path to the SRT file: ")
-        video_file_path = get_user_input("Please enter the full path to the video file: ")
+    with record_run():
+        if len(sys.argv) == 3:
+            srt_file_path = sys.argv[1]
+            video_file_path = sys.argv[2]
+        else:
+            print("You did not provide the required SRT and video file paths.")
+            srt_file_path = get_user_input("Please enter the full path to the SRT file: ")
+            video_file_path = get_user_input("Please enter the full path to the video file: ")
 
-    convert_srt_to_csv(srt_file_path, video_file_path)
+        note_output(srt_file_path.replace('.srt', '.csv'))
+        convert_srt_to_csv(srt_file_path, video_file_path)
@@ -4,6 +4,12 @@ import os
 import sys
 import subprocess
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'audio_video_tools'))
+from ffmpeg_runner import run_ffmpeg
+from profiling import profile_from_argv, note_output, record_run
+if __name__ == "__main__":
+    profile_from_argv()
+
 def burn_subtitles(video_file, srt_file):
     # Ensure the provided video and SRT files exist
     if not os.path.isfile(video_file):
@@ -28,16 +34,18 @@ def burn_subtitles(video_file, srt_file):
 
     # Run the FFmpeg command
     try:
-        subprocess.run(ffmpeg_command, check=True)
+        run_ffmpeg(ffmpeg_command, stage="burn")
         print(f"Subtitles burned into video successfully. Output file: '{output_file}'")
     except subprocess.CalledProcessError as e:
         print(f"Error: FFmpeg failed with exit code {e.returncode}")
         print(e.output)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python burn_subtitles.py <video_file> <srt_file>")
-    else:
-        video_file = sys.argv[1]
-        srt_file = sys.argv[2]
-        burn_subtitles(video_file, srt_file)
+    with record_run():
+        if len(sys.argv) != 3:
+            print("Usage: python burn_subtitles.py <video_file> <srt_file>")
+        else:
+            video_file = sys.argv[1]
+            srt_file = sys.argv[2]
+            note_output(video_file)
+            burn_subtitles(video_file, srt_file)
@@ -1,58 +1,234 @@
 #!/usr/bin/env python3
 
+"""
+srt_to_reaper_markers.py
+
+Adds SRT cues to a Reaper project as regions.
+
+Each cue becomes a Reaper region: a `MARKER` line at the cue start with the
+region flag, the cue text as its name and a unique GUID, followed by the
+matching end line. The project is rewritten line by line as a stream, so
+projects of any size (embedded plug-in state, notes, media data) are never
+loaded into memory, and the output is written to a temporary file and
+renamed into place.
+
+By default the regions are added next to whatever the project already has
+(numbered after its existing regions); `--replace` removes the project's
+existing regions first, leaving plain markers alone.
+
+Usage:
+  python srt_to_reaper_markers.py episode.srt template.rpp episode.rpp
+  python srt_to_reaper_markers.py --batch --template template.rpp -o projects/ season1/*.srt
+"""
+
+import io
+import os
 import re
+import sys
+import uuid
 import argparse
+from glob import glob
 from pathlib import Path
 
-def to_seconds(tc):
-    h, m, s_ms = tc.split(":")
-    s, ms = s_ms.split(",")
-    return int(h) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'audio_video_tools'))
+from profiling import profile_from_argv, note_output, record_run
+from sources import is_path, read_text
+from cues import parse_srt_cues
+if __name__ == "__main__":
+    profile_from_argv()
 
-def srt_to_markers(srt_path):
-    with open(srt_path, "r", encoding="utf-8") as f:
-        srt_data = f.read()
+REGION_FLAG = 1
+# A token in an RPP line: "quoted", 'quoted', `quoted` or a bare word
+RPP_TOKEN = re.compile(r'"([^"]*)"|\'([^\']*)\'|`([^`]*)`|(\S+)')
 
-    pattern = re.compile(
-        r"(\d+)\s+(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})\s+(.*?)\s*(?=\n\d+\n|\Z)",
-        re.DOTALL,
-    )
-    matches = pattern.findall(srt_data)
+def rpp_quote(text):
+    """Quote a string the way Reaper does: with ", ' or ` depending on what the text contains."""
+    for quote in ('"', "'", "`"):
+        if quote not in text:
+            return f"{quote}{text}{quote}"
+    return "`" + text.replace("`", "'") + "`"
 
+def rpp_tokens(line):
+    return [next(group for group in match.groups() if group is not None) for match in RPP_TOKEN.finditer(line)]
+
+def format_position(seconds):
+    return f"{seconds:.3f}".rstrip("0").rstrip(".") or "0"
+
+def new_guid():
+    return "{" + str(uuid.uuid4()).upper() + "}"
+
+def srt_to_markers(srt_path, first_index=1):
+    """Return Reaper region lines for an SRT given as a path, bytes or file-like object."""
+    return cues_to_markers(parse_srt_cues(srt_path), first_index)
+
+def cues_to_markers(cues, first_index=1):
+    """
+    Reaper region lines for cues already parsed by cues.parse_srt_cues(): a
+    start line carrying the name, region flag and a fresh GUID, and an end
+    line with the same index.
+    """
     marker_lines = []
-    for idx, (num, start_tc, end_tc, text) in enumerate(matches, start=1):
-        start_sec = to_seconds(start_tc)
-        end_sec = to_seconds(end_tc)
-        text_clean = text.replace("\n", " ").strip().replace('"', "'")
-
-        guid = "{{{:08X}-{:04X}-{:04X}-{:04X}-{:012X}}}".format(
-            idx, idx, idx, idx, idx  # placeholder GUIDs
-        )
-        marker_lines.append(f'  MARKER {idx} {start_sec:.2f} "{text_clean}" 1 0 1 B {guid} 0')
-        marker_lines.append(f'  MARKER {idx} {end_sec:.2f} "" 1')
+    for idx, cue in enumerate(cues, start=first_index):
+        name = rpp_quote(cue.text.replace("\n", " ").strip())
+        marker_lines.append(f"  MARKER {idx} {format_position(cue.start)} {name} {REGION_FLAG} 0 1 B {new_guid()} 0")
+        marker_lines.append(f'  MARKER {idx} {format_position(cue.end)} "" {REGION_FLAG}')
     return marker_lines
 
-def inject_markers_into_rpp(template_path, marker_lines, output_path):
-    with open(template_path, "r", encoding="utf-8") as f:
-        rpp_base = f.read()
+def marker_info(line):
+    """(index, is_region) for a top-level MARKER line, or None for any other line."""
+    tokens = rpp_tokens(line)
+    if len(tokens) < 5 or tokens[0] != "MARKER":
+        return None
+    try:
+        return int(tokens[1]), bool(int(tokens[4]) & REGION_FLAG)
+    except ValueError:
+        return None
+
+def iter_top_level(lines):
+    """Yield (depth, line) for every line, depth being the block nesting level before the line."""
+    depth = 0
+    for line in lines:
+        stripped = line.strip()
+        yield depth, line
+        if stripped.startswith("<"):
+            depth += 1
+        elif stripped == ">":
+            depth -= 1
 
-    insert_at = rpp_base.rfind(">")
-    rpp_with_markers = rpp_base[:insert_at] + "\n" + "\n".join(marker_lines) + "\n" + rpp_base[insert_at:]
+def last_region_index(lines):
+    """Highest region index already in a project (0 if none), found in one streaming pass."""
+    highest = 0
+    for depth, line in iter_top_level(lines):
+        if depth == 1 and line.lstrip().startswith("MARKER"):
+            info = marker_info(line)
+            if info and info[1]:
+                highest = max(highest, info[0])
+    return highest
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(rpp_with_markers)
+def rewrite_rpp(lines, out, marker_lines, replace=False):
+    """
+    Stream project lines to `out`, inserting `marker_lines` at top level
+    before the first track (or before the project's closing `>`). With
+    `replace`, existing regions are dropped. Returns the number of regions removed.
+    """
+    newline = None
+    inserted = False
+    removed = 0
+    for depth, line in iter_top_level(lines):
+        if newline is None:
+            newline = "\r\n" if line.endswith("\r\n") else "\n"
+        stripped = line.strip()
+
+        if depth == 1 and replace and stripped.startswith("MARKER"):
+            info = marker_info(stripped)
+            if info and info[1]:
+                removed += 1
+                continue
+
+        at_first_track = depth == 1 and stripped.startswith("<TRACK")
+        at_project_end = depth == 1 and stripped == ">"
+        if not inserted and (at_first_track or at_project_end):
+            out.write("".join(marker + newline for marker in marker_lines))
+            inserted = True
+        out.write(line)
+
+    if not inserted:
+        raise ValueError("not a Reaper project (no closing '>' found)")
+    return removed // 2
+
+def open_lines(source):
+    """Line iterator over a project given as a path (streamed), bytes or file-like object."""
+    if is_path(source):
+        return open(source, "r", encoding="utf-8", errors="surrogateescape", newline="")
+    return io.StringIO(read_text(source), newline="")
+
+def inject_markers_into_rpp(template_path, marker_lines, output_path=None, replace=False):
+    """
+    Write the template project with the region lines added. The template can
+    be a path, bytes or file-like object; with `output_path=None` the new
+    project text is returned instead of written. Writing to the template's
+    own path updates it in place.
+    """
+    if output_path is None or not is_path(output_path):
+        out = io.StringIO() if output_path is None else output_path
+        with open_lines(template_path) as lines:
+            rewrite_rpp(lines, out, marker_lines, replace)
+        return out.getvalue() if output_path is None else None
+
+    tmp = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with open_lines(template_path) as lines, \
+                open(tmp, "w", encoding="utf-8", errors="surrogateescape", newline="") as out:
+            rewrite_rpp(lines, out, marker_lines, replace)
+        os.replace(tmp, output_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def add_regions(srt_file, template_rpp, output_rpp, replace=False):
+    """Add an SRT's cues as regions, numbered after any regions the template already has."""
+    return add_cue_regions(parse_srt_cues(srt_file), template_rpp, output_rpp, replace)
+
+def add_cue_regions(cues, template_rpp, output_rpp, replace=False):
+    first_index = 1
+    if not replace and is_path(template_rpp):
+        with open_lines(template_rpp) as lines:
+            first_index = last_region_index(lines) + 1
+    inject_markers_into_rpp(template_rpp, cues_to_markers(cues, first_index), output_rpp, replace)
+    return len(cues)
+
+def batch_inputs(paths):
+    """Expand folders into the SRT files they contain."""
+    srt_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            srt_files.extend(sorted(glob(os.path.join(path, "*.srt"))))
+        else:
+            srt_files.append(path)
+    return srt_files
 
 def main():
-    parser = argparse.ArgumentParser(description="Inject SRT cues into a Reaper .rpp project as markers.")
-    parser.add_argument("srt_file", help="Path to the SRT file")
-    parser.add_argument("template_rpp", help="Path to the base Reaper .rpp file")
-    parser.add_argument("output_rpp", help="Path to save the new .rpp file with markers")
+    parser = argparse.ArgumentParser(description="Add SRT cues to Reaper .rpp projects as regions.")
+    parser.add_argument("paths", nargs="+",
+                        help="srt_file template_rpp output_rpp, or with --batch: SRT files and/or folders of SRTs")
+    parser.add_argument("--batch", action="store_true",
+                        help="Create one project per SRT from --template, named after the SRT")
+    parser.add_argument("--template", help="Template project for --batch")
+    parser.add_argument("-o", "--output-dir", default=None,
+                        help="Folder for --batch projects (default: next to each SRT)")
+    parser.add_argument("--replace", action="store_true",
+                        help="Remove the project's existing regions instead of adding to them")
 
     args = parser.parse_args()
 
-    marker_lines = srt_to_markers(Path(args.srt_file))
-    inject_markers_into_rpp(Path(args.template_rpp), marker_lines, Path(args.output_rpp))
-    print(f"Done! Created: {args.output_rpp}")
+    if not args.batch:
+        if len(args.paths) != 3:
+            parser.error("expected srt_file template_rpp output_rpp (or use --batch)")
+        srt_file, template_rpp, output_rpp = args.paths
+        note_output(output_rpp)
+        count = add_regions(Path(srt_file), Path(template_rpp), Path(output_rpp), args.replace)
+        print(f"Done! Created: {output_rpp} ({count} regions)")
+        return
+
+    if not args.template:
+        parser.error("--batch needs --template")
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    note_output(args.output_dir)
+
+    failed = 0
+    for srt_file in batch_inputs(args.paths):
+        base = os.path.splitext(os.path.basename(srt_file))[0]
+        output_rpp = os.path.join(args.output_dir or os.path.dirname(srt_file), f"{base}.rpp")
+        try:
+            count = add_regions(srt_file, args.template, output_rpp, args.replace)
+            print(f"✅ {output_rpp} ({count} regions)")
+        except (OSError, ValueError) as e:
+            failed += 1
+            print(f"❌ {srt_file}: {e}")
+    if failed:
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
+    with record_run():
+        main()
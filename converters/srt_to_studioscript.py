@@ -1,14 +1,18 @@
 #!/usr/bin/env python3
 
-import pandas as pd
 import re
+import sys
 import argparse
 from datetime import timedelta
-import openpyxl
-from openpyxl.styles import Font, Alignment
-from openpyxl.utils.dataframe import dataframe_to_rows
 import os
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'audio_video_tools'))
+from profiling import profile_from_argv, note_output, record_run
+from sources import is_path
+from cues import parse_srt_cues
+if __name__ == "__main__":
+    profile_from_argv()
+
 def normalize_frame_rate(fps):
     known_rates = {
         23.976: 24000 / 1001,
@@ -20,7 +24,9 @@ def normalize_frame_rate(fps):
 def srt_to_timecode(timecode, frame_rate, use_realtime=False):
     hours, minutes, seconds, milliseconds = map(int, re.split('[:,]', timecode))
     total_seconds = hours * 3600 + minutes * 60 + seconds + milliseconds / 1000
+    return seconds_to_timecode(total_seconds, frame_rate, use_realtime)
 
+def seconds_to_timecode(total_seconds, frame_rate, use_realtime=False):
     if use_realtime:
         td = timedelta(seconds=total_seconds)
         return str(td)[:-3]  # Format as HH:MM:SS.mmm
@@ -35,18 +41,19 @@ def srt_to_timecode(timecode, frame_rate, use_realtime=False):
         return f"{smpte_hours:02}:{smpte_minutes:02}:{smpte_seconds:02}:{smpte_frames:02}"
 
 def parse_srt(srt_file, frame_rate, use_realtime=False):
-    with open(srt_file, 'r') as file:
-        content = file.read()
-
-    pattern = re.compile(r'(\d+)\n(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})\n(.*?)\n\n', re.DOTALL)
-    matches = pattern.findall(content)
-
+    """
+    Parse an SRT into studio script rows: [line number, timecode in, timecode out, script, note].
+    `srt_file` can be a path, bytes or a file-like object (see sources.py).
+    """
+    return cues_to_rows(parse_srt_cues(srt_file), frame_rate, use_realtime)
+
+def cues_to_rows(cues, frame_rate, use_realtime=False):
+    """Studio script rows for cues already parsed by cues.parse_srt_cues()."""
     data = []
-    for match in matches:
-        line_number = int(match[0])
-        timecode_in = srt_to_timecode(match[1], frame_rate, use_realtime)
-        timecode_out = srt_to_timecode(match[2], frame_rate, use_realtime)
-        script_text = match[3].replace('\n', ' ')
+    for cue in cues:
+        timecode_in = seconds_to_timecode(cue.start, frame_rate, use_realtime)
+        timecode_out = seconds_to_timecode(cue.end, frame_rate, use_realtime)
+        script_text = cue.text.replace('\n', ' ')
 
         bracket_content = re.search(r'\[(.*?)\]', script_text)
         if bracket_content:
@@ -55,11 +62,14 @@ def parse_srt(srt_file, frame_rate, use_realtime=False):
         else:
             note = None
 
-        data.append([line_number, timecode_in, timecode_out, script_text, note])
+        data.append([cue.number, timecode_in, timecode_out, script_text, note])
 
     return data
 
 def create_default_template():
+    import openpyxl
+    from openpyxl.styles import Font, Alignment
+
     wb = openpyxl.Workbook()
     ws = wb.active
     ws.title = "Studio Script"
@@ -76,54 +86,73 @@ def create_default_template():
     return wb
 
 def srt_to_excel(srt_file, excel_file, frame_rate, template_file=None, use_realtime=False):
-    data = parse_srt(srt_file, frame_rate, use_realtime)
-    df = pd.DataFrame(data, columns=['Line Number', 'Timecode In', 'Timecode Out', 'Script (en)', 'On Screen Note (en)'])
-
-    if not excel_file.lower().endswith('.xlsx'):
-        excel_file += '.xlsx'
-
-    if template_file and os.path.exists(template_file):
+    """
+    Write a studio script workbook. `srt_file` is an SRT source (path, bytes or
+    file-like) or rows already returned by parse_srt(). `excel_file` is a path
+    or a writable binary file object; with None the .xlsx content is returned
+    as bytes. `template_file` may also be a path or a file-like object.
+    """
+    # openpyxl is only imported here so --help and argument errors stay fast
+    import io
+    import openpyxl
+    from openpyxl.styles import Font, Alignment
+
+    data = srt_file if isinstance(srt_file, list) else parse_srt(srt_file, frame_rate, use_realtime)
+
+    if is_path(excel_file) and not str(excel_file).lower().endswith('.xlsx'):
+        excel_file = str(excel_file) + '.xlsx'
+
+    if template_file is not None and (not is_path(template_file) or os.path.exists(template_file)):
         wb = openpyxl.load_workbook(template_file)
         ws = wb.active
     else:
-        print(f"Warning: Template file '{template_file}' not found. Using default template.")
+        if template_file is not None:
+            print(f"Warning: Template file '{template_file}' not found. Using default template.")
         wb = create_default_template()
         ws = wb.active
 
-    for r_idx, row in enumerate(dataframe_to_rows(df, index=False, header=False), start=2):
+    font = Font(size=16)
+    wrap = Alignment(wrap_text=True)
+    for r_idx, row in enumerate(data, start=2):
         for c_idx, value in enumerate(row, start=1):
             cell = ws.cell(row=r_idx, column=c_idx, value=value)
-            cell.font = Font(size=16)
+            cell.font = font
             if isinstance(value, str):
-                cell.alignment = Alignment(wrap_text=True)
+                cell.alignment = wrap
 
     for row_dim in ws.row_dimensions.values():
         row_dim.height = None
 
+    if excel_file is None:
+        buffer = io.BytesIO()
+        wb.save(buffer)
+        return buffer.getvalue()
     wb.save(excel_file)
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description='Convert SRT file to Excel AD script.')
-    parser.add_argument('srt_file', help='Path to the SRT file')
-    parser.add_argument('excel_file', nargs='?', help='Path to the output Excel file (optional)')
-    parser.add_argument('frame_rate', type=float, help='Frame rate of the video (e.g., 23.976, 24, 25, 30)')
-    parser.add_argument('--template', help='Path to the Excel template file', default=None)
-    parser.add_argument('-r', '--realtime', action='store_true', help='Use real-time (HH:MM:SS.mmm) instead of SMPTE timecode')
-    args = parser.parse_args()
-
-    args.frame_rate = normalize_frame_rate(args.frame_rate)
-
-    # Warn or prevent use of --realtime if frame rate is not drop-frame
-    if args.realtime and args.frame_rate in {24, 25, 30}:
-        print("[Notice] Realtime conversion is only meaningful for drop-frame rates. Defaulting to SMPTE format.")
-        args.realtime = False
-
-    if not args.template:
-        args.template = os.path.expanduser("~/Documents/studioscript_template.xlsx")
-
-    if not args.excel_file:
-        base_name = os.path.splitext(os.path.basename(args.srt_file))[0]
-        suffix = "_realtime" if args.realtime else "_studioscript"
-        args.excel_file = base_name + suffix + ".xlsx"
-
-    srt_to_excel(args.srt_file, args.excel_file, args.frame_rate, args.template, args.realtime)
+    with record_run():
+        parser = argparse.ArgumentParser(description='Convert SRT file to Excel AD script.')
+        parser.add_argument('srt_file', help='Path to the SRT file')
+        parser.add_argument('excel_file', nargs='?', help='Path to the output Excel file (optional)')
+        parser.add_argument('frame_rate', type=float, help='Frame rate of the video (e.g., 23.976, 24, 25, 30)')
+        parser.add_argument('--template', help='Path to the Excel template file', default=None)
+        parser.add_argument('-r', '--realtime', action='store_true', help='Use real-time (HH:MM:SS.mmm) instead of SMPTE timecode')
+        args = parser.parse_args()
+
+        args.frame_rate = normalize_frame_rate(args.frame_rate)
+
+        # Warn or prevent use of --realtime if frame rate is not drop-frame
+        if args.realtime and args.frame_rate in {24, 25, 30}:
+            print("[Notice] Realtime conversion is only meaningful for drop-frame rates. Defaulting to SMPTE format.")
+            args.realtime = False
+
+        if not args.template:
+            args.template = os.path.expanduser("~/Documents/studioscript_template.xlsx")
+
+        if not args.excel_file:
+            base_name = os.path.splitext(os.path.basename(args.srt_file))[0]
+            suffix = "_realtime" if args.realtime else "_studioscript"
+            args.excel_file = base_name + suffix + ".xlsx"
+
+        note_output(args.excel_file)
+        srt_to_excel(args.srt_file, args.excel_file, args.frame_rate, args.template, args.realtime)
@@ -2,7 +2,21 @@
 
 import os
 import sys
+import shutil
+import tempfile
 import subprocess
+from bisect import bisect_left, bisect_right
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'audio_video_tools'))
+from ffmpeg_runner import run_ffmpeg
+from build_cache import build_key, up_to_date, record_build, forget_build
+from batch_journal import BatchJournal, staged_outputs
+import staging
+from cues import parse_srt_cues
+from cue_diff import diff_cues, describe, load_revision, save_revision
+from profiling import profile_from_argv, note_output, record_run
+if __name__ == "__main__":
+    profile_from_argv()
 
 def get_frame_rate(video_file):
     result = subprocess.run(
@@ -15,29 +29,21 @@ def get_frame_rate(video_file):
     num, denom = map(int, rate.split('/'))
     return num / denom
 
-def burn_subtitles(video_file, srt_file=None, font_size=None, smpte_only=False, subs_only=False, downscale_720=False, force=False):
-    frame_rate = get_frame_rate(video_file)
-    base_name, _ = os.path.splitext(os.path.basename(video_file))
-
-    output_prefix = "tc_" if smpte_only else "subs_" if subs_only else "burn_"
-    output_file = os.path.join("output", f"{output_prefix}{base_name}.mp4")
-
-    if os.path.isfile(output_file) and not force:
-        print(f"⏩ Skipping {base_name} (already processed)")
-        return
-
+def burn_filters(frame_rate, subtitle_file=None, font_size=None, subs_only=False, downscale_720=False, timecode="00:00:00:00"):
+    """The -vf filter chain; `subtitle_file` is the SRT to burn (None for timecode only)."""
     filters = []
+    timecode = timecode.replace(":", "\\:")
 
     if downscale_720:
         filters.append("scale=1280:720")
 
     if not subs_only:
         filters.append(
-            f"drawtext=fontfile=/Library/Fonts/DroidSansMono.ttf:timecode='00\\:00\\:00\\:00':rate={frame_rate}:fontsize=30:"
+            f"drawtext=fontfile=/Library/Fonts/DroidSansMono.ttf:timecode='{timecode}':rate={frame_rate}:fontsize=30:"
             "fontcolor=white:x=10:y=10:box=1:boxcolor=0x000000AA"
         )
 
-    if not smpte_only and srt_file and os.path.isfile(srt_file):
+    if subtitle_file:
         style_parts = [
             f"FontSize={font_size if font_size else 20}",
             "PrimaryColour=&H00FFFFFF&",
@@ -50,28 +56,203 @@ def burn_subtitles(video_file, srt_file=None, font_size=None, smpte_only=False,
             "MarginL=12",
             "MarginR=12"
         ]
-        srt_file_clean = os.path.abspath(srt_file).replace('\\', '/').replace("'", r"\\'")
+        srt_file_clean = os.path.abspath(subtitle_file).replace('\\', '/').replace("'", r"\\'")
         force_style = ','.join(style_parts).replace("'", r"\\'")
         filters.append(f"subtitles='{srt_file_clean}':force_style='{force_style}'")
+    return filters
+
+def burn_subtitles(video_file, srt_file=None, font_size=None, smpte_only=False, subs_only=False, downscale_720=False, force=False, frame_rate=None, journal=None, revise=False):
+    """Burn subtitles and/or timecode into one video. Returns False if FFmpeg failed (skipped videos count as success)."""
+    if frame_rate is None:
+        frame_rate = get_frame_rate(video_file)
+    base_name, _ = os.path.splitext(os.path.basename(video_file))
 
+    output_prefix = "tc_" if smpte_only else "subs_" if subs_only else "burn_"
+    output_file = os.path.join("output", f"{output_prefix}{base_name}.mp4")
+
+    subtitle_file = srt_file if not smpte_only and srt_file and os.path.isfile(srt_file) else None
+    filter_options = dict(font_size=font_size, subs_only=subs_only, downscale_720=downscale_720)
     ffmpeg_command = [
         'ffmpeg', '-y',
         '-i', video_file,
-        '-vf', ",".join(filters),
+        '-vf', ",".join(burn_filters(frame_rate, subtitle_file, **filter_options)),
         '-c:a', 'copy',
         output_file
     ]
 
-    try:
-        subprocess.run(ffmpeg_command, check=True)
+    if journal and journal.completed(output_file, ffmpeg_command):
+        print(f"⏩ Skipping {base_name} (already done in this batch)")
+        return True
+
+    # Skip only when the video, the SRT (if burned) and every setting match the last build
+    inputs = [video_file] + ([subtitle_file] if subtitle_file else [])
+    key = build_key("srt_to_sub_time_burn", inputs, ffmpeg_command, versions=[__file__], ffmpeg=True)
+    if not force and up_to_date(output_file, key):
+        print(f"⏩ Skipping {base_name} (up to date)")
+        return True
+
+    # What a revision may differ in is the SRT's content; everything else must match the previous render
+    st = os.stat(video_file)
+    settings = build_key("srt_to_sub_time_burn", [], ffmpeg_command[:5] + [",".join(burn_filters(frame_rate, "{srt}", **filter_options))],
+                         versions=[__file__], ffmpeg=True)
+    settings["video"] = [os.path.abspath(video_file), st.st_size, st.st_mtime_ns]
+    cues = parse_srt_cues(subtitle_file) if subtitle_file else None
+
+    def rendered():
+        record_build(output_file, key)
+        if cues is not None:
+            save_revision(output_file, cues, settings)
         print(f"✔ Done: {output_file}")
+
+    try:
+        forget_build(output_file)
+        if not (revise and cues is not None and revise_burn(video_file, output_file, cues, settings, frame_rate,
+                                                             subtitle_file, filter_options, ffmpeg_command, journal, rendered)):
+            # Rendered under a temporary name and renamed when complete, so output/ never holds a partial video
+            with staged_outputs([output_file], ffmpeg_command, journal, on_commit=rendered) as staged_command:
+                run_ffmpeg(staged_command, stage="burn")
     except subprocess.CalledProcessError as e:
         print(f"✖ FFmpeg failed on {video_file} (exit code {e.returncode})")
+        return False
+    return True
+
+def video_packets(path):
+    """(pts in seconds, is keyframe) for every video packet of a file, in presentation order. Reads packets only, no decoding."""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'packet=pts_time,flags',
+         '-of', 'csv=p=0', path],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    if result.returncode != 0:
+        raise ValueError(f"could not read the packets of {path}")
+    packets = []
+    for line in result.stdout.splitlines():
+        pts, _, flags = line.partition(',')
+        try:
+            packets.append((float(pts), flags.startswith('K')))
+        except ValueError:
+            continue
+    return sorted(packets)
+
+def gop_segments(packets, spans):
+    """
+    Widen each changed (start, end) span to the keyframes around it: from
+    the last keyframe at or before its start to the first keyframe at or
+    after its end (None: the end of the video). Overlapping segments are merged.
+    """
+    keyframes = [pts for pts, key in packets if key]
+    segments = []
+    for start, end in spans:
+        before = bisect_right(keyframes, start) - 1
+        first = keyframes[before] if before > 0 else 0.0
+        after = bisect_left(keyframes, end)
+        last = keyframes[after] if after < len(keyframes) else None
+        if segments and (segments[-1][1] is None or first <= segments[-1][1]):
+            segments[-1][1] = None if segments[-1][1] is None or last is None else max(segments[-1][1], last)
+        else:
+            segments.append([first, last])
+    return segments
+
+def smpte_timecode(frame, frame_rate):
+    """Non-drop HH:MM:SS:FF for a frame number, counted the way drawtext counts it."""
+    fps = round(frame_rate)
+    return f"{frame // (fps * 3600):02}:{frame // (fps * 60) % 60:02}:{frame // fps % 60:02}:{frame % fps:02}"
+
+def revise_burn(video_file, output_file, cues, settings, frame_rate, subtitle_file, filter_options, ffmpeg_command, journal=None, on_commit=None):
+    """
+    Re-render only the GOPs of the previous output that the revised cues
+    touch, and splice them between stream copies of the untouched GOPs (the
+    audio is copied from the previous output as is). Returns False when a
+    full render is needed instead; otherwise `on_commit()` is called once
+    the revised output is in place.
+    """
+    previous, reason = load_revision(output_file, settings)
+    if previous is None:
+        print(f"↻ Full render of {output_file}: {reason}")
+        return False
+    diff = diff_cues(previous, cues)
+    if not diff["spans"]:
+        print(f"⏩ {output_file}: no cue changes")
+        if on_commit:
+            on_commit()
+        return True
+    try:
+        packets = video_packets(output_file)
+    except ValueError as e:
+        print(f"↻ Full render of {output_file}: {e}")
+        return False
+    if not packets:
+        return False
+
+    half_frame = 0.5 / frame_rate
+    segments = gop_segments(packets, diff["spans"])
+    total = packets[-1][0] + 2 * half_frame
+    redo = sum((end if end is not None else total) - start for start, end in segments)
+    if redo > total / 2:
+        print(f"↻ Full render of {output_file}: the changes cover {redo / total:.0%} of the video")
+        return False
+
+    # Cut points; the segment muxer splits at the first keyframe at or after each one
+    boundaries = sorted({t for segment in segments for t in segment if t})
+    presentation = [pts for pts, _ in packets]
+    work = tempfile.mkdtemp(prefix=".revise_", dir=os.path.dirname(os.path.abspath(output_file)))
+    try:
+        parts = [os.path.join(work, "part%04d.mp4" % i) for i in range(len(boundaries) + 1)]
+        if boundaries:
+            run_ffmpeg(['ffmpeg', '-y', '-i', output_file, '-map', '0:v:0', '-c', 'copy', '-f', 'segment',
+                        '-segment_times', ",".join(f"{t - half_frame:.6f}" for t in boundaries),
+                        '-segment_format', 'mp4', '-reset_timestamps', '1', os.path.join(work, "part%04d.mp4")],
+                       stage="revise-split")
+        else:
+            run_ffmpeg(['ffmpeg', '-y', '-i', output_file, '-map', '0:v:0', '-c', 'copy', parts[0]], stage="revise-split")
+
+        edges = [0.0] + boundaries + [None]
+        for i, (start, end) in enumerate(zip(edges, edges[1:])):
+            if [start, end] not in segments:
+                continue
+            first = bisect_left(presentation, start - half_frame)
+            last = bisect_left(presentation, end - half_frame) if end is not None else len(presentation)
+            filters = (
+                [f"setpts=PTS-STARTPTS+{start:.6f}/TB"]  # Original timestamps, so the subtitles line up
+                + burn_filters(frame_rate, subtitle_file, timecode=smpte_timecode(first, frame_rate), **filter_options)
+                + ["setpts=PTS-STARTPTS"]
+            )
+            run_ffmpeg(['ffmpeg', '-y', '-ss', f"{max(start - half_frame, 0):.6f}", '-i', video_file,
+                        '-vf', ",".join(filters), '-frames:v', str(last - first), '-an', parts[i]],
+                       stage="revise-render", duration=(last - first) / frame_rate)
+
+        concat_list = os.path.join(work, "parts.txt")
+        with open(concat_list, "w", encoding="utf-8") as f:
+            f.writelines(f"file '{part}'\n" for part in parts)
+        splice = ['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', concat_list, '-i', output_file,
+                  '-map', '0:v', '-map', '1:a?', '-c', 'copy', output_file]
+        with staged_outputs([output_file], splice, journal, [ffmpeg_command], on_commit) as staged_command:
+            run_ffmpeg(staged_command, stage="revise-splice")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    print(f"✂️ Revised {output_file}: {describe(diff)}, re-rendered {redo:.1f}s of {total:.1f}s")
+    return True
+
+def enqueue_jobs(queue_db, videos, srt_files, font_size, smpte_only, subs_only, downscale_720, force, revise=False):
+    """Queue a single-file run of this script per video on a shared job queue (see job_queue.py)."""
+    from job_queue import enqueue
+
+    flags = [str(font_size)] * bool(font_size) + ["--smpte-only"] * smpte_only + ["--subs-only"] * subs_only
+    flags += ["--720"] * downscale_720 + ["--force"] * force + ["--revise"] * revise
+    jobs = []
+    for video in videos:
+        argv = [os.path.abspath(video)] + ([] if smpte_only else [os.path.abspath(srt_files[video])]) + flags
+        jobs.append((argv, os.getcwd(), video))  # Workers write to output/ under this same folder
+    print(f"📥 Queued {enqueue(queue_db, 'burn', jobs)} of {len(jobs)} job(s) in {queue_db}")
+
+def batch_process(font_size=None, smpte_only=False, subs_only=False, downscale_720=False, force=False, enqueue=None, resume=False, revise=False,
+                  stage_dir=None, stage_ahead=staging.DEFAULT_AHEAD, stage_budget=staging.DEFAULT_BUDGET_GB):
+    from media_scan import validate_inputs
 
-def batch_process(font_size=None, smpte_only=False, subs_only=False, downscale_720=False, force=False):
     os.makedirs("output", exist_ok=True)
     video_exts = ['.mp4', '.mkv', '.mov']
-    for file in os.listdir():
+    jobs = []
+    for file in sorted(os.listdir()):
         if not os.path.isfile(file):
             continue
 
@@ -83,40 +264,64 @@ def batch_process(font_size=None, smpte_only=False, subs_only=False, downscale_7
         if not smpte_only and not os.path.isfile(srt_file):
             print(f"Skipping {file} (no matching SRT found)")
             continue
+        jobs.append((file, srt_file))
 
-        burn_subtitles(file, srt_file, font_size, smpte_only, subs_only, downscale_720, force)
+    # Probe every video before burning anything; the probe also supplies the timecode frame rate
+    srt_files = dict(jobs)
+    accepted = validate_inputs(list(srt_files), require_audio=False, require_video=True)
+    if enqueue:
+        enqueue_jobs(enqueue, [info["file"] for info in accepted], srt_files, font_size, smpte_only, subs_only, downscale_720, force, revise)
+        return
+    # Journaled in output/, so an interrupted batch can be continued with --resume
+    with BatchJournal("output", "burn", resume=resume) as journal, \
+            staging.staging([info["file"] for info in accepted], stage_dir, stage_ahead, stage_budget):
+        for info in accepted:
+            burn_subtitles(info["file"], srt_files[info["file"]], font_size, smpte_only, subs_only, downscale_720, force,
+                           frame_rate=info["frame_rate"], journal=journal, revise=revise)
 
 if __name__ == "__main__":
-    args = sys.argv[1:]
+    with record_run():
+        args = sys.argv[1:]
 
-    smpte_only = '--smpte-only' in args
-    subs_only = '--subs-only' in args
-    downscale_720 = '--720' in args
-    batch_mode = '--batch' in args
-    force_overwrite = '--force' in args
+        smpte_only = '--smpte-only' in args
+        subs_only = '--subs-only' in args
+        downscale_720 = '--720' in args
+        batch_mode = '--batch' in args
+        force_overwrite = '--force' in args
+        resume = '--resume' in args
+        revise = '--revise' in args
+        queue_db = next((arg.split('=', 1)[1] for arg in args if arg.startswith('--enqueue=')), None)
+        stage_dir = next((arg.split('=', 1)[1] for arg in args if arg.startswith('--stage-dir=')), None)
+        stage_ahead = int(next((arg.split('=', 1)[1] for arg in args if arg.startswith('--stage-ahead=')), staging.DEFAULT_AHEAD))
+        stage_budget = float(next((arg.split('=', 1)[1] for arg in args if arg.startswith('--stage-budget=')), staging.DEFAULT_BUDGET_GB))
 
-    if smpte_only and subs_only:
-        print("Error: Cannot use both '--smpte-only' and '--subs-only' together.")
-        sys.exit(1)
+        if smpte_only and subs_only:
+            print("Error: Cannot use both '--smpte-only' and '--subs-only' together.")
+            sys.exit(1)
 
-    font_size = None
-    positional = [arg for arg in args if not arg.startswith('--') and not arg.isdigit()]
-    font_args = [arg for arg in args if arg.isdigit()]
-    if font_args:
-        font_size = int(font_args[0])
+        font_size = None
+        positional = [arg for arg in args if not arg.startswith('--') and not arg.isdigit()]
+        font_args = [arg for arg in args if arg.isdigit()]
+        if font_args:
+            font_size = int(font_args[0])
 
-    os.makedirs("output", exist_ok=True)
+        os.makedirs("output", exist_ok=True)
+        note_output("output")
 
-    if batch_mode:
-        batch_process(font_size, smpte_only, subs_only, downscale_720, force_overwrite)
-    elif len(positional) >= 1:
-        video_file = positional[0]
-        srt_file = positional[1] if len(positional) > 1 else None
-        if not smpte_only and not srt_file:
-            print("Error: Subtitle file required unless using --smpte-only")
-            sys.exit(1)
-        burn_subtitles(video_file, srt_file, font_size, smpte_only, subs_only, downscale_720, force_overwrite)
-    else:
-        print("Usage:")
-        print("  python burn_subtitles.py <video_file> <srt_file> [font_size] [--smpte-only | --subs-only] [--720] [--force]")
-        print("  python burn_subtitles.py --batch [font_size] [--smpte-only | --subs-only] [--720] [--force]")
+        if batch_mode:
+            batch_process(font_size, smpte_only, subs_only, downscale_720, force_overwrite, queue_db, resume, revise,
+                          stage_dir, stage_ahead, stage_budget)
+        elif len(positional) >= 1:
+            video_file = positional[0]
+            srt_file = positional[1] if len(positional) > 1 else None
+            if not smpte_only and not srt_file:
+                print("Error: Subtitle file required unless using --smpte-only")
+                sys.exit(1)
+            # A failure must show in the exit code: job_queue.py workers mark a job done on exit 0
+            if not burn_subtitles(video_file, srt_file, font_size, smpte_only, subs_only, downscale_720, force_overwrite, revise=revise):
+                sys.exit(1)
+        else:
+            print("Usage:")
+            print("  python burn_subtitles.py <video_file> <srt_file> [font_size] [--smpte-only | --subs-only] [--720] [--force] [--revise]")
+            print("  python burn_subtitles.py --batch [font_size] [--smpte-only | --subs-only] [--720] [--force] [--revise] [--resume] [--enqueue=queue.db]")
+            print("      [--stage-dir=/local/scratch [--stage-ahead=2] [--stage-budget=20]]  (prefetch sources from network storage)")
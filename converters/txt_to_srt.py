@@ -3,6 +3,14 @@ import re
 import sys
 import os
 from datetime import timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'audio_video_tools'))
+from profiling import profile_from_argv, note_output, record_run
+from sources import read_text
+from cues import Cue
+if __name__ == "__main__":
+    profile_from_argv()
+
 import srt
 
 def parse_timecode(tc):
@@ -10,24 +18,13 @@ def parse_timecode(tc):
         h, m, s = map(int, tc.split(":"))
         return timedelta(hours=h, minutes=m, seconds=s)
     except ValueError:
-        print(f"Error: Invalid timecode format '{tc}'. Use hh:mm:ss")
-        sys.exit(1)
-
-def process_txt_to_srt(input_file):
-    if not os.path.exists(input_file):
-        print(f"Error: File {input_file} not found.")
-        return
-
-    base_name = os.path.splitext(input_file)[0]
-    output_srt = f"{base_name}.srt"
+        raise ValueError(f"Invalid timecode format '{tc}'. Use hh:mm:ss")
 
-    with open(input_file, 'r', encoding='utf-8') as file:
-        lines = file.readlines()
-
-    srt_entries = []
-    idx = 1
+def txt_to_cues(source):
+    """Cues from an accessible IN/OUT text script given as a path, bytes or file-like object."""
+    cues = []
     current_entry = {}
-    for line in lines:
+    for line in read_text(source).split("\n"):
         line = line.strip()
         
         if line.startswith("IN:"):
@@ -38,19 +35,31 @@ def process_txt_to_srt(input_file):
             continue
         elif line.startswith("Duration:"):
             if 'start' in current_entry and 'end' in current_entry and 'content' in current_entry:
-                srt_entries.append(
-                    srt.Subtitle(
-                        index=idx,
-                        start=current_entry['start'],
-                        end=current_entry['end'],
-                        content=current_entry['content']
-                    )
-                )
-                idx += 1
+                cues.append(Cue(len(cues) + 1, current_entry['start'].total_seconds(),
+                                current_entry['end'].total_seconds(), current_entry['content']))
                 current_entry = {}
         elif line:
             current_entry['content'] = line
+    return cues
+
+def process_txt_to_srt(input_file):
+    if not os.path.exists(input_file):
+        print(f"Error: File {input_file} not found.")
+        return
+
+    base_name = os.path.splitext(input_file)[0]
+    output_srt = f"{base_name}.srt"
+
+    try:
+        cues = txt_to_cues(input_file)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
 
+    srt_entries = [
+        srt.Subtitle(index=cue.number, start=timedelta(seconds=cue.start), end=timedelta(seconds=cue.end), content=cue.text)
+        for cue in cues
+    ]
     srt_output = srt.compose(srt_entries)
 
     with open(output_srt, 'w', encoding='utf-8') as srt_file:
@@ -59,8 +68,10 @@ def process_txt_to_srt(input_file):
     print(f"SRT file saved to {output_srt}")
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python txt_to_srt.py <input_file.txt>")
-    else:
-        input_file = sys.argv[1]
-        process_txt_to_srt(input_file)
+    with record_run():
+        if len(sys.argv) < 2:
+            print("Usage: python txt_to_srt.py <input_file.txt>")
+        else:
+            input_file = sys.argv[1]
+            note_output(os.path.splitext(input_file)[0] + ".srt")
+            process_txt_to_srt(input_file)
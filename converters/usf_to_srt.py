@@ -1,22 +1,24 @@
 #!/usr/bin/env python3
+import os
 import sys
-import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'audio_video_tools'))
+from profiling import profile_from_argv, note_output, record_run
+from cues import write_srt
+from subtitle_xml import iter_xml_cues
+if __name__ == "__main__":
+    profile_from_argv()
 
 def usf_to_srt(usf_file):
+    # Streamed with iterparse (subtitle_xml.py), so long files convert in constant memory
     srt_file = usf_file.rsplit('.', 1)[0] + '.srt'
-    tree = ET.parse(usf_file)
-    subs = tree.findall('.//subtitle')
-
-    with open(srt_file, 'w', encoding='utf-8') as f:
-        for i, s in enumerate(subs, 1):
-            start = s.get('start').replace('.', ',')
-            stop = s.get('stop').replace('.', ',')
-            text = ''.join(t.text or '' for t in s.findall('.//text')).strip()
-            f.write(f'{i}\n{start} --> {stop}\n{text}\n\n')
+    write_srt(iter_xml_cues(usf_file), srt_file)
     print(f'Converted to {srt_file}')
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print('Usage: python convert_usf.py <filename.usf>')
-    else:
-        usf_to_srt(sys.argv[1])
+    with record_run():
+        if len(sys.argv) != 2:
+            print('Usage: python convert_usf.py <filename.usf>')
+        else:
+            note_output(sys.argv[1].rsplit('.', 1)[0] + '.srt')
+            usf_to_srt(sys.argv[1])
@@ -1,10 +1,17 @@
 #!/usr/bin/env python3
 
-import pandas as pd
+import os
+import sys
 import argparse
 import subprocess
 import re
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'audio_video_tools'))
+from profiling import profile_from_argv, note_output, record_run
+from sources import is_path
+if __name__ == "__main__":
+    profile_from_argv()
+
 def get_frame_rate(video_file):
     """Get the frame rate of the video file using ffmpeg."""
     result = subprocess.run(
@@ -31,15 +38,29 @@ def smpte_to_srt(timecode, frame_rate):
     milliseconds = int((frames / frame_rate) * 1000)
     return f"{hours:02}:{minutes:02}:{seconds:02},{milliseconds:03}"
 
-def excel_to_srt(excel_file, srt_file, video_file):
+def excel_to_srt(excel_file, srt_file=None, video_file=None, frame_rate=None):
+    """
+    Convert a studio script workbook to SRT. `excel_file` can be a path, bytes
+    or a binary file-like object; `srt_file` a path or a writable text file
+    object, or None to return the SRT as a string. Pass `frame_rate` directly
+    to skip probing `video_file`.
+    """
+    # pandas is only needed for the conversion itself, not for --help
+    import io
+    import pandas as pd
+
     # Get the frame rate from the video file
-    frame_rate = get_frame_rate(video_file)
+    if frame_rate is None:
+        frame_rate = get_frame_rate(video_file)
 
     # Load the Excel file
+    if isinstance(excel_file, (bytes, bytearray)):
+        excel_file = io.BytesIO(excel_file)
     df = pd.read_excel(excel_file)
     
-    # Open the SRT file for writing
-    with open(srt_file, 'w') as file:
+    # Open the SRT file for writing (or collect it in memory)
+    file = open(srt_file, 'w') if is_path(srt_file) else srt_file or io.StringIO()
+    try:
         for index, row in df.iterrows():
             line_number = row['Event Number']
             timecode_in = smpte_to_srt(row['TimeCode In'], frame_rate)
@@ -49,12 +70,20 @@ def excel_to_srt(excel_file, srt_file, video_file):
             file.write(f"{line_number}\n")
             file.write(f"{timecode_in} --> {timecode_out}\n")
             file.write(f"{script_text}\n\n")
+    finally:
+        if is_path(srt_file):
+            file.close()
+
+    if srt_file is None:
+        return file.getvalue()
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description='Convert Excel AD script to SRT file.')
-    parser.add_argument('excel_file', help='Path to the Excel file')
-    parser.add_argument('srt_file', help='Path to the output SRT file')
-    parser.add_argument('video_file', help='Path to the video file to determine frame rate')
-    args = parser.parse_args()
+    with record_run():
+        parser = argparse.ArgumentParser(description='Convert Excel AD script to SRT file.')
+        parser.add_argument('excel_file', help='Path to the Excel file')
+        parser.add_argument('srt_file', help='Path to the output SRT file')
+        parser.add_argument('video_file', help='Path to the video file to determine frame rate')
+        args = parser.parse_args()
 
-    excel_to_srt(args.excel_file, args.srt_file, args.video_file)
\ No newline at end of file
+        note_output(args.srt_file)
+        excel_to_srt(args.excel_file, args.srt_file, args.video_file)
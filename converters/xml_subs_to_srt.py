@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+"""
+xml_subs_to_srt.py
+
+Converts XML subtitle deliveries to SRT: USF, TTML/DFXP (including tick and
+frame-based time expressions) and EBU-TT / EBU-TT-D. The format is detected
+from the document's root element, not the file extension.
+
+Files are streamed with iterparse (see audio_video_tools/subtitle_xml.py):
+each cue is written out and dropped from memory as soon as it has been read,
+so a feature-length TTML file converts in the same memory as a short one.
+
+With `--batch`, folders are searched for .xml/.ttml/.dfxp/.usf files and the
+files are converted in parallel, one per worker process. XML files that
+aren't subtitles are skipped with a warning.
+
+Usage:
+  python xml_subs_to_srt.py episode.ttml
+  python xml_subs_to_srt.py episode.dfxp -o episode.srt
+  python xml_subs_to_srt.py --batch deliveries/ -o srt/ --jobs 4
+"""
+
+import os
+import sys
+import argparse
+from glob import glob
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'audio_video_tools'))
+from profiling import profile_from_argv, note_output, record_run
+from cues import write_srt
+from subtitle_xml import iter_xml_cues
+if __name__ == "__main__":
+    profile_from_argv()
+
+XML_EXTENSIONS = (".xml", ".ttml", ".dfxp", ".usf")
+
+def convert_file(xml_file, srt_file):
+    """Convert one XML subtitle file; returns the number of cues written."""
+    try:
+        return write_srt(iter_xml_cues(xml_file), srt_file)
+    except BaseException:
+        if os.path.exists(srt_file):
+            os.remove(srt_file)  # Don't leave a half-written SRT behind
+        raise
+
+def _convert_safely(job):
+    xml_file, srt_file = job
+    try:
+        return {"file": xml_file, "output": srt_file, "cues": convert_file(xml_file, srt_file)}
+    except Exception as e:
+        return {"file": xml_file, "error": str(e)}
+
+def convert_paths(jobs, processes=None):
+    """Convert many (xml_file, srt_file) pairs in parallel, one file per worker process."""
+    if len(jobs) == 1:
+        return [_convert_safely(jobs[0])]
+    with Pool(processes=processes or os.cpu_count()) as pool:
+        return pool.map(_convert_safely, jobs, chunksize=1)
+
+def batch_inputs(paths):
+    """Expand folders (recursively) into the XML subtitle files they contain."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = glob(os.path.join(path, "**", "*"), recursive=True)
+            files.extend(sorted(f for f in found if f.lower().endswith(XML_EXTENSIONS) and os.path.isfile(f)))
+        else:
+            files.append(path)
+    return files
+
+def srt_path(xml_file, output_dir=None):
+    base = os.path.splitext(os.path.basename(xml_file))[0]
+    return os.path.join(output_dir or os.path.dirname(xml_file), f"{base}.srt")
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert USF, TTML/DFXP and EBU-TT subtitles to SRT.")
+    parser.add_argument("paths", nargs="+", help="XML subtitle file, or with --batch: files and/or folders")
+    parser.add_argument("--batch", action="store_true", help="Convert every XML subtitle file in the given folders")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Output SRT (single file) or output folder (--batch); default: next to each input")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Parallel conversions for --batch (default: CPU count)")
+    args = parser.parse_args()
+
+    if not args.batch:
+        if len(args.paths) != 1:
+            parser.error("expected one input file (or use --batch)")
+        xml_file = args.paths[0]
+        srt_file = args.output or srt_path(xml_file)
+        note_output(srt_file)
+        try:
+            count = convert_file(xml_file, srt_file)
+        except (OSError, ValueError, SyntaxError) as e:
+            print(f"❌ {xml_file}: {e}")
+            sys.exit(1)
+        print(f"✅ Converted {count} cues to {srt_file}")
+        return
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+    note_output(args.output)
+
+    xml_files = batch_inputs(args.paths)
+    if not xml_files:
+        print("⚠️ No XML subtitle files found.")
+        return
+
+    failed = 0
+    for result in convert_paths([(f, srt_path(f, args.output)) for f in xml_files], args.jobs):
+        if "error" not in result:
+            print(f"✅ {result['output']} ({result['cues']} cues)")
+        elif result["error"].startswith("Not a USF or TTML document"):
+            print(f"⚠️ Skipped {result['file']}: {result['error']}")
+        else:
+            failed += 1
+            print(f"❌ {result['file']}: {result['error']}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    with record_run():
+        main()